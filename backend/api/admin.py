@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import User, Profile, Word, UserStats, GameHistory, Badge, Avatar
+from .models import User, Profile, Word, UserStats, GameHistory, GameEvaluation, Badge, Avatar, Tag
+from .badge_backfill import backfill_badge
 
 
 class UserAdmin(admin.ModelAdmin):
@@ -14,20 +15,31 @@ class ProfileAdmin(admin.ModelAdmin):
 
 class WordAdmin(admin.ModelAdmin):
     list_display = ('text', 'word_type', 'difficulty_level', 'created_at')
-    list_filter = ('word_type', 'difficulty_level')
+    list_filter = ('word_type', 'difficulty_level', 'tag_set')
     search_fields = ('text', 'description', 'tags') 
 
 
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name',)
+
+
 class UserStatsAdmin(admin.ModelAdmin):
     list_display = ('user', 'experience', 'correct_answers_total', 'total_questions_answered')
     list_filter = ('last_login_date',)
     search_fields = ('user__username',) 
 
 
+class GameEvaluationInline(admin.StackedInline):
+    model = GameEvaluation
+    can_delete = False
+
+
 class GameHistoryAdmin(admin.ModelAdmin):
     list_display = ('user', 'played_at', 'score', 'correct_in_game', 'total_questions_in_game')
     list_filter = ('played_at',)
     search_fields = ('user__username',)
+    inlines = [GameEvaluationInline]
 
 
 class BadgeAdmin(admin.ModelAdmin):
@@ -37,11 +49,19 @@ class BadgeAdmin(admin.ModelAdmin):
     fields = ('title', 'description', 'image', 'category',
             'condition_description', 'unlock_condition_data',
             'reward_description', 'reward_data')
+    actions = ['backfill_selected_badges']
 
     def unlock_condition_data_display(self, obj):
         return str(obj.unlock_condition_data)
     unlock_condition_data_display.short_description = "Condición Desbloqueo"
 
+    @admin.action(description="Otorgar a los usuarios que ya cumplen la condición")
+    def backfill_selected_badges(self, request, queryset):
+        total = 0
+        for badge in queryset:
+            total += backfill_badge(badge)
+        self.message_user(request, f"Se otorgaron {total} badges a usuarios existentes.")
+
 class AvatarAdmin(admin.ModelAdmin):
     list_display = ('name', 'image', 'is_default')
     list_filter = ('is_default',)
@@ -56,4 +76,5 @@ admin.site.register(Word, WordAdmin)
 admin.site.register(UserStats, UserStatsAdmin)
 admin.site.register(GameHistory, GameHistoryAdmin)
 admin.site.register(Badge, BadgeAdmin)
-admin.site.register(Avatar, AvatarAdmin)
\ No newline at end of file
+admin.site.register(Avatar, AvatarAdmin)
+admin.site.register(Tag, TagAdmin)
\ No newline at end of file
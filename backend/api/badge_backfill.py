@@ -0,0 +1,132 @@
+from api.models import Badge, UserStats, GameHistory
+from api.levels import xp_for_level
+from api.badge_unlock_logic import compile_conditions, STAT_CONDITIONS
+from api.services import award_badge_rewards_bulk
+from api.user_counters import refresh_counters
+from django.db import transaction
+from django.db.models import Q, F, OuterRef, Subquery, IntegerField
+import math
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- TRADUCCIÓN DE CONDICIONES A SQL ---
+# * --------------------------------------------------------------------------------------------------
+def _latest_game_value(field):
+    latest = GameHistory.objects.filter(user_id=OuterRef('user_id')).order_by('-played_at', '-id').values(field)[:1]
+    return Subquery(latest, output_field=IntegerField())
+
+
+def _accuracy_q(alias, correct_field, total_field, required_value, aliases):
+    # Precisión = correct / total * 100, y 0.0 cuando total == 0 (ver UserStats.get_*_accuracy_percentage)
+    if required_value <= 0:
+        return Q()
+    aliases[alias] = F(correct_field) * 100
+    return Q(**{f'{total_field}__gt': 0, f'{alias}__gte': F(total_field) * required_value})
+
+
+def badge_condition_filter(conditions):
+    """
+    Traduce `unlock_condition_data` a (aliases, Q) aplicables sobre UserStats.
+    Devuelve None si la condición es inválida (el badge nunca se desbloquea).
+    """
+    rules = compile_conditions(conditions)
+    if not rules:
+        return None
+
+    aliases = {}
+    q = Q()
+    for condition_type, required_value in rules:
+        if condition_type in STAT_CONDITIONS:
+            q &= Q(**{f'{STAT_CONDITIONS[condition_type]}__gte': required_value})
+        elif condition_type == 'level_reached':
+            # Umbral de XP del nivel: se compara experience sin calcular el nivel por fila
+            q &= Q(experience__gte=xp_for_level(math.ceil(required_value)))
+        elif condition_type == 'general_accuracy':
+            q &= _accuracy_q('_general_accuracy', 'correct_answers_total', 'total_questions_answered', required_value, aliases)
+        elif condition_type == 'slang_accuracy':
+            q &= _accuracy_q('_slang_accuracy', 'correct_slangs', 'slangs_seen', required_value, aliases)
+        elif condition_type == 'phrasal_verb_accuracy':
+            q &= _accuracy_q('_phrasal_verb_accuracy', 'correct_phrasal_verbs', 'phrasal_verbs_seen', required_value, aliases)
+        elif condition_type == 'unique_words_unlocked':
+            q &= Q(unlocked_words_count__gte=required_value)
+        elif condition_type == 'avatars_unlocked':
+            q &= Q(unlocked_avatars_count__gte=required_value)
+        elif condition_type == 'single_game_letters_killed':
+            aliases['_single_game_letters_killed'] = _latest_game_value('letters_killed')
+            q &= Q(_single_game_letters_killed__gte=required_value)
+        elif condition_type == 'single_game_bosses_killed':
+            aliases['_single_game_bosses_killed'] = _latest_game_value('bosses_killed')
+            q &= Q(_single_game_bosses_killed__gte=required_value)
+        elif condition_type == 'single_game_time_survived':
+            aliases['_single_game_time_survived'] = _latest_game_value('time_spent_seconds')
+            q &= Q(_single_game_time_survived__gte=required_value)
+        else:
+            return None
+    return aliases, q
+
+
+def qualifying_stats(badge):
+    """
+    QuerySet de UserStats que cumplen las condiciones del badge y aún no lo tienen.
+    """
+    translated = badge_condition_filter(badge.unlock_condition_data)
+    if translated is None:
+        return UserStats.objects.none()
+    aliases, q = translated
+    return UserStats.objects.alias(**aliases).filter(q).exclude(badges=badge)
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- BACKFILL DE BADGES ---
+# * --------------------------------------------------------------------------------------------------
+def backfill_badge(badge, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Otorga `badge` (y sus recompensas) a todos los usuarios que ya cumplen sus condiciones.
+    Recorre UserStats por rangos de id, de a `chunk_size` ids, sin cargar filas completas.
+    Devuelve la cantidad de usuarios a los que se les otorgó.
+    """
+    through = UserStats.badges.through
+    granted = 0
+    last_id = 0
+
+    while True:
+        with transaction.atomic():
+            candidate_ids = list(
+                qualifying_stats(badge)
+                .filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:chunk_size]
+            )
+            if not candidate_ids:
+                break
+
+            # Bloquear las filas y volver a excluir a quien lo haya recibido mientras tanto
+            # (check_and_unlock_badges concurrente): solo los nuevos reciben las recompensas
+            stats_ids = list(
+                UserStats.objects.select_for_update()
+                .filter(id__in=candidate_ids)
+                .exclude(badges=badge)
+                .order_by('id')
+                .values_list('id', flat=True)
+            )
+            through.objects.bulk_create(
+                [through(userstats_id=stats_id, badge_id=badge.id) for stats_id in stats_ids],
+                ignore_conflicts=True
+            )
+            award_badge_rewards_bulk(stats_ids, badge)
+            # bulk_create no dispara m2m_changed
+            refresh_counters(UserStats.objects.filter(id__in=stats_ids), ['badges'])
+
+        granted += len(stats_ids)
+        last_id = candidate_ids[-1]
+
+    return granted
+
+
+def backfill_badges(badges=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Ejecuta backfill_badge para cada badge (todos por defecto). Devuelve {badge: otorgados}.
+    """
+    if badges is None:
+        badges = Badge.objects.all().order_by('id')
+    return {badge: backfill_badge(badge, chunk_size=chunk_size) for badge in badges}
@@ -1,131 +1,231 @@
-from api.models import Badge, UserStats
-from api.services import award_badge_rewards
+from api.models import Badge, UserStats, GameHistory
+from api.services import award_rewards_for_badges
+from api.catalog import get_catalog_version, BADGES
 from django.db import transaction
+from bisect import bisect_right
+from threading import Lock
 
-def check_and_unlock_badges(user):
+# * --------------------------------------------------------------------------------------------------
+# ! --- CONDICIONES DE DESBLOQUEO ---
+# * --------------------------------------------------------------------------------------------------
+# Condiciones que comparan directamente una columna de UserStats: tipo -> campo.
+STAT_CONDITIONS = {
+    'correct_slangs': 'correct_slangs',
+    'total_exp_achieved': 'experience',
+    'answered_total_questions': 'total_questions_answered',
+    'words_seen_total': 'words_seen_total',
+    'phrasal_verbs_seen': 'phrasal_verbs_seen',
+    'correct_answers_total': 'correct_answers_total',
+    'total_slangs_questions': 'slangs_seen',
+    'correct_phrasal_verbs': 'correct_phrasal_verbs',
+    'total_phrasal_verbs_questions': 'phrasal_verbs_seen',
+    'current_streak': 'current_streak',
+    'longest_streak': 'longest_streak',
+    'slangs_learned': 'slangs_learned',
+    'idioms_learned': 'idioms_learned',
+    'phrasal_verbs_learned': 'phrasal_verbs_learned',
+    'vocabulary_learned': 'vocabulary_learned',
+    'slangs_seen': 'slangs_seen',
+    'total_letters_killed': 'total_letters_killed',
+    'total_bosses_killed': 'total_bosses_killed',
+    'total_time_played_seconds': 'total_time_played_seconds',
+}
+
+# Condiciones derivadas: tipo -> (entradas de las que depende, función(contexto) -> valor).
+# Las entradas son campos de UserStats o las pseudo-entradas 'unlocked_words',
+# 'unlocked_avatars' y 'latest_game'.
+DERIVED_CONDITIONS = {
+    'level_reached': (('experience',), lambda ctx: ctx.stats.get_level()),
+    'general_accuracy': (('correct_answers_total', 'total_questions_answered'), lambda ctx: ctx.stats.get_accuracy_percentage()),
+    'slang_accuracy': (('correct_slangs', 'slangs_seen'), lambda ctx: ctx.stats.get_slang_accuracy_percentage()),
+    'phrasal_verb_accuracy': (('correct_phrasal_verbs', 'phrasal_verbs_seen'), lambda ctx: ctx.stats.get_phrasal_verb_accuracy_percentage()),
+    'unique_words_unlocked': (('unlocked_words',), lambda ctx: ctx.stats.unlocked_words_count),
+    'avatars_unlocked': (('unlocked_avatars',), lambda ctx: ctx.stats.unlocked_avatars_count),
+    'single_game_letters_killed': (('latest_game',), lambda ctx: ctx.latest_game.letters_killed if ctx.latest_game else None),
+    'single_game_bosses_killed': (('latest_game',), lambda ctx: ctx.latest_game.bosses_killed if ctx.latest_game else None),
+    'single_game_time_survived': (('latest_game',), lambda ctx: ctx.latest_game.time_spent_seconds if ctx.latest_game else None),
+}
+
+
+def condition_inputs(condition_type):
+    if condition_type in STAT_CONDITIONS:
+        return (STAT_CONDITIONS[condition_type],)
+    return DERIVED_CONDITIONS[condition_type][0]
+
+
+def compile_conditions(conditions):
+    """
+    Valida `unlock_condition_data` y lo convierte en [(tipo, valor requerido), ...].
+    Un badge sin condiciones o con alguna condición inválida nunca se desbloquea (devuelve None).
+    """
+    if not conditions or not isinstance(conditions, list):
+        return None
+    rules = []
+    for condition in conditions:
+        if not isinstance(condition, dict):
+            return None
+        condition_type = condition.get('type')
+        required_value = condition.get('value')
+        if condition_type not in STAT_CONDITIONS and condition_type not in DERIVED_CONDITIONS:
+            return None
+        if isinstance(required_value, bool) or not isinstance(required_value, (int, float)):
+            return None
+        rules.append((condition_type, required_value))
+    return rules
+
+
+class _EvaluationContext:
+    """
+    Resuelve perezosamente (y una sola vez) los valores de cada tipo de condición,
+    de modo que los conteos de M2M o la última partida solo se consultan si algún badge los necesita.
+    """
+    _missing = object()
+
+    def __init__(self, stats, user, latest_game=_missing):
+        self.stats = stats
+        self.user = user
+        self._values = {}
+        self._latest_game = latest_game
+
+    @property
+    def latest_game(self):
+        if self._latest_game is self._missing:
+            self._latest_game = GameHistory.objects.filter(user=self.user).order_by('-played_at', '-id').first()
+        return self._latest_game
+
+    def value(self, condition_type):
+        if condition_type not in self._values:
+            if condition_type in STAT_CONDITIONS:
+                self._values[condition_type] = getattr(self.stats, STAT_CONDITIONS[condition_type])
+            else:
+                self._values[condition_type] = DERIVED_CONDITIONS[condition_type][1](self)
+        return self._values[condition_type]
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- ÍNDICE COMPILADO DE BADGES ---
+# * --------------------------------------------------------------------------------------------------
+class BadgeRuleIndex:
+    """
+    Catálogo de badges compilado una vez por versión:
+    - rules: badge_id -> [(tipo, valor requerido), ...]
+    - thresholds/badge_ids: por tipo, umbrales ordenados para resolver con bisect
+      qué badges cumplen esa condición sin recorrer todo el catálogo.
+    - types_by_input: entrada (campo de UserStats) -> tipos de condición que dependen de ella.
     """
-    Verifica todas las condiciones de los badges desbloqueables
+
+    def __init__(self, version, badges):
+        self.version = version
+        self.badges = {}
+        self.rules = {}
+        self.thresholds = {}
+        self.badge_ids = {}
+        self.types_by_input = {}
+
+        by_type = {}
+        for badge in badges:
+            rules = compile_conditions(badge.unlock_condition_data)
+            if not rules:
+                continue
+            self.badges[badge.id] = badge
+            self.rules[badge.id] = rules
+            for condition_type, required_value in rules:
+                by_type.setdefault(condition_type, []).append((required_value, badge.id))
+
+        for condition_type, entries in by_type.items():
+            entries.sort()
+            self.thresholds[condition_type] = [value for value, _ in entries]
+            self.badge_ids[condition_type] = [badge_id for _, badge_id in entries]
+            for field in condition_inputs(condition_type):
+                self.types_by_input.setdefault(field, set()).add(condition_type)
+
+    def types_for(self, changed_fields):
+        if changed_fields is None:
+            return self.thresholds.keys()
+        types = set()
+        for field in changed_fields:
+            types |= self.types_by_input.get(field, set())
+        return types
+
+    def evaluate(self, ctx, owned_ids, changed_fields=None):
+        """
+        Devuelve los ids de badges no poseídos cuyas condiciones se cumplen.
+        Solo se consideran candidatos los badges con alguna condición afectada por `changed_fields`
+        (todos si es None).
+        """
+        candidates = set()
+        for condition_type in self.types_for(changed_fields):
+            value = ctx.value(condition_type)
+            if value is None:
+                continue
+            reached = bisect_right(self.thresholds[condition_type], value)
+            candidates.update(self.badge_ids[condition_type][:reached])
+        candidates -= owned_ids
+
+        return sorted(badge_id for badge_id in candidates if self._conditions_met(ctx, self.rules[badge_id]))
+
+    @staticmethod
+    def _conditions_met(ctx, rules):
+        for condition_type, required_value in rules:
+            value = ctx.value(condition_type)
+            if value is None or value < required_value:
+                return False
+        return True
+
+
+_index = None
+_index_lock = Lock()
+
+def get_badge_index():
+    global _index
+    version = get_catalog_version(BADGES)
+    index = _index
+    if index is None or index.version != version:
+        # Con workers gthread, un solo hilo reconstruye; los demás esperan y usan el nuevo índice
+        with _index_lock:
+            if _index is None or _index.version != version:
+                _index = BadgeRuleIndex(version, Badge.objects.all())
+            index = _index
+    return index
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- VERIFICACIÓN DE BADGES ---
+# * --------------------------------------------------------------------------------------------------
+def check_and_unlock_badges(user, changed_fields=None, user_stats=None, latest_game=None):
+    """
+    Verifica las condiciones de los badges desbloqueables
     para un usuario dado y otorga los badges si las condiciones se cumplen.
+    Si se indica `changed_fields` (campos de UserStats o 'unlocked_words', 'unlocked_avatars',
+    'latest_game'), solo se evalúan los badges que dependen de ellos.
+    Se puede pasar `user_stats` ya cargado (y actualizado) para evitar volver a leerlo, y
+    `latest_game` para fijar la partida que usan las condiciones 'single_game_*'.
     """
-    user_stats, created = UserStats.objects.get_or_create(user=user)
-    from api.models import GameHistory
-    latest_game = GameHistory.objects.filter(user=user).order_by('-played_at').first()
-    
-    all_badges = Badge.objects.all()
-    
+    if user_stats is None:
+        user_stats, created = UserStats.objects.get_or_create(user=user)
+    index = get_badge_index()
+
+    if not index.types_for(changed_fields):
+        return []
+
     unlocked_badges_this_session = []
 
-    with transaction.atomic(): 
-        for badge in all_badges:
-
-            if not badge.unlock_condition_data or not isinstance(badge.unlock_condition_data, list):
-                continue 
-
-            if badge in user_stats.badges.all():
-                continue 
-
-            all_conditions_met = True
-            for condition in badge.unlock_condition_data:
-                is_condition_met = False
-                condition_type = condition.get('type')
-                required_value = condition.get('value')
-                if not condition_type or required_value is None:
-                    all_conditions_met = False
-                    break 
-                if condition_type == 'correct_slangs':
-                    if user_stats.correct_slangs >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'total_exp_achieved':
-                    if user_stats.experience >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'answered_total_questions':
-                    if user_stats.total_questions_answered >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'words_seen_total':
-                    if user_stats.words_seen_total >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'phrasal_verbs_seen':
-                    if user_stats.phrasal_verbs_seen >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'correct_answers_total':
-                    if user_stats.correct_answers_total >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'total_slangs_questions':
-                    if user_stats.slangs_seen >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'correct_phrasal_verbs':
-                    if user_stats.correct_phrasal_verbs >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'total_phrasal_verbs_questions':
-                    if user_stats.phrasal_verbs_seen >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'current_streak':
-                    if user_stats.current_streak >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'longest_streak':
-                    if user_stats.longest_streak >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'slangs_learned':
-                    if user_stats.slangs_learned >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'idioms_learned':
-                    if user_stats.idioms_learned >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'phrasal_verbs_learned':
-                    if user_stats.phrasal_verbs_learned >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'vocabulary_learned':
-                    if user_stats.vocabulary_learned >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'level_reached':
-                    if user_stats.get_level() >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'general_accuracy':
-                    if user_stats.get_accuracy_percentage() >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'slang_accuracy':
-                    if user_stats.get_slang_accuracy_percentage() >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'phrasal_verb_accuracy':
-                    if user_stats.get_phrasal_verb_accuracy_percentage() >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'unique_words_unlocked':
-                    if user_stats.unlocked_words.count() >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'avatars_unlocked':
-                    if user_stats.unlocked_avatars.count() >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'slangs_seen':
-                    if user_stats.slangs_seen >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'total_letters_killed':
-                    if user_stats.total_letters_killed >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'total_bosses_killed':
-                    if user_stats.total_bosses_killed >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'total_time_played_seconds':
-                    if user_stats.total_time_played_seconds >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'single_game_letters_killed':
-                    if latest_game and latest_game.letters_killed >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'single_game_bosses_killed':
-                    if latest_game and latest_game.bosses_killed >= required_value:
-                        is_condition_met = True
-                elif condition_type == 'single_game_time_survived':
-                    if latest_game and latest_game.time_spent_seconds >= required_value:
-                        is_condition_met = True
-
-                if not is_condition_met:
-                    all_conditions_met = False
-                    break 
-            
-            if all_conditions_met:
-                user_stats.badges.add(badge)
-                user_stats.save()
-                award_badge_rewards(user, badge)
-                unlocked_badges_this_session.append(badge)
+    with transaction.atomic():
+        # Bloquear la fila de UserStats: serializa con otras evaluaciones del mismo usuario y con
+        # badge_backfill, así un badge (y su recompensa) no se otorga dos veces
+        list(UserStats.objects.select_for_update().filter(pk=user_stats.pk).values_list('id', flat=True))
+        owned_ids = set(user_stats.badges.values_list('id', flat=True))
+        if latest_game is None:
+            ctx = _EvaluationContext(user_stats, user)
+        else:
+            ctx = _EvaluationContext(user_stats, user, latest_game)
+
+        for badge_id in index.evaluate(ctx, owned_ids, changed_fields):
+            badge = index.badges[badge_id]
+            unlocked_badges_this_session.append(badge)
+
+        if unlocked_badges_this_session:
+            user_stats.badges.add(*unlocked_badges_this_session)
+            award_rewards_for_badges(user_stats, unlocked_badges_this_session)
+            for badge in unlocked_badges_this_session:
                 print(f"DEBUG: Badge '{badge.title}' desbloqueado para {user.username}!")
 
-    return unlocked_badges_this_session
\ No newline at end of file
+    return unlocked_badges_this_session
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.db.models import F
+from threading import Lock
+import time
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- VERSIONES DE CATÁLOGO ---
+# * --------------------------------------------------------------------------------------------------
+# Cada catálogo (badges, words, ...) tiene un contador persistido en CatalogVersion.
+# Las estructuras compiladas en memoria (índices de badges, muestreadores de palabras, etc.)
+# guardan la versión con la que se construyeron y se reconstruyen cuando cambia.
+# La lectura se memoriza por proceso durante CATALOG_VERSION_TTL_SECONDS para no
+# consultar la base de datos en cada request; el proceso que hace el cambio lo ve al instante.
+# Los hilos de un worker gthread comparten esa copia; _local_lock protege el dict y la consulta
+# queda fuera del lock (dos hilos que leen a la vez solo hacen una consulta de más).
+
+BADGES = 'badges'
+WORDS = 'words'
+
+_local_versions = {}
+_local_lock = Lock()
+
+
+def _ttl():
+    return getattr(settings, 'CATALOG_VERSION_TTL_SECONDS', 2)
+
+
+def get_catalog_version(name):
+    """
+    Devuelve la versión actual del catálogo `name`.
+    """
+    from api.models import CatalogVersion
+
+    with _local_lock:
+        cached = _local_versions.get(name)
+    now = time.monotonic()
+    if cached and now - cached[1] < _ttl():
+        return cached[0]
+
+    version = CatalogVersion.objects.filter(name=name).values_list('version', flat=True).first()
+    if version is None:
+        version = CatalogVersion.objects.get_or_create(name=name)[0].version
+    with _local_lock:
+        _local_versions[name] = (version, now)
+    return version
+
+
+def bump_catalog_version(name):
+    """
+    Incrementa la versión del catálogo `name` e invalida la copia local del proceso.
+    """
+    from api.models import CatalogVersion
+
+    updated = CatalogVersion.objects.filter(name=name).update(version=F('version') + 1)
+    if not updated:
+        CatalogVersion.objects.get_or_create(name=name, defaults={'version': 1})
+    with _local_lock:
+        _local_versions.pop(name, None)
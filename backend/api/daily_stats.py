@@ -0,0 +1,167 @@
+from api.models import UserStats, GameHistory, ArchivedGameHistory, DailyUserStats
+from django.db import connection, transaction
+from django.db.models import F, Sum, Count, FloatField
+from django.db.models.functions import Cast, TruncDate
+from django.utils import timezone
+from datetime import timedelta
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- ESTADÍSTICAS DIARIAS (ROLLUPS) ---
+# * --------------------------------------------------------------------------------------------------
+# Cada partida suma sus totales a la fila (usuario, día) de DailyUserStats con un solo
+# INSERT ... ON CONFLICT DO UPDATE. Las leaderboards por ventana suman como mucho 31 filas por
+# usuario en lugar de recorrer GameHistory. rebuild_daily_stats las regenera desde GameHistory
+# y ArchivedGameHistory (ver api/history_archive.py).
+
+# Campo de DailyUserStats -> clave del payload de la partida (ver game_results.parse_match_payload)
+ROLLUP_FIELDS = {
+    'score': 'score',
+    'xp_earned': 'xp_earned',
+    'correct_answers': 'correct_answers',
+    'total_questions': 'total_questions',
+    'time_spent_seconds': 'time_spent',
+    'letters_killed': 'letters_killed',
+    'bosses_killed': 'bosses_killed',
+}
+
+# Campo de DailyUserStats -> campo de GameHistory (para reconstruir)
+HISTORY_FIELDS = {
+    'score': 'score',
+    'xp_earned': 'xp_earned',
+    'correct_answers': 'correct_in_game',
+    'total_questions': 'total_questions_in_game',
+    'time_spent_seconds': 'time_spent_seconds',
+    'letters_killed': 'letters_killed',
+    'bosses_killed': 'bosses_killed',
+}
+
+WINDOWS = ('day', 'week', 'month')
+
+
+def daily_increments(matches):
+    increments = {field: 0 for field in ROLLUP_FIELDS}
+    increments['matches'] = 0
+    for match in matches:
+        increments['matches'] += 1
+        for field, key in ROLLUP_FIELDS.items():
+            increments[field] += match[key]
+    return increments
+
+
+def record_daily_stats(user, increments, day=None):
+    """
+    Suma `increments` a la fila del día (la crea si no existe) en una sola consulta.
+    """
+    day = day or timezone.localdate()
+    fields = list(increments)
+    table = connection.ops.quote_name(DailyUserStats._meta.db_table)
+    columns = ', '.join(connection.ops.quote_name(field) for field in fields)
+    updates = ', '.join(
+        f'{connection.ops.quote_name(field)} = {table}.{connection.ops.quote_name(field)} + EXCLUDED.{connection.ops.quote_name(field)}'
+        for field in fields
+    )
+    placeholders = ', '.join(['%s'] * (len(fields) + 2))
+    sql = (
+        f'INSERT INTO {table} ("user_id", "day", {columns}) VALUES ({placeholders}) '
+        f'ON CONFLICT ("user_id", "day") DO UPDATE SET {updates}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user.id, day] + [increments[field] for field in fields])
+
+
+def _aggregate_by_day(history, since=None):
+    if since:
+        history = history.filter(played_at__date__gte=since)
+    return (
+        history.annotate(day=TruncDate('played_at'))
+        .values('user_id', 'day')
+        .annotate(matches=Count('id'), **{field: Sum(source) for field, source in HISTORY_FIELDS.items()})
+        .order_by()
+    )
+
+
+def rebuild_daily_stats(since=None):
+    """
+    Regenera DailyUserStats desde GameHistory + ArchivedGameHistory (desde el día `since`, o todo).
+    Devuelve la cantidad de filas escritas.
+    """
+    rollups = DailyUserStats.objects.all()
+    if since:
+        rollups = rollups.filter(day__gte=since)
+
+    totals = {}
+    for history in (GameHistory.objects.all(), ArchivedGameHistory.objects.all()):
+        for row in _aggregate_by_day(history, since).iterator(chunk_size=5000):
+            key = (row.pop('user_id'), row.pop('day'))
+            current = totals.setdefault(key, dict.fromkeys(row, 0))
+            for field, value in row.items():
+                current[field] += value or 0
+
+    with transaction.atomic():
+        rollups.delete()
+        DailyUserStats.objects.bulk_create(
+            [DailyUserStats(user_id=user_id, day=day, **values) for (user_id, day), values in totals.items()],
+            batch_size=5000
+        )
+    return len(totals)
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- LEADERBOARDS POR VENTANA ---
+# * --------------------------------------------------------------------------------------------------
+def window_start(window, today=None):
+    """
+    Primer día de la ventana actual: hoy, lunes de esta semana o día 1 del mes.
+    """
+    today = today or timezone.localdate()
+    if window == 'day':
+        return today
+    if window == 'week':
+        return today - timedelta(days=today.weekday())
+    if window == 'month':
+        return today.replace(day=1)
+    raise ValueError(f"Ventana inválida: {window}")
+
+
+def window_score_expression():
+    # Mismo criterio que performance_score, sin el término de palabras desbloqueadas
+    total = F('window_total_questions')
+    return (
+        Cast('window_xp', FloatField())
+        + Cast('window_correct', FloatField()) / (total + UserStats.ACCURACY_PRIOR) * total * UserStats.QUESTION_POINTS
+    )
+
+
+def windowed_leaderboard_queryset(window, user_ids=None):
+    rows = DailyUserStats.objects.filter(day__gte=window_start(window))
+    if user_ids is not None:
+        rows = rows.filter(user_id__in=user_ids)
+    return (
+        rows.values('user_id', 'user__username')
+        .annotate(
+            window_matches=Sum('matches'),
+            window_score=Sum('score'),
+            window_xp=Sum('xp_earned'),
+            window_correct=Sum('correct_answers'),
+            window_total_questions=Sum('total_questions'),
+            window_time=Sum('time_spent_seconds'),
+        )
+        .annotate(window_performance=window_score_expression())
+        .order_by('-window_performance', 'user_id')
+    )
+
+
+def windowed_entry(row, rank=None):
+    true_accuracy = UserStats.true_accuracy(row['window_correct'], row['window_total_questions'])
+    entry = {
+        'user_id': row['user_id'],
+        'user_username': row['user__username'],
+        'matches': row['window_matches'],
+        'score': row['window_score'],
+        'experience': row['window_xp'],
+        'time_spent_seconds': row['window_time'],
+        'true_accuracy': round(true_accuracy * 100, 1) if true_accuracy else 0,
+        'performance_score': round(row['window_performance']) if row['window_performance'] else 0
+    }
+    if rank is not None:
+        entry['rank'] = rank
+    return entry
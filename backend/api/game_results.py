@@ -0,0 +1,398 @@
+from api.models import Word, UserStats, GameHistory, ArchivedGameHistory, GameEvaluation
+from api.badge_unlock_logic import check_and_unlock_badges
+from api.word_sampler import add_unlocked_words
+from api.unlocked_words import unlock_words
+from api.leaderboard import performance_score_expression
+from api.daily_stats import daily_increments, record_daily_stats
+from django.db import transaction, IntegrityError
+from django.db.models import F, Q, Case, When, Value, Count, IntegerField
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from datetime import timedelta
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- MOTOR DE ESCRITURA DE RESULTADOS DE PARTIDA ---
+# * --------------------------------------------------------------------------------------------------
+WORD_TYPES = ("SLANG", "IDIOM", "PHRASAL_VERB", "VOCABULARY")
+
+# Contadores de UserStats que suben por cada palabra vista / acertada de cada tipo
+SEEN_COUNTERS = {
+    "SLANG": ('slangs_seen',),
+    "PHRASAL_VERB": ('phrasal_verbs_seen',),
+}
+CORRECT_COUNTERS = {
+    "SLANG": ('slangs_learned', 'correct_slangs'),
+    "IDIOM": ('idioms_learned',),
+    "PHRASAL_VERB": ('phrasal_verbs_learned', 'correct_phrasal_verbs'),
+    "VOCABULARY": ('vocabulary_learned',),
+}
+
+# Entradas de badges que una partida puede modificar (ver badge_unlock_logic)
+MATCH_CHANGED_FIELDS = (
+    'experience', 'words_seen_total', 'slangs_seen', 'phrasal_verbs_seen',
+    'correct_answers_total', 'total_questions_answered', 'correct_slangs', 'correct_phrasal_verbs',
+    'total_letters_killed', 'total_bosses_killed', 'total_time_played_seconds',
+    'current_streak', 'longest_streak', 'slangs_learned', 'idioms_learned',
+    'phrasal_verbs_learned', 'vocabulary_learned', 'unlocked_words', 'latest_game',
+)
+
+
+MAX_BATCH_MATCHES = 50
+
+
+class InvalidMatchPayload(ValueError):
+    pass
+
+
+def _int_field(data, key):
+    try:
+        return int(data.get(key) or 0)
+    except (TypeError, ValueError):
+        raise InvalidMatchPayload(f"'{key}' debe ser un número entero.")
+
+
+def _id_list(data, key):
+    ids = data.get(key) or []
+    if not isinstance(ids, (list, tuple)):
+        raise InvalidMatchPayload(f"'{key}' debe ser una lista de ids.")
+    try:
+        return {int(word_id) for word_id in ids}
+    except (TypeError, ValueError):
+        raise InvalidMatchPayload(f"'{key}' debe ser una lista de ids.")
+
+
+def parse_match_payload(data):
+    """
+    Normaliza el payload que envía el cliente (Godot / React) al final de una partida.
+    """
+    return {
+        'score': _int_field(data, 'score'),
+        'xp_earned': _int_field(data, 'xp_earned'),
+        'correct_answers': _int_field(data, 'correct_answers'),
+        'total_questions': _int_field(data, 'total_questions'),
+        'game_mode': data.get('game_mode', 'SURVIVOR'),
+        'time_spent': _int_field(data, 'time_spent'),
+        'letters_killed': _int_field(data, 'letters_killed'),
+        'bosses_killed': _int_field(data, 'bosses_killed'),
+        'seen_word_ids': _id_list(data, 'seen_word_ids'),
+        'correct_word_ids': _id_list(data, 'correct_word_ids'),
+        'ai_evaluation': data.get('ai_evaluation', None),
+        'match_id': _match_id(data),
+        'played_at': _played_at(data),
+    }
+
+
+def _played_at(data):
+    """
+    Momento en que se jugó la partida (ISO 8601, opcional; las partidas sin conexión llegan después).
+    Sin zona horaria se toma la del servidor; una fecha futura se recorta a ahora.
+    """
+    now = timezone.now()
+    value = data.get('played_at')
+    if value in (None, ''):
+        return now
+    try:
+        played_at = parse_datetime(str(value))
+    except ValueError:
+        played_at = None
+    if played_at is None:
+        raise InvalidMatchPayload("'played_at' debe ser una fecha ISO 8601.")
+    if timezone.is_naive(played_at):
+        played_at = timezone.make_aware(played_at)
+    return min(played_at, now)
+
+
+def _match_id(data):
+    match_id = data.get('match_id')
+    if match_id in (None, ''):
+        return None
+    match_id = str(match_id)
+    if len(match_id) > 64:
+        raise InvalidMatchPayload("'match_id' no puede superar los 64 caracteres.")
+    return match_id
+
+
+def match_breakdown_for(seen_word_ids, correct_word_ids):
+    """
+    Conteo por tipo de palabras vistas y acertadas en una sola consulta agrupada.
+    """
+    match_breakdown = {
+        "seen": {word_type: 0 for word_type in WORD_TYPES},
+        "correct": {word_type: 0 for word_type in WORD_TYPES},
+    }
+    if not seen_word_ids and not correct_word_ids:
+        return match_breakdown
+
+    rows = (
+        Word.objects.filter(id__in=seen_word_ids | correct_word_ids)
+        .values('word_type')
+        .annotate(
+            seen=Count('id', filter=Q(id__in=seen_word_ids)),
+            correct=Count('id', filter=Q(id__in=correct_word_ids)),
+        )
+    )
+    for row in rows:
+        if row['word_type'] in match_breakdown["seen"]:
+            match_breakdown["seen"][row['word_type']] = row['seen']
+            match_breakdown["correct"][row['word_type']] = row['correct']
+    return match_breakdown
+
+
+def match_breakdown_from_types(match, word_types):
+    """
+    Igual que match_breakdown_for, pero a partir de un mapa id -> word_type ya cargado
+    (usado por el ingreso por lotes para resolver todas las partidas con una sola consulta).
+    """
+    match_breakdown = {
+        "seen": {word_type: 0 for word_type in WORD_TYPES},
+        "correct": {word_type: 0 for word_type in WORD_TYPES},
+    }
+    for key, ids in (("seen", match['seen_word_ids']), ("correct", match['correct_word_ids'])):
+        for word_id in ids:
+            word_type = word_types.get(word_id)
+            if word_type in match_breakdown[key]:
+                match_breakdown[key][word_type] += 1
+    return match_breakdown
+
+
+def stats_increments(match, match_breakdown, increments=None):
+    """
+    Incrementos de contadores de UserStats que produce una partida: {campo: n}.
+    Si se pasa `increments`, se acumulan sobre él (varias partidas en un solo UPDATE).
+    """
+    increments = {} if increments is None else increments
+    for field, amount in (
+        ('matches_played', 1),
+        ('experience', match['xp_earned']),
+        ('total_questions_answered', match['total_questions']),
+        ('correct_answers_total', match['correct_answers']),
+        ('total_letters_killed', match['letters_killed']),
+        ('total_bosses_killed', match['bosses_killed']),
+        ('total_time_played_seconds', match['time_spent']),
+        ('words_seen_total', sum(match_breakdown["seen"].values())),
+    ):
+        increments[field] = increments.get(field, 0) + amount
+    for word_type, fields in SEEN_COUNTERS.items():
+        for field in fields:
+            increments[field] = increments.get(field, 0) + match_breakdown["seen"][word_type]
+    for word_type, fields in CORRECT_COUNTERS.items():
+        for field in fields:
+            increments[field] = increments.get(field, 0) + match_breakdown["correct"][word_type]
+    return increments
+
+
+def game_history_for(user, match, match_breakdown):
+    return GameHistory(
+        user=user,
+        score=match['score'],
+        correct_in_game=match['correct_answers'],
+        total_questions_in_game=match['total_questions'],
+        game_mode=match['game_mode'],
+        time_spent_seconds=match['time_spent'],
+        match_breakdown=match_breakdown,
+        letters_killed=match['letters_killed'],
+        bosses_killed=match['bosses_killed'],
+        client_match_id=match['match_id'],
+        xp_earned=match['xp_earned'],
+        played_at=match['played_at']
+    )
+
+
+def save_evaluations(pairs):
+    """
+    Guarda en GameEvaluation las evaluaciones de IA de [(GameHistory ya guardada, match)].
+    """
+    evaluations = [
+        GameEvaluation(game=history, ai_evaluation=match['ai_evaluation'])
+        for history, match in pairs if match['ai_evaluation']
+    ]
+    if evaluations:
+        GameEvaluation.objects.bulk_create(evaluations)
+
+
+def apply_stats_increments(user, increments, played_on=None):
+    """
+    Aplica los incrementos y la racha diaria en un único UPDATE ... SET x = x + n.
+    Las expresiones de racha usan los valores previos de la fila, por lo que no hay
+    lectura-modificación-escritura ni pérdida de actualizaciones entre partidas concurrentes.
+    Un día anterior a last_login_date (partida sin conexión que llega tarde) no toca la racha.
+    Devuelve la cantidad de filas actualizadas (0 si el usuario no tiene UserStats).
+    """
+    today = played_on or timezone.localdate()
+    current_streak = Case(
+        When(last_login_date__gte=today, then=F('current_streak')),
+        When(last_login_date=today - timedelta(days=1), then=F('current_streak') + 1),
+        default=Value(1),
+        output_field=IntegerField(),
+    )
+    updates = {field: F(field) + amount for field, amount in increments.items() if amount}
+    updates['current_streak'] = current_streak
+    updates['longest_streak'] = Greatest(F('longest_streak'), current_streak)
+    updates['last_login_date'] = Case(
+        When(last_login_date__gt=today, then=F('last_login_date')),
+        default=Value(today),
+    )
+    return UserStats.objects.filter(user=user).update(**updates)
+
+
+def refresh_leaderboard_fields(stats):
+    """
+    Recalcula performance_score con los contadores ya actualizados (ver api/leaderboard.py).
+    Solo hace falta si la partida no desbloqueó palabras (si no, ya lo hizo la señal).
+    """
+    UserStats.objects.filter(pk=stats.pk).update(performance_score=performance_score_expression())
+
+
+def recorded_match_ids(user, match_ids):
+    """
+    `match_ids` ya registrados por el usuario, en el historial o en el archivo (una sola consulta).
+    """
+    recent = GameHistory.objects.filter(user=user, client_match_id__in=match_ids).values_list('client_match_id', flat=True)
+    archived = ArchivedGameHistory.objects.filter(user=user, client_match_id__in=match_ids).values_list('client_match_id', flat=True)
+    return set(recent.union(archived))
+
+
+def record_game_results(user, data):
+    """
+    Registra una partida terminada: contadores de UserStats, palabras desbloqueadas,
+    GameHistory y badges, todo en una transacción y con un número fijo de consultas
+    (independiente de la cantidad de palabras enviadas).
+    Si la partida trae `match_id` y ya fue registrada, no se vuelve a aplicar.
+    Devuelve (stats, match, match_breakdown, badges desbloqueados, duplicada)
+    o None si no existe UserStats.
+    """
+    match = parse_match_payload(data)
+    if match['match_id'] and recorded_match_ids(user, [match['match_id']]):
+        return _duplicate_result(user, match)
+
+    match_breakdown = match_breakdown_for(match['seen_word_ids'], match['correct_word_ids'])
+    played_on = timezone.localdate(match['played_at'])
+
+    try:
+        with transaction.atomic():
+            if not apply_stats_increments(user, stats_increments(match, match_breakdown), played_on=played_on):
+                return None
+
+            stats = UserStats.objects.get(user=user)
+            new_words = 0
+            if match['correct_word_ids']:
+                correct_ids = list(Word.objects.filter(id__in=match['correct_word_ids']).values_list('id', flat=True))
+                new_words = unlock_words(stats, correct_ids)
+                unlocked_count = stats.unlocked_words_count
+                transaction.on_commit(lambda: add_unlocked_words(user.id, correct_ids, unlocked_count, new_words))
+
+            history = game_history_for(user, match, match_breakdown)
+            history.save()
+            save_evaluations([(history, match)])
+            record_daily_stats(user, daily_increments([match]), day=played_on)
+
+            newly_unlocked = check_and_unlock_badges(user, changed_fields=MATCH_CHANGED_FIELDS, user_stats=stats)
+            if not new_words:
+                refresh_leaderboard_fields(stats)
+            if newly_unlocked:
+                stats.refresh_from_db(fields=['experience'])
+    except IntegrityError:
+        # Otro request registró la misma partida al mismo tiempo (unique_client_match_per_user)
+        if match['match_id']:
+            return _duplicate_result(user, match)
+        raise
+
+    return stats, match, match_breakdown, newly_unlocked, False
+
+
+def _duplicate_result(user, match):
+    stats = UserStats.objects.filter(user=user).first()
+    if stats is None:
+        return None
+    match_breakdown = (
+        GameHistory.objects.filter(user=user, client_match_id=match['match_id']).values_list('match_breakdown', flat=True).first()
+        or ArchivedGameHistory.objects.filter(user=user, client_match_id=match['match_id']).values_list('match_breakdown', flat=True).first()
+    )
+    return stats, match, match_breakdown or {}, [], True
+
+
+def record_game_results_batch(user, payloads):
+    """
+    Ingreso por lotes de partidas jugadas sin conexión (Godot). Cada partida debe traer
+    un `match_id` generado por el cliente; las ya registradas se ignoran (idempotente).
+    Todas las partidas nuevas se insertan con un bulk_create, los contadores se aplican
+    en un UPDATE por día jugado (`played_at`) y los badges se evalúan una vez por lote.
+    Devuelve (stats, ids aceptados, ids duplicados, badges desbloqueados) o None si no existe UserStats.
+    """
+    if not isinstance(payloads, list) or not payloads:
+        raise InvalidMatchPayload("Se esperaba una lista de partidas.")
+    if len(payloads) > MAX_BATCH_MATCHES:
+        raise InvalidMatchPayload(f"Un lote admite como máximo {MAX_BATCH_MATCHES} partidas.")
+
+    matches = {}
+    duplicates = []
+    for position, data in enumerate(payloads):
+        if not isinstance(data, dict):
+            raise InvalidMatchPayload(f"Partida {position}: formato inválido.")
+        try:
+            match = parse_match_payload(data)
+        except InvalidMatchPayload as e:
+            raise InvalidMatchPayload(f"Partida {position}: {e}")
+        if not match['match_id']:
+            raise InvalidMatchPayload(f"Partida {position}: 'match_id' es requerido.")
+        if match['match_id'] in matches:
+            duplicates.append(match['match_id'])
+            continue
+        matches[match['match_id']] = match
+
+    all_word_ids = set()
+    for match in matches.values():
+        all_word_ids |= match['seen_word_ids'] | match['correct_word_ids']
+    word_types = dict(Word.objects.filter(id__in=all_word_ids).values_list('id', 'word_type')) if all_word_ids else {}
+
+    with transaction.atomic():
+        # Bloquea la fila de UserStats: los lotes del mismo usuario se serializan
+        stats = UserStats.objects.select_for_update().filter(user=user).first()
+        if stats is None:
+            return None
+
+        already_recorded = recorded_match_ids(user, list(matches))
+        duplicates.extend(already_recorded)
+        new_matches = [match for match_id, match in matches.items() if match_id not in already_recorded]
+        if not new_matches:
+            return stats, [], duplicates, []
+
+        # Agrupadas por día jugado: la racha avanza día por día y cada día suma a su fila de DailyUserStats
+        by_day = {}
+        history_rows = []
+        correct_ids = set()
+        for match in new_matches:
+            match_breakdown = match_breakdown_from_types(match, word_types)
+            day_matches, day_increments = by_day.setdefault(timezone.localdate(match['played_at']), ([], {}))
+            day_matches.append(match)
+            stats_increments(match, match_breakdown, day_increments)
+            history_rows.append(game_history_for(user, match, match_breakdown))
+            correct_ids |= {word_id for word_id in match['correct_word_ids'] if word_id in word_types}
+
+        for day in sorted(by_day):
+            day_matches, day_increments = by_day[day]
+            apply_stats_increments(user, day_increments, played_on=day)
+            record_daily_stats(user, daily_increments(day_matches), day=day)
+        GameHistory.objects.bulk_create(history_rows)
+        save_evaluations(zip(history_rows, new_matches))
+        new_words = 0
+        if correct_ids:
+            new_words = unlock_words(stats, correct_ids)
+            unlocked_count = stats.unlocked_words_count
+            transaction.on_commit(lambda: add_unlocked_words(user.id, correct_ids, unlocked_count, new_words))
+
+        stats.refresh_from_db()
+        # Para las condiciones de "una sola partida" cuenta la mejor partida del lote
+        best_game = GameHistory(
+            letters_killed=max(row.letters_killed for row in history_rows),
+            bosses_killed=max(row.bosses_killed for row in history_rows),
+            time_spent_seconds=max(row.time_spent_seconds for row in history_rows),
+        )
+        newly_unlocked = check_and_unlock_badges(user, changed_fields=MATCH_CHANGED_FIELDS, user_stats=stats, latest_game=best_game)
+        if not new_words:
+            refresh_leaderboard_fields(stats)
+        if newly_unlocked:
+            stats.refresh_from_db(fields=['experience'])
+
+    return stats, [match['match_id'] for match in new_matches], duplicates, newly_unlocked
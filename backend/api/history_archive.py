@@ -0,0 +1,58 @@
+from api.models import GameHistory, GameEvaluation, ArchivedGameHistory
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- ARCHIVO DEL HISTORIAL DE PARTIDAS ---
+# * --------------------------------------------------------------------------------------------------
+# GameHistory solo guarda las partidas de los últimos GAME_HISTORY_RETENTION_DAYS días (180 por
+# defecto); archive_game_history mueve las anteriores a ArchivedGameHistory en bloques, cada uno
+# en su propia transacción. Los totales por día ya están en DailyUserStats (se suman al registrar
+# la partida) y UserStats.matches_played sigue contando todas las partidas.
+# ArchivedGameHistory conserva client_match_id: reenviar una partida archivada sigue siendo un duplicado.
+
+DEFAULT_BATCH_SIZE = 5000
+
+ARCHIVED_FIELDS = (
+    'id', 'user_id', 'game_mode', 'played_at', 'score', 'xp_earned', 'correct_in_game', 'total_questions_in_game',
+    'time_spent_seconds', 'letters_killed', 'bosses_killed', 'match_breakdown', 'client_match_id'
+)
+
+
+def retention_days():
+    return getattr(settings, 'GAME_HISTORY_RETENTION_DAYS', 180)
+
+
+def archive_cutoff(days=None):
+    return timezone.now() - timedelta(days=retention_days() if days is None else days)
+
+
+def archive_game_history(cutoff=None, batch_size=DEFAULT_BATCH_SIZE, on_batch=None):
+    """
+    Mueve las partidas jugadas antes de `cutoff` (y su evaluación de IA) a ArchivedGameHistory.
+    `on_batch(archivadas hasta ahora)` se llama tras cada bloque. Devuelve el total archivado.
+    """
+    cutoff = cutoff or archive_cutoff()
+    archived = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                GameHistory.objects.filter(played_at__lt=cutoff)
+                .order_by('id')
+                .values(*ARCHIVED_FIELDS)[:batch_size]
+            )
+            if not rows:
+                return archived
+            ids = [row['id'] for row in rows]
+            evaluations = dict(GameEvaluation.objects.filter(game_id__in=ids).values_list('game_id', 'ai_evaluation'))
+            ArchivedGameHistory.objects.bulk_create(
+                [ArchivedGameHistory(ai_evaluation=evaluations.get(row['id']), **row) for row in rows],
+                ignore_conflicts=True
+            )
+            # GameEvaluation se borra en cascada
+            GameHistory.objects.filter(id__in=ids).delete()
+        archived += len(rows)
+        if on_batch:
+            on_batch(archived)
@@ -0,0 +1,112 @@
+from rest_framework.pagination import BasePagination # pyright: ignore[reportMissingImports]
+from rest_framework.response import Response # pyright: ignore[reportMissingImports]
+from rest_framework.exceptions import NotFound # pyright: ignore[reportMissingImports]
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- PAGINACIÓN POR CURSOR (KEYSET) DEL HISTORIAL ---
+# * --------------------------------------------------------------------------------------------------
+# Las páginas se piden con ?cursor=<opaco>, que guarda (played_at, id) de la última fila vista.
+# La consulta es un WHERE (played_at, id) < (x, y) sobre el índice (user, -played_at, -id),
+# así la página 1000 cuesta lo mismo que la primera. El total (`count`) lo pasa la vista: son solo
+# las partidas listables (las archivadas no aparecen en el historial, ver api/history_archive.py).
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(direction, row):
+    raw = f'{direction}|{row.played_at.isoformat()}|{row.id}'
+    return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Cursor -> (dirección, played_at, id). Lanza ValueError si no es válido.
+    """
+    try:
+        raw = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        direction, played_at, row_id = raw.split('|')
+        played_at = parse_datetime(played_at)
+        row_id = int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Cursor inválido")
+    if direction not in (NEXT, PREVIOUS) or played_at is None:
+        raise ValueError("Cursor inválido")
+    return direction, played_at, row_id
+
+
+class GameHistoryCursorPagination(BasePagination):
+    """
+    Historial más reciente primero. Respuesta: {count, next, previous, next_cursor, previous_cursor, results}.
+    El frontend usa los cursores: los links absolutos salen como http:// detrás del proxy TLS.
+    La vista puede definir get_history_total() para el `count`.
+    """
+    page_size = 5
+    page_size_query_param = 'limit'
+    max_page_size = 50
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None, total=None):
+        self.request = request
+        self.total = view.get_history_total() if total is None and hasattr(view, 'get_history_total') else total
+        size = self.get_page_size(request)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        direction = NEXT
+        if cursor:
+            try:
+                direction, played_at, row_id = decode_cursor(cursor)
+            except ValueError as e:
+                raise NotFound(str(e))
+            if direction == NEXT:
+                queryset = queryset.filter(Q(played_at__lt=played_at) | Q(played_at=played_at, id__lt=row_id))
+            else:
+                queryset = queryset.filter(Q(played_at__gt=played_at) | Q(played_at=played_at, id__gt=row_id))
+
+        if direction == NEXT:
+            rows = list(queryset.order_by('-played_at', '-id')[:size + 1])
+            has_more = len(rows) > size
+            rows = rows[:size]
+            has_next, has_previous = has_more, bool(cursor)
+        else:
+            rows = list(queryset.order_by('played_at', 'id')[:size + 1])
+            has_more = len(rows) > size
+            rows = rows[:size][::-1]
+            has_next, has_previous = True, has_more
+
+        self.next_cursor = encode_cursor(NEXT, rows[-1]) if has_next and rows else None
+        self.previous_cursor = encode_cursor(PREVIOUS, rows[0]) if has_previous and rows else None
+        return rows
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        params = self.request.query_params.copy()
+        params[self.cursor_query_param] = cursor
+        return self.request.build_absolute_uri(f'{self.request.path}?{params.urlencode()}')
+
+    def get_next_link(self):
+        return self._link(self.next_cursor)
+
+    def get_previous_link(self):
+        return self._link(self.previous_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.total,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'next_cursor': self.next_cursor,
+            'previous_cursor': self.previous_cursor,
+            'results': data
+        })
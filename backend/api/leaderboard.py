@@ -0,0 +1,66 @@
+from api.models import UserStats
+from api.levels import level_expression
+from django.db.models import F, Q, FloatField
+from django.db.models.functions import Cast
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- LEADERBOARD MATERIALIZADA ---
+# * --------------------------------------------------------------------------------------------------
+# UserStats guarda performance_score (y unlocked_words_count, ver api/user_counters.py); los
+# escritores (submit de partidas, recompensas de badges, backfill) lo recalculan con
+# performance_score_expression() en el mismo UPDATE que ya hacen. Así la leaderboard es una
+# lectura por el índice (-performance_score, id).
+
+LEADERBOARD_ORDER = ('-performance_score', 'id')
+
+
+def performance_score_expression(unlocked_delta=0):
+    """
+    UserStats.compute_performance_score como expresión SQL. `unlocked_delta` suma palabras
+    desbloqueadas en el mismo UPDATE (que todavía ve el valor anterior de unlocked_words_count).
+    """
+    total = F('total_questions_answered')
+    return (
+        Cast('experience', FloatField())
+        + (F('unlocked_words_count') + unlocked_delta) * UserStats.UNLOCKED_WORD_POINTS
+        + Cast('correct_answers_total', FloatField()) / (total + UserStats.ACCURACY_PRIOR) * total * UserStats.QUESTION_POINTS
+    )
+
+
+def refresh_performance_scores(queryset):
+    """
+    Recalcula performance_score de las filas de `queryset` con un solo UPDATE.
+    """
+    return queryset.update(performance_score=performance_score_expression())
+
+
+def leaderboard_queryset():
+    return UserStats.objects.select_related('user').annotate(level=level_expression()).order_by(*LEADERBOARD_ORDER)
+
+
+def rank_of(stats):
+    """
+    Posición (1 = primero) contando solo las filas por delante en el índice, sin recorrer a todos.
+    """
+    ahead = UserStats.objects.filter(
+        Q(performance_score__gt=stats.performance_score)
+        | Q(performance_score=stats.performance_score, id__lt=stats.id)
+    ).count()
+    return ahead + 1
+
+
+def leaderboard_entry(stat, rank=None):
+    true_accuracy = UserStats.true_accuracy(stat.correct_answers_total, stat.total_questions_answered)
+    entry = {
+        'id': stat.id,
+        'user_username': stat.user.username,
+        'level': getattr(stat, 'level', None) or stat.get_level(),
+        'experience': stat.experience,
+        'current_streak': stat.current_streak,
+        'unlocked_count': stat.unlocked_words_count,
+        'true_accuracy': round(true_accuracy * 100, 1) if true_accuracy else 0,
+        'performance_score': round(stat.performance_score) if stat.performance_score else 0
+    }
+    if rank is not None:
+        entry['rank'] = rank
+    return entry
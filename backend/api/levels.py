@@ -0,0 +1,35 @@
+from django.db.models import F, Value, IntegerField
+from django.db.models.functions import Cast, Floor, Greatest, Sqrt
+from math import isqrt
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- NIVELES ---
+# * --------------------------------------------------------------------------------------------------
+# Curva: el nivel L empieza en 50 * L * (L - 1) XP (1 -> 0, 2 -> 100, 3 -> 300, 4 -> 600).
+# Despejando, el nivel de `xp` es el mayor L con L * (L - 1) <= xp // 50:
+#     L = (1 + isqrt(1 + 4 * (xp // 50))) // 2
+# level_expression() es la misma cuenta en SQL, para anotar/filtrar/ordenar por nivel.
+
+XP_PER_LEVEL_STEP = 50
+
+
+def xp_for_level(level):
+    """
+    XP total necesaria para llegar a `level`.
+    """
+    if level <= 0:
+        return 0
+    return XP_PER_LEVEL_STEP * level * (level - 1)
+
+
+def level_for_xp(xp):
+    steps = max(xp, 0) // XP_PER_LEVEL_STEP
+    return (1 + isqrt(1 + 4 * steps)) // 2
+
+
+def level_expression(field='experience'):
+    """
+    level_for_xp(`field`) como expresión SQL (división entera + SQRT + FLOOR).
+    """
+    steps = Greatest(F(field), Value(0)) / Value(XP_PER_LEVEL_STEP)
+    return Cast(Floor((Sqrt(Value(1.0) + steps * 4) + 1) / 2), IntegerField())
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.history_archive import archive_game_history, archive_cutoff, retention_days, DEFAULT_BATCH_SIZE
+from api.models import GameHistory
+
+
+class Command(BaseCommand):
+    help = "Mueve las partidas más viejas que la retención configurada a ArchivedGameHistory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help="Días de historial a conservar (por defecto GAME_HISTORY_RETENTION_DAYS)")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Partidas movidas por transacción")
+        parser.add_argument('--dry-run', action='store_true', help="Solo cuenta las partidas que se archivarían")
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else retention_days()
+        if days < 0:
+            raise CommandError("--days no puede ser negativo")
+        cutoff = archive_cutoff(days)
+
+        if options['dry_run']:
+            pending = GameHistory.objects.filter(played_at__lt=cutoff).count()
+            self.stdout.write(f"Se archivarían {pending} partidas anteriores a {cutoff:%Y-%m-%d %H:%M}.")
+            return
+
+        archived = archive_game_history(
+            cutoff=cutoff,
+            batch_size=options['batch_size'],
+            on_batch=lambda total: self.stdout.write(f"  {total} partidas archivadas...")
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archivo completado: {archived} partidas anteriores a {cutoff:%Y-%m-%d}."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.models import Badge
+from api.badge_backfill import backfill_badge, DEFAULT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Otorga badges (y sus recompensas) a todos los usuarios que ya cumplen sus condiciones."
+
+    def add_arguments(self, parser):
+        parser.add_argument('badge_ids', nargs='*', type=int, help="IDs de los badges a procesar (todos si se omite)")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Usuarios procesados por transacción")
+
+    def handle(self, *args, **options):
+        badges = Badge.objects.all().order_by('id')
+        if options['badge_ids']:
+            badges = badges.filter(id__in=options['badge_ids'])
+            missing = set(options['badge_ids']) - set(badges.values_list('id', flat=True))
+            if missing:
+                raise CommandError(f"Badges no encontrados: {sorted(missing)}")
+
+        total = 0
+        for badge in badges:
+            granted = backfill_badge(badge, chunk_size=options['chunk_size'])
+            total += granted
+            self.stdout.write(f"{badge.title}: otorgado a {granted} usuarios")
+
+        self.stdout.write(self.style.SUCCESS(f"Backfill completado: {total} badges otorgados."))
@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, close_old_connections
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from api.models import User, Word, UserStats, GameHistory
+from api.game_results import record_game_results
+from concurrent.futures import ThreadPoolExecutor
+import time
+import uuid
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark del motor de submit_game_results: muchas partidas concurrentes para el mismo usuario. "
+        "Reporta partidas/segundo, consultas por partida y verifica que no se pierdan incrementos. "
+        "Usar contra PostgreSQL; SQLite serializa las escrituras."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--matches', type=int, default=200, help="Partidas totales a enviar")
+        parser.add_argument('--threads', type=int, default=8, help="Envíos concurrentes")
+        parser.add_argument('--words', type=int, default=20, help="Palabras vistas por partida")
+
+    def handle(self, *args, **options):
+        word_ids = list(Word.objects.values_list('id', flat=True)[:options['words']])
+        suffix = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(username=f'bench_{suffix}', email=f'bench_{suffix}@misspelt.local')
+        payload = {
+            'score': 100,
+            'xp_earned': 10,
+            'correct_answers': 1,
+            'total_questions': 2,
+            'time_spent': 30,
+            'letters_killed': 5,
+            'bosses_killed': 0,
+            'seen_word_ids': word_ids,
+            'correct_word_ids': word_ids[: len(word_ids) // 2],
+        }
+
+        try:
+            with CaptureQueriesContext(connection) as ctx:
+                record_game_results(user, payload)
+            self.stdout.write(f"Consultas por partida: {len(ctx.captured_queries)} ({len(word_ids)} palabras)")
+
+            def submit(_):
+                close_old_connections()
+                try:
+                    return record_game_results(user, payload) is not None
+                except Exception as e:
+                    self.stderr.write(f"Error en partida: {e}")
+                    return False
+                finally:
+                    connection.close()
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+                results = list(pool.map(submit, range(options['matches'])))
+            elapsed = time.perf_counter() - start
+
+            ok = results.count(True)
+            stats = UserStats.objects.get(user=user)
+            # XP de las partidas registradas + la de los badges ganados (sus recompensas también suman experience)
+            history_xp = GameHistory.objects.filter(user=user).aggregate(total=Sum('xp_earned'))['total'] or 0
+            badge_xp = sum(
+                badge.reward_data.get('exp', 0) for badge in stats.badges.all() if isinstance(badge.reward_data, dict)
+            )
+            expected_xp = history_xp + badge_xp
+            self.stdout.write(
+                f"{ok}/{options['matches']} partidas OK en {elapsed:.2f}s "
+                f"({ok / elapsed:.1f} partidas/s, {options['threads']} hilos)"
+            )
+            if stats.experience == expected_xp:
+                self.stdout.write(self.style.SUCCESS(f"Sin actualizaciones perdidas: experience = {stats.experience}"))
+            else:
+                self.stdout.write(self.style.ERROR(f"Actualizaciones perdidas: experience = {stats.experience}, esperado {expected_xp}"))
+        finally:
+            user.delete()
@@ -0,0 +1,130 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from api.models import User, Word, UserStats
+from api.unlocked_words import WordBitmap
+import random
+import time
+import uuid
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el M2M de palabras desbloqueadas con los bitmaps de UserStats: tamaño en disco y "
+        "latencia de pertenencia, conteo e intersección. Los datos se crean dentro de una transacción que se revierte."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000, help="Usuarios sintéticos")
+        parser.add_argument('--words', type=int, default=20000, help="Palabras del catálogo sintético")
+        parser.add_argument('--per-user', type=int, default=2000, help="Palabras desbloqueadas por usuario")
+        parser.add_argument('--repeat', type=int, default=200, help="Repeticiones por operación")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            stats_ids, word_ids = self._populate(options['users'], options['words'], min(options['per_user'], options['words']))
+            self._report_storage(stats_ids)
+            self._report_latency(stats_ids, word_ids, options['repeat'])
+            transaction.set_rollback(True)
+
+    def _populate(self, users, words, per_user):
+        rng = random.Random(users * words)
+        suffix = uuid.uuid4().hex[:8]
+        first_word = Word.objects.count()
+        Word.objects.bulk_create([
+            Word(text=f'bench_{suffix}_{i}', translation='-', definition='-', word_type=Word.WordType.SLANG)
+            for i in range(words)
+        ], batch_size=2000)
+        word_ids = list(Word.objects.filter(text__startswith=f'bench_{suffix}_').values_list('id', flat=True))
+
+        # bulk_create no dispara post_save: UserStats se crea a mano
+        User.objects.bulk_create([
+            User(username=f'bench_{suffix}_{i}', email=f'bench_{suffix}_{i}@misspelt.local') for i in range(users)
+        ], batch_size=2000)
+        user_ids = User.objects.filter(username__startswith=f'bench_{suffix}_').values_list('id', flat=True)
+        UserStats.objects.bulk_create([UserStats(user_id=user_id) for user_id in user_ids], batch_size=2000)
+        stats_ids = list(UserStats.objects.filter(user_id__in=user_ids).values_list('id', flat=True))
+
+        through = UserStats.unlocked_words.through
+        to_update = []
+        for stats_id in stats_ids:
+            unlocked = rng.sample(word_ids, per_user)
+            through.objects.bulk_create([through(userstats_id=stats_id, word_id=word_id) for word_id in unlocked], batch_size=5000)
+            to_update.append(UserStats(id=stats_id, unlocked_words_bitmap=WordBitmap.from_ids(unlocked).to_bytes()))
+        UserStats.objects.bulk_update(to_update, ['unlocked_words_bitmap'], batch_size=2000)
+
+        self.stdout.write(f"{len(stats_ids)} usuarios, {len(word_ids)} palabras nuevas ({first_word} previas), {per_user} desbloqueadas por usuario")
+        return stats_ids, word_ids
+
+    def _report_storage(self, stats_ids):
+        through = UserStats.unlocked_words.through
+        rows = through.objects.filter(userstats_id__in=stats_ids).count()
+        bitmap_bytes = sum(
+            len(data) for data in
+            UserStats.objects.filter(id__in=stats_ids).values_list('unlocked_words_bitmap', flat=True).iterator(chunk_size=2000)
+        )
+        self.stdout.write("\nAlmacenamiento")
+        self.stdout.write(f"  bitmaps     {bitmap_bytes / 1024:10.1f} KB (datos)")
+
+        table_bytes = self._table_size(through._meta.db_table)
+        if table_bytes is None:
+            self.stdout.write(f"  M2M         {rows} filas (el tamaño en disco solo se mide en PostgreSQL o SQLite con dbstat)")
+        else:
+            self.stdout.write(f"  M2M         {table_bytes / 1024:10.1f} KB (tabla + índices, {rows} filas)")
+
+    def _table_size(self, table):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute("SELECT pg_total_relation_size(%s)", [table])
+                return cursor.fetchone()[0]
+            if connection.vendor == 'sqlite':
+                try:
+                    cursor.execute(
+                        "SELECT SUM(pgsize) FROM dbstat WHERE name = %s "
+                        "OR name IN (SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s)",
+                        [table, table]
+                    )
+                except Exception:
+                    return None
+                return cursor.fetchone()[0]
+        return None
+
+    def _report_latency(self, stats_ids, word_ids, repeat):
+        rng = random.Random(repeat)
+        through = UserStats.unlocked_words.through
+        catalog = WordBitmap.from_ids(word_ids)
+        samples = [(rng.choice(stats_ids), rng.choice(word_ids), rng.choice(stats_ids)) for _ in range(repeat)]
+
+        def load(stats_id):
+            return WordBitmap(UserStats.objects.filter(id=stats_id).values_list('unlocked_words_bitmap', flat=True).first())
+
+        operations = {
+            'pertenencia': (
+                lambda s, w, o: through.objects.filter(userstats_id=s, word_id=w).exists(),
+                lambda s, w, o: w in load(s),
+            ),
+            'conteo': (
+                lambda s, w, o: through.objects.filter(userstats_id=s).count(),
+                lambda s, w, o: len(load(s)),
+            ),
+            'intersección': (
+                lambda s, w, o: len(set(through.objects.filter(userstats_id=s).values_list('word_id', flat=True))
+                                    & set(through.objects.filter(userstats_id=o).values_list('word_id', flat=True))),
+                lambda s, w, o: len(load(s) & load(o)),
+            ),
+            'vs catálogo': (
+                lambda s, w, o: through.objects.filter(userstats_id=s, word_id__in=word_ids).count(),
+                lambda s, w, o: len(load(s) & catalog),
+            ),
+        }
+
+        self.stdout.write("\nLatencia (ms por operación, incluye la consulta)")
+        self.stdout.write(f"  {'operación':<14} {'M2M':>10} {'bitmap':>10}")
+        for name, (m2m, bitmap) in operations.items():
+            elapsed = [self._time(run, samples) for run in (m2m, bitmap)]
+            self.stdout.write(f"  {name:<14} {elapsed[0] * 1000:10.3f} {elapsed[1] * 1000:10.3f}")
+
+    def _time(self, run, samples):
+        start = time.perf_counter()
+        for sample in samples:
+            run(*sample)
+        return (time.perf_counter() - start) / len(samples)
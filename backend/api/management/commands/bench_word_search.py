@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.models import Word
+from api.word_search import search_words, get_search_backend, IContainsSearchBackend
+import random
+import string
+import time
+
+SAMPLE_TERMS = ['give', 'give up', 'break', 'cool', 'hang out', 'xyz', 'ta']
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el backend de búsqueda de palabras (FTS/trigram) con icontains sobre diccionarios "
+        "sintéticos de distintos tamaños. Las palabras se crean dentro de una transacción que se revierte."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000], help="Cantidades de palabras a probar")
+        parser.add_argument('--repeat', type=int, default=20, help="Repeticiones por término")
+        parser.add_argument('--page-size', type=int, default=20, help="Resultados por página (como el diccionario)")
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        self.stdout.write(f"Backend activo: {backend.name}")
+
+        for size in options['sizes']:
+            with transaction.atomic():
+                self._populate(size)
+                self.stdout.write(f"\n{Word.objects.count()} palabras")
+                for current in (IContainsSearchBackend(), backend):
+                    elapsed = self._run(current, options['repeat'], options['page_size'])
+                    self.stdout.write(f"  {current.name:<12} {elapsed * 1000:8.2f} ms por búsqueda (count + página)")
+                transaction.set_rollback(True)
+
+    def _populate(self, size):
+        rng = random.Random(size)
+        common = ['give', 'up', 'break', 'down', 'cool', 'hang', 'out', 'take', 'off', 'spill', 'tea', 'ghost']
+
+        def noise():
+            return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+
+        # Vocabulario grande con unas pocas palabras frecuentes, como un diccionario real
+        vocabulary = common + [noise() for _ in range(5000)]
+
+        def phrase(n):
+            return ' '.join(rng.choice(vocabulary) for _ in range(n))
+
+        Word.objects.bulk_create([
+            Word(
+                text=f'{phrase(2)} {noise()} {i}',
+                translation=phrase(2),
+                definition=f'{phrase(12)} {noise()}',
+                word_type=Word.WordType.SLANG,
+                difficulty_level=rng.randint(1, 10),
+            )
+            for i in range(size)
+        ], batch_size=2000)
+
+    def _run(self, backend, repeat, page_size):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for term in SAMPLE_TERMS:
+                queryset = search_words(Word.objects.all(), term, backend=backend)
+                queryset.count()
+                list(queryset.values_list('id', flat=True)[:page_size])
+        return (time.perf_counter() - start) / (repeat * len(SAMPLE_TERMS))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.unlocked_words import convert_to_bitmap, convert_to_m2m, storage_mode, M2M, BITMAP, DEFAULT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia las palabras desbloqueadas entre el M2M y los bitmaps de UserStats. "
+        "Después hay que fijar UNLOCKED_WORDS_STORAGE al modo de destino."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--to', choices=[BITMAP, M2M], required=True, help="Modo de destino")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Usuarios procesados por transacción")
+        parser.add_argument('--drop-m2m', action='store_true', help="Con --to bitmap: borra las filas del M2M ya copiadas")
+
+    def handle(self, *args, **options):
+        if options['drop_m2m'] and options['to'] != BITMAP:
+            raise CommandError("--drop-m2m solo se usa con --to bitmap")
+
+        progress = lambda processed: self.stdout.write(f"  {processed} usuarios...")
+        if options['to'] == BITMAP:
+            processed = convert_to_bitmap(options['chunk_size'], drop_m2m=options['drop_m2m'], on_chunk=progress)
+        else:
+            processed = convert_to_m2m(options['chunk_size'], on_chunk=progress)
+
+        self.stdout.write(self.style.SUCCESS(f"Conversión a '{options['to']}' completada: {processed} usuarios."))
+        if storage_mode() != options['to']:
+            self.stdout.write(self.style.WARNING(f"UNLOCKED_WORDS_STORAGE sigue en '{storage_mode()}'."))
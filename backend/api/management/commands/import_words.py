@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.models import WordImportJob
+from api.word_import import import_words, fail_stale_import_jobs, DEFAULT_CHUNK_SIZE
+import os
+
+
+class Command(BaseCommand):
+    help = "Importa palabras desde un CSV (mismo formato que words/import_csv/) en bloques, mostrando el progreso."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Ruta del archivo CSV")
+        parser.add_argument('--upsert', action='store_true', help="Actualiza las palabras existentes en lugar de omitirlas")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Filas por transacción")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f"No existe el archivo {path}")
+        stale = fail_stale_import_jobs()
+        if stale:
+            self.stdout.write(self.style.WARNING(f"{stale} importaciones web sin avances marcadas como fallidas."))
+        total = os.path.getsize(path) or 1
+        mode = WordImportJob.Mode.UPSERT if options['upsert'] else WordImportJob.Mode.CREATE
+
+        def on_progress(result, bytes_read):
+            self.stdout.write(
+                f"{min(bytes_read / total, 1) * 100:5.1f}%  filas: {result.rows_processed}  "
+                f"creadas: {result.created}  actualizadas: {result.updated}  errores: {result.error_count}"
+            )
+
+        with open(path, 'rb') as raw_file:
+            result = import_words(raw_file, mode=mode, chunk_size=options['chunk_size'], on_progress=on_progress)
+
+        for error in result.errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f"Importación completada: {result.created} creadas, {result.updated} actualizadas, {result.error_count} errores."
+        ))
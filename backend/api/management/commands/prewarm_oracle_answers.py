@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.oracle import QUESTION_PROMPTS, MissingApiKey, prewarm_answers
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera las respuestas del Oráculo del Diccionario que faltan o vencieron para todo el catálogo, "
+        "de a una llamada a Gemini por vez y con una pausa entre llamadas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--question-types', nargs='+', choices=list(QUESTION_PROMPTS), help="Tipos de pregunta (por defecto todos)")
+        parser.add_argument('--delay', type=float, default=1.0, help="Segundos de espera entre llamadas a Gemini")
+        parser.add_argument('--limit', type=int, help="Máximo de llamadas a Gemini en esta corrida")
+        parser.add_argument('--max-errors', type=int, default=5, help="Cortar tras esta cantidad de errores seguidos")
+
+    def handle(self, *args, **options):
+        def progress(word, question_type, totals):
+            done = totals['generated'] + totals['failed']
+            if done % 50 == 0:
+                self.stdout.write(f"  {done} llamadas ({totals['failed']} con error), última: {word.text} / {question_type}")
+
+        try:
+            totals = prewarm_answers(
+                question_types=options['question_types'],
+                delay=options['delay'],
+                limit=options['limit'],
+                max_errors=options['max_errors'],
+                on_answer=progress
+            )
+        except MissingApiKey as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Precalentado terminado: {totals['generated']} generadas, {totals['cached']} ya vigentes, {totals['failed']} con error."
+        ))
+        if totals['failed']:
+            self.stdout.write(self.style.WARNING("Hubo errores: volver a correr el comando completa las que faltan."))
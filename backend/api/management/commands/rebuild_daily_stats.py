@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.daily_stats import rebuild_daily_stats
+from datetime import date
+
+
+class Command(BaseCommand):
+    help = "Regenera las estadísticas diarias (DailyUserStats) a partir de GameHistory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="Solo desde este día (YYYY-MM-DD); por defecto, todo el historial")
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError("--since debe tener el formato YYYY-MM-DD")
+
+        written = rebuild_daily_stats(since=since)
+        self.stdout.write(self.style.SUCCESS(f"Estadísticas diarias regeneradas: {written} filas."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from api.user_counters import reconcile_counters, DEFAULT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Corrige los contadores desnormalizados de UserStats (palabras, avatares, badges y partidas)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Usuarios procesados por transacción")
+
+    def handle(self, *args, **options):
+        fixed = reconcile_counters(chunk_size=options['chunk_size'])
+        for column, count in fixed.items():
+            self.stdout.write(f"{column}: {count} filas corregidas")
+        self.stdout.write(self.style.SUCCESS("Reconciliación completada."))
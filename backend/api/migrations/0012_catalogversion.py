@@ -0,0 +1,21 @@
+# Generated by Django 6.0.2 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_farm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text="Nombre del catálogo (e.g. 'badges', 'words')", max_length=50, unique=True)),
+                ('version', models.PositiveBigIntegerField(default=1, help_text='Se incrementa cada vez que el catálogo cambia')),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 6.0.2 on 2026-10-17 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_catalogversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamehistory',
+            name='client_match_id',
+            field=models.CharField(blank=True, help_text='ID de partida generado por el cliente; evita registrar dos veces la misma partida', max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='gamehistory',
+            constraint=models.UniqueConstraint(fields=('user', 'client_match_id'), name='unique_client_match_per_user'),
+        ),
+    ]
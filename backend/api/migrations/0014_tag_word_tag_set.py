@@ -0,0 +1,25 @@
+# Generated by Django 6.0.2 on 2026-10-17 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_gamehistory_client_match_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Etiqueta normalizada (minúsculas, sin espacios extra)', max_length=50, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='word',
+            name='tag_set',
+            field=models.ManyToManyField(blank=True, editable=False, help_text="Tags normalizados, derivados de 'tags' al guardar.", related_name='words', to='api.tag'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0.2 on 2026-10-17 11:06
+
+from django.db import migrations
+
+
+def populate_word_tags(apps, schema_editor):
+    # Copia los strings "food, fun" de Word.tags a la tabla Tag normalizada
+    Word = apps.get_model('api', 'Word')
+    Tag = apps.get_model('api', 'Tag')
+    through = Word.tag_set.through
+
+    names_by_word = {}
+    for word_id, tags in Word.objects.values_list('id', 'tags').iterator(chunk_size=5000):
+        names = []
+        for tag in (tags or '').split(','):
+            tag = tag.strip().lower()[:50]
+            if tag and tag not in names:
+                names.append(tag)
+        if names:
+            names_by_word[word_id] = names
+
+    all_names = {name for names in names_by_word.values() for name in names}
+    Tag.objects.bulk_create([Tag(name=name) for name in all_names], ignore_conflicts=True)
+    tag_ids = dict(Tag.objects.values_list('name', 'id'))
+    through.objects.bulk_create([
+        through(word_id=word_id, tag_id=tag_ids[name])
+        for word_id, names in names_by_word.items()
+        for name in names
+    ], batch_size=5000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_tag_word_tag_set'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_word_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 6.0.2 on 2026-10-17 12:10
+
+from django.db import migrations, transaction, DatabaseError
+
+# Índices de búsqueda de palabras (ver api/word_search.py). Dependen del motor, por eso son SQL crudo.
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    ALTER TABLE api_word ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(text, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(translation, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(definition, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX api_word_search_vector_gin ON api_word USING gin (search_vector)",
+    "CREATE INDEX api_word_text_trgm_gin ON api_word USING gin (text gin_trgm_ops)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS api_word_text_trgm_gin",
+    "DROP INDEX IF EXISTS api_word_search_vector_gin",
+    "ALTER TABLE api_word DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER api_word_fts_insert AFTER INSERT ON api_word BEGIN
+        INSERT INTO api_word_fts(rowid, text, translation, definition)
+        VALUES (new.id, new.text, coalesce(new.translation, ''), new.definition);
+    END
+    """,
+    """
+    CREATE TRIGGER api_word_fts_update AFTER UPDATE OF text, translation, definition ON api_word BEGIN
+        DELETE FROM api_word_fts WHERE rowid = old.id;
+        INSERT INTO api_word_fts(rowid, text, translation, definition)
+        VALUES (new.id, new.text, coalesce(new.translation, ''), new.definition);
+    END
+    """,
+    """
+    CREATE TRIGGER api_word_fts_delete AFTER DELETE ON api_word BEGIN
+        DELETE FROM api_word_fts WHERE rowid = old.id;
+    END
+    """,
+]
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE api_word_fts USING fts5(text, translation, definition, tokenize = 'unicode61 remove_diacritics 2')",
+    """
+    INSERT INTO api_word_fts(rowid, text, translation, definition)
+    SELECT id, text, coalesce(translation, ''), definition FROM api_word
+    """,
+] + SQLITE_TRIGGERS
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS api_word_fts_delete",
+    "DROP TRIGGER IF EXISTS api_word_fts_update",
+    "DROP TRIGGER IF EXISTS api_word_fts_insert",
+    "DROP TABLE IF EXISTS api_word_fts",
+]
+
+
+def _pg_trgm_available(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def _run(schema_editor, postgres, sqlite):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = postgres
+    elif vendor == 'sqlite':
+        statements = sqlite
+    else:
+        return
+    # Todo o nada dentro de un savepoint: si falla (SQLite sin FTS5, sin permiso para CREATE EXTENSION...)
+    # la transacción de la migración sigue usable y get_search_backend cae a icontains.
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            for statement in statements:
+                schema_editor.execute(statement)
+    except DatabaseError:
+        pass
+
+
+def create_search_index(apps, schema_editor):
+    # Sin pg_trgm el backend de PostgreSQL no sirve (usa similarity()): ni se intenta el DDL
+    if schema_editor.connection.vendor == 'postgresql' and not _pg_trgm_available(schema_editor):
+        return
+    _run(schema_editor, POSTGRES_FORWARD, SQLITE_FORWARD)
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, POSTGRES_BACKWARD, SQLITE_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_populate_word_tags'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.2 on 2026-10-17 13:20
+
+from django.db import migrations, models
+import importlib
+
+search_index = importlib.import_module('api.migrations.0016_word_search_index')
+
+
+def restore_fts_triggers(apps, schema_editor):
+    # En SQLite AddField reconstruye api_word y se pierden los triggers de api_word_fts
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        if 'api_word_fts' not in schema_editor.connection.introspection.table_names(cursor):
+            return
+    for statement in search_index.SQLITE_TRIGGERS:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_word_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WordTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word_id', models.BigIntegerField(help_text='Id de la palabra borrada')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='word',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Usado por words/changes/ para la sincronización incremental del cliente.'),
+        ),
+        migrations.RunPython(restore_fts_triggers, migrations.RunPython.noop),
+    ]
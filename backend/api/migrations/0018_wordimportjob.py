@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-17 14:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_word_updated_at_wordtombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WordImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(blank=True, help_text='CSV subido; se borra al terminar', upload_to='imports/')),
+                ('mode', models.CharField(choices=[('CREATE', 'Solo crear (omite existentes)'), ('UPSERT', 'Crear o actualizar')], default='CREATE', max_length=10)),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente'), ('RUNNING', 'En progreso'), ('DONE', 'Completado'), ('FAILED', 'Fallido')], default='PENDING', max_length=10)),
+                ('total_bytes', models.BigIntegerField(default=0)),
+                ('processed_bytes', models.BigIntegerField(default=0)),
+                ('rows_processed', models.IntegerField(default=0)),
+                ('created_count', models.IntegerField(default=0)),
+                ('updated_count', models.IntegerField(default=0)),
+                ('error_count', models.IntegerField(default=0)),
+                ('errors', models.JSONField(blank=True, default=list, help_text='Primeros errores por fila (el total está en error_count)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='word_import_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.0.2 on 2026-10-17 15:10
+
+from django.db import migrations, models
+from django.db.models import F, Count, OuterRef, Subquery, IntegerField, FloatField
+from django.db.models.functions import Cast, Coalesce
+
+
+def populate_leaderboard_fields(apps, schema_editor):
+    UserStats = apps.get_model('api', 'UserStats')
+    through = UserStats.unlocked_words.through
+    counts = (
+        through.objects.filter(userstats_id=OuterRef('pk'))
+        .values('userstats_id')
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    UserStats.objects.update(unlocked_words_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0))
+
+    total = F('total_questions_answered')
+    UserStats.objects.update(performance_score=(
+        Cast('experience', FloatField())
+        + F('unlocked_words_count') * 50
+        + Cast('correct_answers_total', FloatField()) / (total + 10.0) * total * 10
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_wordimportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='performance_score',
+            field=models.FloatField(default=0, help_text='Puntaje de la leaderboard (ver compute_performance_score)'),
+        ),
+        migrations.AddField(
+            model_name='userstats',
+            name='unlocked_words_count',
+            field=models.IntegerField(default=0, help_text='Copia de unlocked_words.count() para la leaderboard'),
+        ),
+        migrations.AddIndex(
+            model_name='userstats',
+            index=models.Index(fields=['-performance_score', 'id'], name='userstats_leaderboard_idx'),
+        ),
+        migrations.RunPython(populate_leaderboard_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 6.0.2 on 2026-10-17 16:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def populate_daily_stats(apps, schema_editor):
+    # Mismo cálculo que api.daily_stats.rebuild_daily_stats (la EXP por partida no existía antes: queda en 0)
+    GameHistory = apps.get_model('api', 'GameHistory')
+    DailyUserStats = apps.get_model('api', 'DailyUserStats')
+    aggregated = (
+        GameHistory.objects.annotate(day=TruncDate('played_at'))
+        .values('user_id', 'day')
+        .annotate(
+            matches=Count('id'),
+            score=Sum('score'),
+            correct_answers=Sum('correct_in_game'),
+            total_questions=Sum('total_questions_in_game'),
+            time_spent_seconds=Sum('time_spent_seconds'),
+            letters_killed=Sum('letters_killed'),
+            bosses_killed=Sum('bosses_killed'),
+        )
+        .order_by()
+    )
+    DailyUserStats.objects.bulk_create((DailyUserStats(**row) for row in aggregated.iterator(chunk_size=5000)), batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_userstats_leaderboard_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamehistory',
+            name='xp_earned',
+            field=models.IntegerField(default=0, help_text='EXP ganada en la partida (sin recompensas de badges)'),
+        ),
+        migrations.CreateModel(
+            name='DailyUserStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('matches', models.IntegerField(default=0)),
+                ('score', models.IntegerField(default=0)),
+                ('xp_earned', models.IntegerField(default=0)),
+                ('correct_answers', models.IntegerField(default=0)),
+                ('total_questions', models.IntegerField(default=0)),
+                ('time_spent_seconds', models.IntegerField(default=0)),
+                ('letters_killed', models.IntegerField(default=0)),
+                ('bosses_killed', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'user'], name='dailyuserstats_day_user_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'day'), name='unique_daily_stats_per_user')],
+            },
+        ),
+        migrations.RunPython(populate_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0.2 on 2026-10-17 18:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, IntegerField
+from django.db.models.functions import Coalesce
+
+
+def populate_matches_played(apps, schema_editor):
+    UserStats = apps.get_model('api', 'UserStats')
+    GameHistory = apps.get_model('api', 'GameHistory')
+    counts = (
+        GameHistory.objects.filter(user_id=OuterRef('user_id'))
+        .values('user_id')
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    UserStats.objects.update(matches_played=Coalesce(Subquery(counts, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_dailyuserstats_gamehistory_xp_earned'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='matches_played',
+            field=models.IntegerField(default=0, help_text='Partidas registradas; total del historial sin COUNT(*)'),
+        ),
+        migrations.AddIndex(
+            model_name='gamehistory',
+            index=models.Index(fields=['user', '-played_at', '-id'], name='gamehistory_user_played_idx'),
+        ),
+        migrations.RunPython(populate_matches_played, migrations.RunPython.noop),
+    ]
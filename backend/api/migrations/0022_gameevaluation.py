@@ -0,0 +1,47 @@
+# Generated by Django 6.0.2 on 2026-10-17 18:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def move_evaluations(apps, schema_editor):
+    GameHistory = apps.get_model('api', 'GameHistory')
+    GameEvaluation = apps.get_model('api', 'GameEvaluation')
+    rows = (
+        GameHistory.objects.exclude(ai_evaluation__isnull=True).exclude(ai_evaluation={})
+        .values_list('id', 'ai_evaluation')
+        .iterator(chunk_size=2000)
+    )
+    GameEvaluation.objects.bulk_create(
+        (GameEvaluation(game_id=game_id, ai_evaluation=evaluation) for game_id, evaluation in rows),
+        batch_size=2000
+    )
+
+
+def restore_evaluations(apps, schema_editor):
+    GameHistory = apps.get_model('api', 'GameHistory')
+    GameEvaluation = apps.get_model('api', 'GameEvaluation')
+    for game_id, evaluation in GameEvaluation.objects.values_list('game_id', 'ai_evaluation').iterator(chunk_size=2000):
+        GameHistory.objects.filter(id=game_id).update(ai_evaluation=evaluation)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_gamehistory_cursor_index_matches_played'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameEvaluation',
+            fields=[
+                ('game', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='evaluation', serialize=False, to='api.gamehistory')),
+                ('ai_evaluation', models.JSONField(blank=True, default=dict, help_text='Resultados de la evaluación de la IA')),
+            ],
+        ),
+        migrations.RunPython(move_evaluations, restore_evaluations),
+        migrations.RemoveField(
+            model_name='gamehistory',
+            name='ai_evaluation',
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-17 19:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_gameevaluation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedGameHistory',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('game_mode', models.CharField(choices=[('SURVIVOR', 'Survivor RPG (Godot)'), ('QUIZ', 'Lección Interactiva (React)')], max_length=20)),
+                ('played_at', models.DateTimeField()),
+                ('score', models.IntegerField(default=0)),
+                ('xp_earned', models.IntegerField(default=0)),
+                ('correct_in_game', models.IntegerField(default=0)),
+                ('total_questions_in_game', models.IntegerField(default=0)),
+                ('time_spent_seconds', models.IntegerField(default=0)),
+                ('letters_killed', models.IntegerField(default=0)),
+                ('bosses_killed', models.IntegerField(default=0)),
+                ('match_breakdown', models.JSONField(blank=True, default=dict)),
+                ('ai_evaluation', models.JSONField(blank=True, null=True)),
+                ('client_match_id', models.CharField(blank=True, max_length=64, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_game_history', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-played_at'], name='archivedhistory_user_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 6.0.2 on 2026-10-17 20:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, IntegerField
+from django.db.models.functions import Coalesce
+
+
+def populate_unlock_counters(apps, schema_editor):
+    UserStats = apps.get_model('api', 'UserStats')
+    updates = {}
+    for m2m_field, counter in (('unlocked_avatars', 'unlocked_avatars_count'), ('badges', 'badges_count')):
+        through = getattr(UserStats, m2m_field).through
+        counts = (
+            through.objects.filter(userstats_id=OuterRef('pk'))
+            .values('userstats_id')
+            .annotate(total=Count('*'))
+            .values('total')
+        )
+        updates[counter] = Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+    UserStats.objects.update(**updates)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_archivedgamehistory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='badges_count',
+            field=models.IntegerField(default=0, help_text='Copia de badges.count() (ver api/user_counters.py)'),
+        ),
+        migrations.AddField(
+            model_name='userstats',
+            name='unlocked_avatars_count',
+            field=models.IntegerField(default=0, help_text='Copia de unlocked_avatars.count() (ver api/user_counters.py)'),
+        ),
+        migrations.AlterField(
+            model_name='userstats',
+            name='unlocked_words_count',
+            field=models.IntegerField(default=0, help_text='Copia de unlocked_words.count() (ver api/user_counters.py)'),
+        ),
+        migrations.RunPython(populate_unlock_counters, migrations.RunPython.noop),
+    ]
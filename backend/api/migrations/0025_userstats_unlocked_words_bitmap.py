@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-17 20:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_userstats_unlock_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='unlocked_words_bitmap',
+            field=models.BinaryField(blank=True, default=b'', help_text="Palabras desbloqueadas como bitmap por id (UNLOCKED_WORDS_STORAGE = 'bitmap', ver api/unlocked_words.py)"),
+        ),
+    ]
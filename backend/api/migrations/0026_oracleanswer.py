@@ -0,0 +1,30 @@
+# Generated by Django 6.0.2 on 2026-10-17 21:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_userstats_unlocked_words_bitmap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OracleAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_type', models.CharField(max_length=20)),
+                ('prompt_hash', models.CharField(help_text='sha256 del prompt: deja de coincidir si la palabra cambia', max_length=64)),
+                ('response', models.TextField()),
+                ('model_name', models.CharField(blank=True, max_length=50)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('word', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='oracle_answers', to='api.word')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('word', 'question_type'), name='unique_oracle_answer_per_question')],
+            },
+        ),
+    ]
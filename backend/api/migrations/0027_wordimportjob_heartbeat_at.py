@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0026_oracleanswer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wordimportjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Último avance del hilo; sin avances recientes el job se da por muerto', null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0027_wordimportjob_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='archivedgamehistory',
+            constraint=models.UniqueConstraint(fields=('user', 'client_match_id'), name='unique_archived_client_match_per_user'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0028_archivedgamehistory_unique_match'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gamehistory',
+            name='played_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='Momento de la partida (el cliente lo envía en las partidas sin conexión)'),
+        ),
+    ]
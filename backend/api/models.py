@@ -1,10 +1,12 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.auth.models import AbstractUser 
-from django.db.models.signals import post_save    
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
 from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
 import uuid             
+from api.levels import xp_for_level, level_for_xp
 
 # * --------------------------------------------------------------------------------------------------
 #  ! --- MODELO VERIFICACION DE CORREO ---
@@ -100,6 +102,15 @@ def save_user_profile(sender, instance, **kwargs):
     if hasattr(instance, 'profile'):
         instance.profile.save()
 
+# * --------------------------------------------------------------------------------------------------
+# ! --- MODELO TAG ---
+# * --------------------------------------------------------------------------------------------------
+class Tag(models.Model):
+    name = models.CharField(max_length=50, unique=True, help_text="Etiqueta normalizada (minúsculas, sin espacios extra)")
+
+    def __str__(self):
+        return self.name
+
 # * --------------------------------------------------------------------------------------------------
 # ! --- MODELO WORD ---
 # * --------------------------------------------------------------------------------------------------
@@ -117,7 +128,9 @@ class Word(models.Model):
     substitutes = models.ManyToManyField('self', blank=True, symmetrical=True, help_text="Sinónimos aceptados en los quizzes de escritura.")
     difficulty_level = models.IntegerField(default=1, help_text="1: Principiante, 10: Experto (Usado para filtrar qué palabras salen según el nivel del usuario)")
     tags = models.CharField(max_length=200, blank=True, help_text="Etiquetas separadas por comas. Usadas para encontrar distractores del mismo tema.")
+    tag_set = models.ManyToManyField(Tag, blank=True, editable=False, related_name='words', help_text="Tags normalizados, derivados de 'tags' al guardar.")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, help_text="Usado por words/changes/ para la sincronización incremental del cliente.")
 
     def __str__(self):
         return self.text
@@ -129,6 +142,50 @@ class Word(models.Model):
             return random.choice(self.examples)
         return None
 
+class WordTombstone(models.Model):
+    word_id = models.BigIntegerField(help_text="Id de la palabra borrada")
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Word #{self.word_id} borrada {self.deleted_at}"
+
+class WordImportJob(models.Model):
+    class Mode(models.TextChoices):
+        CREATE = 'CREATE', 'Solo crear (omite existentes)'
+        UPSERT = 'UPSERT', 'Crear o actualizar'
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pendiente'
+        RUNNING = 'RUNNING', 'En progreso'
+        DONE = 'DONE', 'Completado'
+        FAILED = 'FAILED', 'Fallido'
+
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='word_import_jobs')
+    file = models.FileField(upload_to='imports/', blank=True, help_text="CSV subido; se borra al terminar")
+    mode = models.CharField(max_length=10, choices=Mode.choices, default=Mode.CREATE)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    total_bytes = models.BigIntegerField(default=0)
+    processed_bytes = models.BigIntegerField(default=0)
+    rows_processed = models.IntegerField(default=0)
+    created_count = models.IntegerField(default=0)
+    updated_count = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True, help_text="Primeros errores por fila (el total está en error_count)")
+    created_at = models.DateTimeField(auto_now_add=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Último avance del hilo; sin avances recientes el job se da por muerto")
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Importación #{self.id} ({self.status})"
+
+    @property
+    def progress(self):
+        if self.status == self.Status.DONE:
+            return 100.0
+        if not self.total_bytes:
+            return 0.0
+        return round(min(self.processed_bytes / self.total_bytes, 1) * 100, 1)
+
 # * --------------------------------------------------------------------------------------------------
 # ! --- MODELO USERSTATS ---
 # * --------------------------------------------------------------------------------------------------
@@ -162,6 +219,44 @@ class UserStats(models.Model):
         help_text="Avatares que el usuario ha desbloqueado."
     )
     unlocked_titles = models.JSONField(default=list, blank=True, help_text="Títulos que el usuario ha desbloqueado.")
+    unlocked_words_bitmap = models.BinaryField(default=b'', blank=True, help_text="Palabras desbloqueadas como bitmap por id (UNLOCKED_WORDS_STORAGE = 'bitmap', ver api/unlocked_words.py)")
+    unlocked_words_count = models.IntegerField(default=0, help_text="Copia de unlocked_words.count() (ver api/user_counters.py)")
+    unlocked_avatars_count = models.IntegerField(default=0, help_text="Copia de unlocked_avatars.count() (ver api/user_counters.py)")
+    badges_count = models.IntegerField(default=0, help_text="Copia de badges.count() (ver api/user_counters.py)")
+    matches_played = models.IntegerField(default=0, help_text="Partidas registradas; total del historial sin COUNT(*)")
+    performance_score = models.FloatField(default=0, help_text="Puntaje de la leaderboard (ver compute_performance_score)")
+
+    # Puntaje = EXP + 50 por palabra desbloqueada + 10 por pregunta ponderado por la precisión
+    # "suavizada" correct / (total + 10), que castiga a quien respondió muy pocas preguntas.
+    UNLOCKED_WORD_POINTS = 50
+    QUESTION_POINTS = 10
+    ACCURACY_PRIOR = 10.0
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-performance_score', 'id'], name='userstats_leaderboard_idx'),
+        ]
+
+    @classmethod
+    def true_accuracy(cls, correct_answers_total, total_questions_answered):
+        return correct_answers_total / (total_questions_answered + cls.ACCURACY_PRIOR)
+
+    @classmethod
+    def compute_performance_score(cls, experience, unlocked_words_count, correct_answers_total, total_questions_answered):
+        return (
+            experience
+            + unlocked_words_count * cls.UNLOCKED_WORD_POINTS
+            + total_questions_answered * cls.QUESTION_POINTS * cls.true_accuracy(correct_answers_total, total_questions_answered)
+        )
+
+    def save(self, *args, **kwargs):
+        self.performance_score = self.compute_performance_score(
+            self.experience, self.unlocked_words_count, self.correct_answers_total, self.total_questions_answered
+        )
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'performance_score'}
+        super().save(*args, **kwargs)
 
     def get_accuracy_percentage(self):
         if self.total_questions_answered == 0:
@@ -182,14 +277,7 @@ class UserStats(models.Model):
         return f"Estadísticas de {self.user.username}"
     
     def get_level(self):
-        xp = self.experience
-        level = 1
-        xp_needed_for_next_level = self._calculate_xp_for_level(level + 1)
-        
-        while xp >= xp_needed_for_next_level:
-            level += 1
-            xp_needed_for_next_level = self._calculate_xp_for_level(level + 1)
-        return level
+        return level_for_xp(self.experience)
 
     def get_xp_for_current_level_start(self):
         current_level = self.get_level()
@@ -203,8 +291,9 @@ class UserStats(models.Model):
 
     def get_xp_progress_in_current_level(self):
         xp_total = self.experience
-        xp_current_level_start = self.get_xp_for_current_level_start()
-        xp_next_level = self.get_xp_for_next_level()
+        current_level = self.get_level()
+        xp_current_level_start = self._calculate_xp_for_level(current_level) if current_level > 1 else 0
+        xp_next_level = self._calculate_xp_for_level(current_level + 1)
         
         if xp_next_level == xp_current_level_start: # Evita división por cero si es el último nivel o formula plana
             return 0
@@ -217,23 +306,11 @@ class UserStats(models.Model):
 
         return (xp_in_level / xp_needed_in_level) * 100
 
-    # Método privado para calcular la XP necesaria para un nivel específico
-    def _calculate_xp_for_level(self, level):
-        # ? Ejemplo de fórmula: Nivel 1 = 0 XP, Nivel 2 = 100 XP, Nivel 3 = 300 XP, Nivel 4 = 600 XP
-        if level <= 0:
-            return 0
-        return 50 * level * (level - 1) # Nivel 1 necesita 0, Nivel 2 necesita 50, Nivel 3 necesita 200, Nivel 4 necesita 450
-
-    # ! Formulas:
-    # ? Ejemplo 1 (lineal): return level * 100
-    # ? Ejemplo 2 (exponencial simple): return 100 * (2 ** (level - 1)) - 100
-    # ? Ejemplo 3 (más complejo, común en juegos):
-    #   xp_per_level = 100 # XP base para cada nivel
-    #   xp_growth_factor = 1.1 # Cada nivel requiere 10% mas XP que el anterior
-    #   total_xp = 0
-    #   for i in range(1, level):
-    #       total_xp += xp_per_level * (xp_growth_factor ** (i - 1))
-    #   return int(total_xp)
+    # XP necesaria para un nivel específico. La curva y su inversa (nivel de una XP, en Python y en SQL)
+    # están en api/levels.py: si se cambia la fórmula, hay que cambiar las tres.
+    @staticmethod
+    def _calculate_xp_for_level(level):
+        return xp_for_level(level)
 
 # * --------------------------------------------------------------------------------------------------
 # ! --- MODELO GAMEHISTORY ---
@@ -246,7 +323,7 @@ class GameHistory(models.Model):
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='game_history')
     game_mode = models.CharField(max_length=20, choices=GameMode.choices, default=GameMode.QUIZ)
-    played_at = models.DateTimeField(auto_now_add=True)
+    played_at = models.DateTimeField(default=timezone.now, help_text="Momento de la partida (el cliente lo envía en las partidas sin conexión)")
     score = models.IntegerField(default=0)
     correct_in_game = models.IntegerField(default=0) 
     total_questions_in_game = models.IntegerField(default=0)
@@ -254,11 +331,67 @@ class GameHistory(models.Model):
     letters_killed = models.IntegerField(default=0)
     bosses_killed = models.IntegerField(default=0)
     match_breakdown = models.JSONField(default=dict, blank=True)
-    ai_evaluation = models.JSONField(default=dict, blank=True, null=True, help_text="Resultados de la evaluación de la IA")
+    client_match_id = models.CharField(max_length=64, blank=True, null=True, help_text="ID de partida generado por el cliente; evita registrar dos veces la misma partida")
+    xp_earned = models.IntegerField(default=0, help_text="EXP ganada en la partida (sin recompensas de badges)")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'client_match_id'], name='unique_client_match_per_user'),
+        ]
+        indexes = [
+            # Paginación por cursor del historial (ver api/history_pagination.py)
+            models.Index(fields=['user', '-played_at', '-id'], name='gamehistory_user_played_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.get_game_mode_display()} - {self.played_at}"
 
+
+class GameEvaluation(models.Model):
+    """
+    Evaluación de la IA de una partida. Va aparte de GameHistory para que los listados del
+    historial no lean ni envíen el JSON; solo lo devuelve el detalle (game-history/<id>/).
+    """
+    game = models.OneToOneField(GameHistory, on_delete=models.CASCADE, primary_key=True, related_name='evaluation')
+    ai_evaluation = models.JSONField(default=dict, blank=True, help_text="Resultados de la evaluación de la IA")
+
+    def __str__(self):
+        return f"Evaluación de la partida {self.game_id}"
+
+
+class ArchivedGameHistory(models.Model):
+    """
+    Partidas más viejas que GAME_HISTORY_RETENTION_DAYS, movidas por archive_game_history.
+    Conserva el id original; sus totales ya están en DailyUserStats.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_game_history')
+    game_mode = models.CharField(max_length=20, choices=GameHistory.GameMode.choices)
+    played_at = models.DateTimeField()
+    score = models.IntegerField(default=0)
+    xp_earned = models.IntegerField(default=0)
+    correct_in_game = models.IntegerField(default=0)
+    total_questions_in_game = models.IntegerField(default=0)
+    time_spent_seconds = models.IntegerField(default=0)
+    letters_killed = models.IntegerField(default=0)
+    bosses_killed = models.IntegerField(default=0)
+    match_breakdown = models.JSONField(default=dict, blank=True)
+    ai_evaluation = models.JSONField(blank=True, null=True)
+    client_match_id = models.CharField(max_length=64, blank=True, null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # La deduplicación por match_id sigue valiendo después de archivar (ver game_results)
+            models.UniqueConstraint(fields=['user', 'client_match_id'], name='unique_archived_client_match_per_user'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-played_at'], name='archivedhistory_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.game_mode} - {self.played_at} (archivada)"
+
 # * --------------------------------------------------------------------------------------------------
 # ! --- MODELO BADGE (INSIGNIA) ---
 # * --------------------------------------------------------------------------------------------------
@@ -326,8 +459,171 @@ class Farm(models.Model):
         return f"{self.name} ({self.invite_code})"
 
 
+# * --------------------------------------------------------------------------------------------------
+# ! --- MODELO ESTADÍSTICAS DIARIAS ---
+# * --------------------------------------------------------------------------------------------------
+class DailyUserStats(models.Model):
+    """
+    Totales de GameHistory por usuario y día; las leaderboards por día/semana/mes suman estas filas.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    matches = models.IntegerField(default=0)
+    score = models.IntegerField(default=0)
+    xp_earned = models.IntegerField(default=0)
+    correct_answers = models.IntegerField(default=0)
+    total_questions = models.IntegerField(default=0)
+    time_spent_seconds = models.IntegerField(default=0)
+    letters_killed = models.IntegerField(default=0)
+    bosses_killed = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='unique_daily_stats_per_user'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'user'], name='dailyuserstats_day_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.day}"
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- MODELO CACHÉ DEL ORÁCULO ---
+# * --------------------------------------------------------------------------------------------------
+class OracleAnswer(models.Model):
+    """
+    Respuesta del Oráculo del Diccionario para (palabra, tipo de pregunta). Ver api/oracle.py.
+    """
+    word = models.ForeignKey(Word, on_delete=models.CASCADE, related_name='oracle_answers')
+    question_type = models.CharField(max_length=20)
+    prompt_hash = models.CharField(max_length=64, help_text="sha256 del prompt: deja de coincidir si la palabra cambia")
+    response = models.TextField()
+    model_name = models.CharField(max_length=50, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['word', 'question_type'], name='unique_oracle_answer_per_question'),
+        ]
+
+    def __str__(self):
+        return f"{self.word_id} - {self.question_type}"
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- MODELO VERSION DE CATÁLOGO ---
+# * --------------------------------------------------------------------------------------------------
+class CatalogVersion(models.Model):
+    name = models.CharField(max_length=50, unique=True, help_text="Nombre del catálogo (e.g. 'badges', 'words')")
+    version = models.PositiveBigIntegerField(default=1, help_text="Se incrementa cada vez que el catálogo cambia")
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+def bump_badge_catalog(sender, **kwargs):
+    from api.catalog import bump_catalog_version, BADGES
+    bump_catalog_version(BADGES)
+
+def sync_word_tags(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'tags' not in update_fields:
+        return
+    from api.tags import set_word_tags
+    set_word_tags({instance.id: instance.tags})
+
+def bump_word_catalog(sender, **kwargs):
+    from api.catalog import bump_catalog_version, WORDS
+    bump_catalog_version(WORDS)
+
+def record_word_tombstone(sender, instance, **kwargs):
+    WordTombstone.objects.create(word_id=instance.id)
+
+def touch_word_substitutes(sender, instance, action, pk_set=None, **kwargs):
+    # Los sinónimos son parte de la palabra en el snapshot: marcar ambos lados como modificados
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    word_ids = set(pk_set or ())
+    word_ids.add(instance.pk)
+    if action == 'pre_clear':
+        word_ids.update(instance.substitutes.values_list('id', flat=True))
+    Word.objects.filter(id__in=word_ids).update(updated_at=timezone.now())
+    bump_word_catalog(sender)
+
+def sync_unlock_counters(sender, instance, action, reverse, pk_set=None, **kwargs):
+    """
+    Mantiene unlocked_words_count / unlocked_avatars_count / badges_count al cambiar el M2M.
+    En add, pk_set trae solo lo que realmente se insertó: basta con sumar.
+    """
+    from api.user_counters import UNLOCK_COUNTERS, refresh_counters
+    from api.leaderboard import performance_score_expression
+
+    m2m_field = UNLOCK_COUNTER_THROUGHS[sender]
+    counter = UNLOCK_COUNTERS[m2m_field]
+    if action == 'pre_clear' and reverse:
+        # Después del clear ya no se sabe qué UserStats tenían la fila
+        instance._cleared_stats_ids = list(
+            sender.objects.filter(**{getattr(UserStats, m2m_field).field.m2m_reverse_name(): instance.pk})
+            .values_list('userstats_id', flat=True)
+        )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if action == 'post_add':
+        if not pk_set:
+            return
+        stats_ids, amount = ([instance.pk], len(pk_set)) if not reverse else (pk_set, 1)
+        updates = {counter: F(counter) + amount}
+        if m2m_field == 'unlocked_words':
+            updates['performance_score'] = performance_score_expression(unlocked_delta=amount)
+        UserStats.objects.filter(pk__in=stats_ids).update(**updates)
+        if not reverse:
+            setattr(instance, counter, getattr(instance, counter) + amount)
+        return
+
+    if not reverse:
+        stats_ids = [instance.pk]
+    elif action == 'post_clear':
+        stats_ids = getattr(instance, '_cleared_stats_ids', [])
+    else:
+        stats_ids = pk_set or []
+    refresh_counters(UserStats.objects.filter(pk__in=stats_ids), [m2m_field])
+    if not reverse:
+        instance.refresh_from_db(fields=[counter, 'performance_score'])
+
+def remember_unlocked_by(sender, instance, **kwargs):
+    # Borrar una Word/Avatar/Badge elimina sus filas intermedias sin m2m_changed
+    instance._unlocked_by_ids = list(instance.unlocked_by_users.values_list('id', flat=True))
+
+def refresh_unlocked_by(sender, instance, **kwargs):
+    from api.user_counters import refresh_counters
+
+    stats_ids = getattr(instance, '_unlocked_by_ids', None)
+    if stats_ids:
+        m2m_field = {Word: 'unlocked_words', Avatar: 'unlocked_avatars', Badge: 'badges'}[sender]
+        refresh_counters(UserStats.objects.filter(pk__in=stats_ids), [m2m_field])
+
+
+UNLOCK_COUNTER_THROUGHS = {
+    UserStats.unlocked_words.through: 'unlocked_words',
+    UserStats.unlocked_avatars.through: 'unlocked_avatars',
+    UserStats.badges.through: 'badges',
+}
+
 # * --------------------------------------------------------------------------------------------------
 # ! --- CONEXIÓN DE SEÑALES ---
 # * --------------------------------------------------------------------------------------------------
 post_save.connect(create_user_profile, sender=settings.AUTH_USER_MODEL)
-post_save.connect(save_user_profile, sender=settings.AUTH_USER_MODEL)
\ No newline at end of file
+post_save.connect(save_user_profile, sender=settings.AUTH_USER_MODEL)
+post_save.connect(bump_badge_catalog, sender=Badge)
+post_delete.connect(bump_badge_catalog, sender=Badge)
+post_save.connect(sync_word_tags, sender=Word)
+post_save.connect(bump_word_catalog, sender=Word)
+post_delete.connect(bump_word_catalog, sender=Word)
+post_delete.connect(record_word_tombstone, sender=Word)
+m2m_changed.connect(touch_word_substitutes, sender=Word.substitutes.through)
+for through in UNLOCK_COUNTER_THROUGHS:
+    m2m_changed.connect(sync_unlock_counters, sender=through)
+for model in (Word, Avatar, Badge):
+    pre_delete.connect(remember_unlocked_by, sender=model)
+    post_delete.connect(refresh_unlocked_by, sender=model)
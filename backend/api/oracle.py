@@ -0,0 +1,402 @@
+from api.models import Word, OracleAnswer
+from django.conf import settings
+from django.utils import timezone
+from collections import OrderedDict, deque
+from datetime import timedelta
+from threading import Condition, Event, Lock
+import google.generativeai as genai  # pyright: ignore[reportMissingImports]
+import hashlib
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- ORÁCULO DEL DICCIONARIO ---
+# * --------------------------------------------------------------------------------------------------
+# El prompt solo depende de los campos de la Word y del tipo de pregunta, así que la respuesta se
+# guarda en OracleAnswer durante ORACLE_CACHE_TTL_DAYS días, con una LRU por proceso delante.
+# Cada respuesta guarda el sha256 de su prompt: si se edita el texto, la traducción o la definición de
+# la palabra (por el admin, una importación o un UPDATE masivo) el hash deja de coincidir y se vuelve
+# a generar. Otros cambios (dificultad, tags...) no tocan el prompt y la respuesta sigue sirviendo.
+# prewarm_oracle_answers llena la caché para todo el catálogo.
+# En cada proceso, los pedidos idénticos simultáneos comparten una sola llamada a Gemini y las
+# llamadas en curso están limitadas (ver COALESCENCIA Y LÍMITE DE CONCURRENCIA).
+
+QUESTION_PROMPTS = {
+    'WHAT': "Explica el significado directo de la palabra de forma sencilla para alguien que la está aprendiendo.",
+    'WHY': "Explica brevemente la lógica o etimología (el origen) detrás de esta palabra o frase. ¿Por qué se dice así?",
+    'HOW': "Explica la estructura gramatical y las reglas de uso para esta palabra. ¿Cómo se usa correctamente en una oración?",
+    'WHEN': "Explica el contexto social: ¿Es formal, informal, de enojo, tristeza? ¿Cuándo es apropiado usarla?",
+    'EXAMPLES': "Dame exactamente 3 ejemplos creativos y variados de cómo usar esta palabra en oraciones. Separa cada ejemplo y provee su traducción.",
+}
+
+# Modelo principal y fallback
+ORACLE_MODELS = ('gemini-2.5-flash', 'gemini-1.5-flash')
+
+USER_PROMPT = "Responde a la consulta lo más preciso posible."
+
+
+class MissingApiKey(Exception):
+    pass
+
+
+class OracleError(Exception):
+    """
+    Error de Gemini visto por un pedido coalescido (el líder recibe el original).
+    """
+
+
+class OracleBusy(Exception):
+    """
+    No hay lugar para otra llamada a Gemini en este proceso; la vista responde 503 con Retry-After.
+    """
+    def __init__(self, retry_after):
+        super().__init__("El Oráculo está ocupado, intenta de nuevo en unos segundos")
+        self.retry_after = retry_after
+
+
+def get_api_key():
+    return getattr(settings, 'GEMINI_API_KEY', os.getenv("GEMINI_API_KEY") if os.getenv("GEMINI_API_KEY") else os.getenv("VITE_GEMINI_API_KEY"))
+
+
+def build_system_prompt(word, question_type):
+    base_context = f'Eres el "Oráculo del Granero", un sabio y misterioso campesino mágico del juego Misspelt. El usuario pregunta sobre la palabra en inglés "{word.text}" ("{word.translation}" en español), definición: "{word.definition}". Responde en un tono sabio, conciso (máximo 4 oraciones) y amigable. No uses subtítulos ni markdown. Usa español pero resaltando la palabra en inglés.'
+    return f"{base_context}\nInstrucción: {QUESTION_PROMPTS[question_type]}"
+
+
+def prompt_hash(system_prompt):
+    return hashlib.sha256(system_prompt.encode()).hexdigest()
+
+
+def generate_answer(system_prompt=None, contents=USER_PROMPT, log_prefix="[Oracle]"):
+    """
+    Llama a Gemini (con fallback al modelo anterior). Devuelve (texto, modelo).
+    Si fallan ambos, relanza el error del modelo principal.
+    """
+    api_key = get_api_key()
+    if not api_key:
+        raise MissingApiKey("API key de Gemini no configurada en el backend")
+    genai.configure(api_key=api_key)
+    first_error = None
+    for model_name in ORACLE_MODELS:
+        try:
+            model = genai.GenerativeModel(model_name, system_instruction=system_prompt)
+            response = model.generate_content(contents)
+            return response.text.replace('*', '').strip(), model_name
+        except Exception as e:
+            if first_error is None:
+                logger.warning("%s Error generando contenido: %s", log_prefix, e)
+                first_error = e
+            else:
+                logger.warning("%s Fallback falló: %s", log_prefix, e)
+    raise first_error
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- COALESCENCIA Y LÍMITE DE CONCURRENCIA ---
+# * --------------------------------------------------------------------------------------------------
+# Single-flight: el primer pedido de un prompt hace la llamada y los que llegan mientras tanto
+# esperan su resultado. Las llamadas a Gemini en curso por proceso se limitan a
+# ORACLE_MAX_CONCURRENT_CALLS. Si no se libera un lugar en ORACLE_QUEUE_TIMEOUT_SECONDS se lanza
+# OracleBusy en vez de dejar el worker bloqueado. oracle_metrics() expone los contadores y
+# los tiempos de espera en cola del proceso.
+# Con workers sync de gunicorn cada proceso atiende un pedido a la vez y no habría nada que
+# coalescer: render.yaml usa workers gthread. Las estructuras en memoria que comparten los hilos
+# (índice de badges, de tags, muestreador, backend de búsqueda, versiones de catálogo) se
+# reconstruyen bajo su propio lock.
+
+
+def _max_concurrent_calls():
+    return getattr(settings, 'ORACLE_MAX_CONCURRENT_CALLS', 2)
+
+
+def _queue_timeout():
+    return getattr(settings, 'ORACLE_QUEUE_TIMEOUT_SECONDS', 2)
+
+
+def _retry_after():
+    return getattr(settings, 'ORACLE_RETRY_AFTER_SECONDS', 5)
+
+
+def _coalesce_timeout():
+    return getattr(settings, 'ORACLE_COALESCE_TIMEOUT_SECONDS', 30)
+
+
+class _Limiter:
+    """
+    Semáforo contable: el límite se lee en cada acquire, así sigue al setting.
+    """
+
+    def __init__(self):
+        self.condition = Condition()
+        self.active = 0
+        self.waiting = 0
+
+    def acquire(self, limit, timeout):
+        """
+        Devuelve los segundos de espera, o None si venció `timeout` sin lugar.
+        """
+        start = time.monotonic()
+        deadline = start + timeout
+        with self.condition:
+            self.waiting += 1
+            try:
+                while self.active >= limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    self.condition.wait(remaining)
+                self.active += 1
+            finally:
+                self.waiting -= 1
+        return time.monotonic() - start
+
+    def release(self):
+        with self.condition:
+            self.active -= 1
+            self.condition.notify()
+
+    def snapshot(self):
+        """
+        (en curso, en cola) leídos juntos bajo el lock.
+        """
+        with self.condition:
+            return self.active, self.waiting
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+
+_limiter = _Limiter()
+_flights = {}
+_flights_lock = Lock()
+
+_metrics_lock = Lock()
+_metrics = {'calls': 0, 'coalesced': 0, 'rejected': 0, 'errors': 0}
+_queue_times = deque(maxlen=1000)
+
+
+def _count(name, queue_time=None):
+    with _metrics_lock:
+        _metrics[name] += 1
+        if queue_time is not None:
+            _queue_times.append(queue_time)
+
+
+def oracle_metrics():
+    """
+    Contadores del proceso: llamadas a Gemini, pedidos coalescidos, rechazos (503), errores,
+    llamadas en curso / en cola y espera en cola (ms) de las últimas 1000 llamadas.
+    """
+    with _metrics_lock:
+        metrics = dict(_metrics)
+        queue_times = sorted(_queue_times)
+    metrics['active'], metrics['waiting'] = _limiter.snapshot()
+    metrics['limit'] = _max_concurrent_calls()
+    if queue_times:
+        metrics['queue_ms'] = {
+            'p50': round(queue_times[len(queue_times) // 2] * 1000, 1),
+            'p95': round(queue_times[int(len(queue_times) * 0.95)] * 1000, 1),
+            'max': round(queue_times[-1] * 1000, 1),
+        }
+    return metrics
+
+
+def limited_generate(*args, **kwargs):
+    """
+    generate_answer dentro del límite de llamadas concurrentes. Lanza OracleBusy si no hay lugar a tiempo.
+    """
+    waited = _limiter.acquire(_max_concurrent_calls(), _queue_timeout())
+    if waited is None:
+        _count('rejected')
+        logger.warning("[Oracle] Saturado: %s llamadas en curso, pedido rechazado.", _limiter.snapshot()[0])
+        raise OracleBusy(_retry_after())
+    _count('calls', waited)
+    try:
+        return generate_answer(*args, **kwargs)
+    except Exception:
+        _count('errors')
+        raise
+    finally:
+        _limiter.release()
+
+
+def _follower_error(error):
+    # Cada seguidor lanza una excepción propia: relanzar la del líder desde varios hilos
+    # mezclaría sus tracebacks. Se conserva el tipo que las vistas distinguen.
+    if isinstance(error, MissingApiKey):
+        return MissingApiKey(str(error))
+    if isinstance(error, OracleBusy):
+        return OracleBusy(error.retry_after)
+    return OracleError(str(error))
+
+
+def single_flight(key, fn):
+    """
+    Ejecuta fn() una sola vez por `key` entre los pedidos simultáneos del proceso: los demás
+    esperan y reciben el mismo resultado (o un error equivalente, ver _follower_error).
+    `coalesced` cuenta solo los pedidos que recibieron un resultado compartido.
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        if not flight.done.wait(_coalesce_timeout()):
+            raise OracleBusy(_retry_after())
+        if flight.error is not None:
+            raise _follower_error(flight.error) from flight.error
+        _count('coalesced')
+        return flight.result
+
+    try:
+        flight.result = fn()
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+    return flight.result
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- CACHÉ DE RESPUESTAS ---
+# * --------------------------------------------------------------------------------------------------
+_answers = OrderedDict()
+_answers_lock = Lock()
+
+
+def _cache_ttl():
+    return timedelta(days=getattr(settings, 'ORACLE_CACHE_TTL_DAYS', 30))
+
+
+def _cache_size():
+    return getattr(settings, 'ORACLE_CACHE_SIZE', 1000)
+
+
+def _remember(key, digest, text, expires_at):
+    with _answers_lock:
+        _answers[key] = (digest, text, expires_at)
+        _answers.move_to_end(key)
+        while len(_answers) > _cache_size():
+            _answers.popitem(last=False)
+
+
+def get_cached_answer(word_id, question_type, digest):
+    """
+    Respuesta vigente para el prompt `digest`: primero la LRU local, después OracleAnswer. None si no hay.
+    """
+    key = (word_id, question_type)
+    now = timezone.now()
+    with _answers_lock:
+        entry = _answers.get(key)
+        if entry is not None:
+            if entry[0] == digest and entry[2] > now:
+                _answers.move_to_end(key)
+                return entry[1]
+            del _answers[key]
+
+    row = (
+        OracleAnswer.objects.filter(word_id=word_id, question_type=question_type, prompt_hash=digest, expires_at__gt=now)
+        .values_list('response', 'expires_at')
+        .first()
+    )
+    if row is None:
+        return None
+    _remember(key, digest, *row)
+    return row[0]
+
+
+def store_answer(word_id, question_type, digest, text, model_name=''):
+    expires_at = timezone.now() + _cache_ttl()
+    OracleAnswer.objects.update_or_create(
+        word_id=word_id, question_type=question_type,
+        defaults={'prompt_hash': digest, 'response': text, 'model_name': model_name, 'expires_at': expires_at}
+    )
+    _remember((word_id, question_type), digest, text, expires_at)
+
+
+def answer_question(word, question_type):
+    """
+    Respuesta del Oráculo para `word` y `question_type` (ya validado). Devuelve (texto, cacheada).
+    Solo llama a Gemini si no hay respuesta vigente y nadie más en el proceso la está pidiendo;
+    sus errores, MissingApiKey y OracleBusy se propagan.
+    """
+    system_prompt = build_system_prompt(word, question_type)
+    digest = prompt_hash(system_prompt)
+    cached = get_cached_answer(word.id, question_type, digest)
+    if cached is not None:
+        return cached, True
+
+    def fetch():
+        # Otro proceso pudo haberla guardado mientras tanto
+        cached = get_cached_answer(word.id, question_type, digest)
+        if cached is not None:
+            return cached
+        text, model_name = limited_generate(system_prompt)
+        store_answer(word.id, question_type, digest, text, model_name)
+        return text
+
+    return single_flight((word.id, question_type, digest), fetch), False
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- PRECALENTADO ---
+# * --------------------------------------------------------------------------------------------------
+DEFAULT_CHUNK_SIZE = 500
+
+
+def prewarm_answers(question_types=None, delay=1.0, limit=None, max_errors=5, on_answer=None):
+    """
+    Genera las respuestas que faltan (o vencieron) para todo el catálogo, esperando `delay` segundos
+    entre llamadas a Gemini. Corta tras `max_errors` errores seguidos (cuota agotada, sin red...).
+    Devuelve {'generated', 'cached', 'failed'}.
+    """
+    question_types = list(question_types or QUESTION_PROMPTS)
+    totals = {'generated': 0, 'cached': 0, 'failed': 0}
+    consecutive_errors = 0
+    last_id = 0
+
+    while True:
+        words = list(Word.objects.filter(id__gt=last_id).order_by('id').only('id', 'text', 'translation', 'definition')[:DEFAULT_CHUNK_SIZE])
+        if not words:
+            return totals
+        last_id = words[-1].id
+        current = set(
+            OracleAnswer.objects.filter(word_id__in=[word.id for word in words], expires_at__gt=timezone.now())
+            .values_list('word_id', 'question_type', 'prompt_hash')
+        )
+        for word in words:
+            for question_type in question_types:
+                system_prompt = build_system_prompt(word, question_type)
+                digest = prompt_hash(system_prompt)
+                if (word.id, question_type, digest) in current:
+                    totals['cached'] += 1
+                    continue
+                if limit is not None and totals['generated'] + totals['failed'] >= limit:
+                    return totals
+                try:
+                    text, model_name = generate_answer(system_prompt)
+                except MissingApiKey:
+                    raise
+                except Exception:
+                    totals['failed'] += 1
+                    consecutive_errors += 1
+                    if consecutive_errors >= max_errors:
+                        return totals
+                else:
+                    store_answer(word.id, question_type, digest, text, model_name)
+                    totals['generated'] += 1
+                    consecutive_errors = 0
+                if on_answer:
+                    on_answer(word, question_type, totals)
+                time.sleep(delay)
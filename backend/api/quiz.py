@@ -0,0 +1,128 @@
+from api.models import Word
+from api.catalog import get_catalog_version, WORDS
+from api.word_sampler import get_word_sampler, normalize_difficulty
+from api.tags import parse_tags
+from array import array
+from threading import Lock
+import random
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- ÍNDICE INVERTIDO DE ETIQUETAS ---
+# * --------------------------------------------------------------------------------------------------
+DISTRACTORS_PER_QUESTION = 3
+MAX_QUIZ_QUESTIONS = 50
+
+
+class TagIndex:
+    """
+    tag -> ids de palabras con esa etiqueta, y word_id -> etiquetas; se construye desde la
+    tabla Word.tag_set y se reconstruye cuando cambia la versión del catálogo de Word.
+    """
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.word_ids_by_tag = {}
+        self.tags_by_word = {}
+        for word_id, tag in rows:
+            self.tags_by_word.setdefault(word_id, []).append(tag)
+            self.word_ids_by_tag.setdefault(tag, array('q')).append(word_id)
+
+    def related_ids(self, word_id):
+        related = set()
+        for tag in self.tags_by_word.get(word_id, ()):
+            related.update(self.word_ids_by_tag[tag])
+        related.discard(word_id)
+        return related
+
+
+_tag_index = None
+_tag_index_lock = Lock()
+
+def get_tag_index():
+    global _tag_index
+    version = get_catalog_version(WORDS)
+    tag_index = _tag_index
+    if tag_index is None or tag_index.version != version:
+        with _tag_index_lock:
+            if _tag_index is None or _tag_index.version != version:
+                rows = Word.tag_set.through.objects.order_by('word_id', 'tag_id').values_list('word_id', 'tag__name')
+                _tag_index = TagIndex(version, rows.iterator(chunk_size=5000))
+            tag_index = _tag_index
+    return tag_index
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- GENERACIÓN DE QUIZZES ---
+# * --------------------------------------------------------------------------------------------------
+def _pick_distractors(word_id, tag_index, all_ids, rng):
+    """
+    Hasta 3 distractores: primero palabras que comparten etiqueta, luego palabras al azar.
+    """
+    related = sorted(tag_index.related_ids(word_id))
+    distractors = rng.sample(related, min(DISTRACTORS_PER_QUESTION, len(related)))
+
+    attempts = 0
+    while len(distractors) < DISTRACTORS_PER_QUESTION and attempts < DISTRACTORS_PER_QUESTION * 10 and len(all_ids) > 1:
+        candidate = all_ids[rng.randrange(len(all_ids))]
+        if candidate != word_id and candidate not in distractors:
+            distractors.append(candidate)
+        attempts += 1
+    return distractors
+
+
+def build_questions(word_ids, rng=None):
+    """
+    Construye las preguntas para `word_ids` (en ese orden) con un número fijo de consultas:
+    palabras + sinónimos (prefetch) y textos de todos los distractores.
+    """
+    rng = rng or random.Random()
+    tag_index = get_tag_index()
+    all_ids = get_word_sampler().bucket()
+
+    words = {word.id: word for word in Word.objects.filter(id__in=word_ids).prefetch_related('substitutes')}
+    word_ids = [word_id for word_id in word_ids if word_id in words]
+
+    distractors_by_word = {word_id: _pick_distractors(word_id, tag_index, all_ids, rng) for word_id in word_ids}
+    distractor_ids = {distractor_id for ids in distractors_by_word.values() for distractor_id in ids}
+    texts = dict(Word.objects.filter(id__in=distractor_ids).values_list('id', 'text')) if distractor_ids else {}
+
+    questions = []
+    for word_id in word_ids:
+        correct_word = words[word_id]
+        options = [correct_word.text] + [texts[d] for d in distractors_by_word[word_id] if d in texts]
+        rng.shuffle(options)
+        questions.append({
+            "word_id": correct_word.id,
+            "question": f"¿Cómo se dice '{correct_word.translation}'?",
+            "options": options,
+            "accepted_answers": [correct_word.text] + [s.text for s in correct_word.substitutes.all()]
+        })
+    return questions
+
+
+def candidate_ids(word_type=None, difficulty=None, tag=None):
+    """
+    Ids elegibles para el quiz: el bucket del muestreador, restringido a un tag si se pide.
+    """
+    sampler = get_word_sampler()
+    difficulty = normalize_difficulty(difficulty)
+    names = parse_tags(tag)
+    if not names:
+        return sampler.bucket(word_type, difficulty)
+
+    posting = get_tag_index().word_ids_by_tag.get(names[0], ())
+    wanted = (word_type or None, difficulty)
+    return [
+        word_id for word_id in posting
+        if word_id in sampler.word_keys and all(
+            want is None or want == have for want, have in zip(wanted, sampler.word_keys[word_id])
+        )
+    ]
+
+
+def build_quiz(limit, word_type=None, difficulty=None, seed=None, tag=None):
+    """
+    Quiz de `limit` preguntas. Con el mismo `seed` (y el mismo catálogo) el quiz es idéntico.
+    """
+    rng = random.Random(seed)
+    ids = candidate_ids(word_type, difficulty, tag)
+    return build_questions(rng.sample(ids, min(limit, len(ids))), rng)
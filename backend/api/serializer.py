@@ -1,4 +1,5 @@
-from api.models import User, Profile, Word, Badge, UserStats, EmailVerificationToken, Avatar
+from api.models import User, Profile, Word, Badge, UserStats, EmailVerificationToken, Avatar, WordImportJob
+from api.levels import level_expression
 from django.contrib.auth.password_validation import validate_password
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework import serializers
@@ -149,12 +150,40 @@ class WordSerializer(serializers.ModelSerializer):
         ]
 
     def get_is_unlocked(self, obj):
+        # WordViewSet anota `is_unlocked_for_user` (Exists) en la misma consulta de la página;
+        # también se acepta un set de ids en el contexto. La consulta por palabra queda como respaldo.
+        annotated = getattr(obj, 'is_unlocked_for_user', None)
+        if annotated is not None:
+            return annotated
+        unlocked_ids = self.context.get('unlocked_word_ids')
+        if unlocked_ids is not None:
+            return obj.id in unlocked_ids
         request = self.context.get('request')
         if request and hasattr(request, 'user') and request.user.is_authenticated:
             if hasattr(request.user, 'stats'):
                 return request.user.stats.unlocked_words.filter(id=obj.id).exists()
         return False
 
+class WordImportJobSerializer(serializers.ModelSerializer):
+    progress = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = WordImportJob
+        fields = [
+            'id',
+            'mode',
+            'status',
+            'progress',
+            'rows_processed',
+            'created_count',
+            'updated_count',
+            'error_count',
+            'errors',
+            'created_at',
+            'heartbeat_at',
+            'finished_at'
+        ]
+
 # * --------------------------------------------------------------------------------------------------
 # ! --- MODELO BADGE ---
 # * --------------------------------------------------------------------------------------------------
@@ -228,9 +257,26 @@ class AdminUserSerializer(serializers.ModelSerializer):
 from api.models import GameHistory
 
 class GameHistorySerializer(serializers.ModelSerializer):
+    """
+    Fila de los listados: sin match_breakdown ni la evaluación de IA (ver GameHistoryDetailSerializer).
+    has_ai_evaluation viene anotado en la consulta (views.game_history_queryset).
+    """
+    has_ai_evaluation = serializers.BooleanField(read_only=True, default=False)
+
+    class Meta:
+        model = GameHistory
+        fields = ['id', 'game_mode', 'played_at', 'score', 'correct_in_game', 'total_questions_in_game', 'time_spent_seconds', 'letters_killed', 'bosses_killed', 'has_ai_evaluation']
+
+class GameHistoryDetailSerializer(serializers.ModelSerializer):
+    ai_evaluation = serializers.SerializerMethodField()
+
     class Meta:
         model = GameHistory
-        fields = ['id', 'game_mode', 'played_at', 'score', 'correct_in_game', 'total_questions_in_game', 'time_spent_seconds', 'letters_killed', 'bosses_killed', 'match_breakdown', 'ai_evaluation']
+        fields = ['id', 'game_mode', 'played_at', 'score', 'xp_earned', 'correct_in_game', 'total_questions_in_game', 'time_spent_seconds', 'letters_killed', 'bosses_killed', 'match_breakdown', 'ai_evaluation']
+
+    def get_ai_evaluation(self, obj):
+        evaluation = getattr(obj, 'evaluation', None)
+        return evaluation.ai_evaluation if evaluation else None
 
 # * --------------------------------------------------------------------------------------------------
 # ! --- MODELO PROFILE UPDATE ---
@@ -259,29 +305,49 @@ class FarmSerializer(serializers.ModelSerializer):
         return obj.students.count()
 
 class FarmDetailSerializer(serializers.ModelSerializer):
+    """
+    Estudiantes ordenados por experiencia en una sola consulta. Con context['students_limit'] /
+    context['students_offset'] se devuelve solo esa página (top-N); students_count es el total.
+    """
     students_data = serializers.SerializerMethodField()
+    students_count = serializers.SerializerMethodField()
     owner_username = serializers.CharField(source='owner.username', read_only=True)
 
     class Meta:
         model = Farm
-        fields = ['id', 'name', 'owner_username', 'invite_code', 'created_at', 'students_data']
-        read_only_fields = ['owner_username', 'invite_code', 'created_at', 'students_data']
+        fields = ['id', 'name', 'owner_username', 'invite_code', 'created_at', 'students_count', 'students_data']
+        read_only_fields = ['owner_username', 'invite_code', 'created_at', 'students_count', 'students_data']
+
+    def get_students_count(self, obj):
+        return obj.students.count()
 
     def get_students_data(self, obj):
-        students = obj.students.all()
+        stats_qs = (
+            UserStats.objects.filter(user__joined_farms=obj)
+            .select_related('user__profile__current_avatar')
+            .only(
+                'experience', 'unlocked_words_count', 'correct_answers_total', 'total_questions_answered',
+                'user__id', 'user__username', 'user__profile__id', 'user__profile__current_avatar__image'
+            )
+            .annotate(level=level_expression())
+            .order_by('-experience', 'user_id')
+        )
+        offset = self.context.get('students_offset') or 0
+        limit = self.context.get('students_limit')
+        stats_qs = stats_qs[offset:offset + limit] if limit is not None else stats_qs[offset:]
+
         data = []
-        for student in students:
-            if hasattr(student, 'stats'):
-                stats = student.stats
-                accuracy = round((stats.correct_answers_total / (stats.total_questions_answered + 0.0001)) * 100, 1)
-                data.append({
-                    'id': student.id,
-                    'username': student.username,
-                    'level': stats.get_level(),
-                    'experience': stats.experience,
-                    'unlocked_count': stats.unlocked_words.count(),
-                    'accuracy': min(accuracy, 100) if stats.total_questions_answered > 0 else 0,
-                    'current_avatar': student.profile.current_avatar.image.url if hasattr(student, 'profile') and student.profile.current_avatar else None
-                })
-        data.sort(key=lambda x: x['experience'], reverse=True)
+        for stats in stats_qs:
+            student = stats.user
+            profile = getattr(student, 'profile', None)
+            accuracy = round((stats.correct_answers_total / (stats.total_questions_answered + 0.0001)) * 100, 1)
+            data.append({
+                'id': student.id,
+                'username': student.username,
+                'level': stats.level,
+                'experience': stats.experience,
+                'unlocked_count': stats.unlocked_words_count,
+                'accuracy': min(accuracy, 100) if stats.total_questions_answered > 0 else 0,
+                'current_avatar': profile.current_avatar.image.url if profile and profile.current_avatar else None
+            })
         return data
\ No newline at end of file
@@ -1,45 +1,139 @@
 from api.models import UserStats, Avatar
+from api.leaderboard import performance_score_expression
+from api.user_counters import refresh_counters
+from django.db import transaction, NotSupportedError
+from django.db.models import F, Func, Value, JSONField, BooleanField
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class JSONListAppend(Func):
+    """
+    `lista JSON || [valor]` en SQL: jsonb `||` en PostgreSQL, json_insert en SQLite.
+    """
+    output_field = JSONField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(f"JSONListAppend no está implementado para {connection.vendor}.")
+
+    def _compile(self, compiler, template):
+        field, value = self.get_source_expressions()
+        field_sql, field_params = compiler.compile(field)
+        value_sql, value_params = compiler.compile(value)
+        return template % (field_sql, value_sql), (*field_params, *value_params)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self._compile(compiler, "(%s || jsonb_build_array(%s::text))")
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self._compile(compiler, "json_insert(%s, '$[#]', %s)")
+
+
+class JSONListContains(JSONListAppend):
+    """
+    `valor in lista JSON` en SQL: `@>` en PostgreSQL, json_each en SQLite.
+    """
+    output_field = BooleanField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self._compile(compiler, "(%s @> jsonb_build_array(%s::text))")
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self._compile(compiler, "EXISTS (SELECT 1 FROM json_each(%s) WHERE json_each.value = %s)")
+
 
 def award_badge_rewards(user, badge):
     """
     Otorga las recompensas asociadas a un badge al usuario.
     """
-    if not badge.reward_data: 
+    user_stats, created = UserStats.objects.get_or_create(user=user)
+    award_rewards_for_badges(user_stats, [badge])
+
+
+def award_rewards_for_badges(user_stats, badges):
+    """
+    Otorga de una sola vez las recompensas de todos los badges desbloqueados en una evaluación:
+    toda la EXP en un UPDATE con F(), todos los avatares en un add() y todos los títulos en una
+    sola escritura del JSON. Se une a la transacción del llamador (la del desbloqueo).
+    """
+    amount_exp = 0
+    avatar_ids = []
+    titles = []
+    for badge in badges:
+        reward_data = badge.reward_data or {}
+        if 'exp' in reward_data:
+            amount_exp += reward_data['exp']
+        if 'avatar_id' in reward_data:
+            avatar_ids.append(reward_data['avatar_id'])
+        if 'title' in reward_data and reward_data['title'] not in titles:
+            titles.append(reward_data['title'])
+
+    with transaction.atomic(savepoint=False):
+        # Otorgar EXP
+        if amount_exp:
+            UserStats.objects.filter(pk=user_stats.pk).update(
+                experience=F('experience') + amount_exp,
+                performance_score=performance_score_expression() + amount_exp
+            )
+            logger.info("Usuario #%s recibió %s XP de %s badge(s).", user_stats.user_id, amount_exp, len(badges))
+
+        # Otorgar Avatares (add() ignora los que ya tiene)
+        if avatar_ids:
+            existing_ids = set(Avatar.objects.filter(id__in=avatar_ids).values_list('id', flat=True))
+            for avatar_id in set(avatar_ids) - existing_ids:
+                logger.warning("Avatar con ID %s no encontrado para recompensar.", avatar_id)
+            if existing_ids:
+                user_stats.unlocked_avatars.add(*existing_ids)
+
+        # Otorgar Títulos
+        if titles:
+            current = UserStats.objects.select_for_update().filter(pk=user_stats.pk).values_list('unlocked_titles', flat=True).first()
+            current = current if isinstance(current, list) else []
+            new_titles = [title for title in titles if title not in current]
+            if new_titles:
+                UserStats.objects.filter(pk=user_stats.pk).update(unlocked_titles=current + new_titles)
+                user_stats.unlocked_titles = current + new_titles
+                logger.info("Usuario #%s desbloqueó los títulos %s.", user_stats.user_id, new_titles)
+
+    # Más tipos de recompensas (ej. 'coins', 'items', etc.)
+
+
+def award_badge_rewards_bulk(stats_ids, badge):
+    """
+    Otorga las recompensas de un badge a muchos usuarios a la vez (ver badge_backfill).
+    `stats_ids` son ids de UserStats; todas las escrituras son por conjunto.
+    """
+    if not badge.reward_data or not stats_ids:
         return
 
-    reward_data = badge.reward_data 
+    reward_data = badge.reward_data
 
     # Otorgar EXP
     if 'exp' in reward_data:
-        amount_exp = reward_data['exp']
-        user_stats, created = UserStats.objects.get_or_create(user=user) 
-        user_stats.experience += amount_exp 
-        user_stats.save()
-        print(f"Usuario {user.username} recibió {amount_exp} XP del badge '{badge.title}'.")
+        UserStats.objects.filter(id__in=stats_ids).update(
+            experience=F('experience') + reward_data['exp'],
+            performance_score=performance_score_expression() + reward_data['exp']
+        )
 
     # Otorgar Avatar
     if 'avatar_id' in reward_data:
         avatar_id = reward_data['avatar_id']
-        try:
-            avatar = Avatar.objects.get(id=avatar_id) 
-            user_stats = user.stats 
-            if avatar not in user_stats.unlocked_avatars.all():
-                user_stats.unlocked_avatars.add(avatar) 
-                user_stats.save()
-                print(f"Usuario {user.username} desbloqueó el avatar '{avatar.name}' del badge '{badge.title}'.")
-        except Avatar.DoesNotExist:
-            print(f"Advertencia: Avatar con ID {avatar_id} no encontrado para recompensar.")
+        if Avatar.objects.filter(id=avatar_id).exists():
+            through = UserStats.unlocked_avatars.through
+            through.objects.bulk_create(
+                [through(userstats_id=stats_id, avatar_id=avatar_id) for stats_id in stats_ids],
+                ignore_conflicts=True
+            )
+            # bulk_create no dispara m2m_changed
+            refresh_counters(UserStats.objects.filter(id__in=stats_ids), ['unlocked_avatars'])
+        else:
+            logger.warning("Avatar con ID %s no encontrado para recompensar.", avatar_id)
 
     # Otorgar Título
     if 'title' in reward_data:
-        title = reward_data['title']
-        user_stats = user.stats 
-        if not isinstance(user_stats.unlocked_titles, list):
-            user_stats.unlocked_titles = []
-            
-        if title not in user_stats.unlocked_titles:
-            user_stats.unlocked_titles.append(title)
-            user_stats.save()
-            print(f"Usuario {user.username} desbloqueó el título '{title}' del badge '{badge.title}'.")
-
-    # Más tipos de recompensas (ej. 'coins', 'items', etc.)
\ No newline at end of file
+        # Un solo UPDATE: agrega el título al JSON de quienes aún no lo tienen
+        title = Value(reward_data['title'])
+        UserStats.objects.filter(id__in=stats_ids).exclude(JSONListContains('unlocked_titles', title)).update(
+            unlocked_titles=JSONListAppend('unlocked_titles', title)
+        )
@@ -0,0 +1,57 @@
+from api.models import Tag, Word
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- TAGS NORMALIZADOS ---
+# * --------------------------------------------------------------------------------------------------
+# Word.tags sigue siendo el texto editable ("food, fun"); Word.tag_set es su versión normalizada
+# (tabla Tag + tabla intermedia indexada) y es la que se usa para filtrar y elegir distractores.
+
+def parse_tags(tags):
+    """
+    "Food, fun,,food" -> ['food', 'fun'] (minúsculas, sin vacíos ni repetidos, en orden).
+    """
+    names = []
+    for tag in (tags or '').split(','):
+        tag = tag.strip().lower()[:Tag._meta.get_field('name').max_length]
+        if tag and tag not in names:
+            names.append(tag)
+    return names
+
+
+def upsert_tags(names):
+    """
+    Crea en bloque los tags que falten y devuelve {name: id}. Dos consultas sin importar la cantidad.
+    """
+    names = set(names)
+    if not names:
+        return {}
+    Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+    return dict(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+
+
+def set_word_tags(tags_by_word):
+    """
+    Reemplaza los tags de varias palabras a partir de sus strings: {word_id: "food, fun"}.
+    """
+    if not tags_by_word:
+        return
+    through = Word.tag_set.through
+    names_by_word = {word_id: parse_tags(tags) for word_id, tags in tags_by_word.items()}
+    tag_ids = upsert_tags(name for names in names_by_word.values() for name in names)
+
+    through.objects.filter(word_id__in=names_by_word.keys()).delete()
+    through.objects.bulk_create([
+        through(word_id=word_id, tag_id=tag_ids[name])
+        for word_id, names in names_by_word.items()
+        for name in names
+    ], ignore_conflicts=True)
+
+
+def filter_by_tags(queryset, tags):
+    """
+    Palabras que tienen al menos uno de los tags (?tags=food,fun), vía join indexado.
+    """
+    names = parse_tags(tags)
+    if not names:
+        return queryset
+    return queryset.filter(tag_set__name__in=names).distinct()
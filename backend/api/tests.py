@@ -1,3 +1,361 @@
-from django.test import TestCase
+import threading
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from rest_framework.test import APIClient # pyright: ignore[reportMissingImports]
+from api.models import User, UserStats, Farm, GameHistory, DailyUserStats, Badge, Word
+from api.badge_unlock_logic import check_and_unlock_badges, STAT_CONDITIONS, DERIVED_CONDITIONS
+from api.badge_backfill import backfill_badges
+from api.services import award_badge_rewards_bulk
+from api.word_search import search_words, get_search_backend
+from api.unlocked_words import unlock_words
+from api import word_sampler
+from api.history_archive import archive_game_history, archive_cutoff
+from django.utils import timezone
+from datetime import datetime, time, timedelta
 
-# Create your tests here.
+
+class FarmDetailQueriesTests(TestCase):
+    """
+    GET /api/farms/<id>/ arma students_data con una consulta fija, sin importar cuántos alumnos haya.
+    """
+
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='profe', email='profe@misspelt.local', password='x', is_staff=True)
+        self.farm = Farm.objects.create(name='Granja', owner=self.teacher, invite_code='FARM01')
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def add_students(self, count, with_stats=True):
+        start = self.farm.students.count()
+        for i in range(start, start + count):
+            student = User.objects.create_user(username=f'alumno{i}', email=f'alumno{i}@misspelt.local', password='x')
+            if with_stats:
+                UserStats.objects.filter(user=student).update(experience=i * 10)
+            else:
+                UserStats.objects.filter(user=student).delete()
+            self.farm.students.add(student)
+
+    def get_farm(self, expected_queries):
+        with self.assertNumQueries(expected_queries):
+            response = self.client.get(f'/api/farms/{self.farm.id}/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_query_count_does_not_grow_with_students(self):
+        self.add_students(2)
+        self.add_students(1, with_stats=False)
+        data = self.get_farm(4)
+        self.assertEqual((data['students_count'], len(data['students_data'])), (3, 2))
+
+        self.add_students(15)
+        self.add_students(3, with_stats=False)
+        data = self.get_farm(4)
+        # students_count cuenta a todos; students_data solo a los que tienen UserStats
+        self.assertEqual((data['students_count'], len(data['students_data'])), (21, 17))
+        self.assertEqual(data['students_data'][0]['username'], 'alumno17')
+
+
+class ArchivedHistoryCountTests(TestCase):
+    """
+    El `count` del historial son las partidas listables: las archivadas no se pueden paginar.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='jugador', email='jugador@misspelt.local', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for score in range(8):
+            self.client.post('/api/game/submit-results/', {'score': score, 'xp_earned': 1, 'match_id': f'm{score}'}, format='json')
+        old = timezone.now() - timedelta(days=400)
+        GameHistory.objects.filter(user=self.user, score__lt=3).update(played_at=old)
+        archive_game_history(archive_cutoff())
+
+    def test_count_matches_listed_items(self):
+        listed, url, count = [], '/api/game-history/', None
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            count = response.data['count']
+            listed += response.data['results']
+            url = response.data['next']
+        self.assertEqual((count, len(listed)), (5, 5))
+        # matches_played sigue contando la carrera completa
+        self.assertEqual(UserStats.objects.get(user=self.user).matches_played, 8)
+
+    def test_student_detail_history_count(self):
+        teacher = User.objects.create_user(username='profe', email='profe@misspelt.local', password='x', is_staff=True)
+        farm = Farm.objects.create(name='Granja', owner=teacher, invite_code='FARM02')
+        farm.students.add(self.user)
+        self.client.force_authenticate(teacher)
+        data = self.client.get(f'/api/farms/{farm.id}/student-detail/{self.user.id}/').data
+        self.assertEqual((data['total_battles'], data['history_count']), (8, 5))
+
+    def test_archived_match_id_is_still_a_duplicate(self):
+        response = self.client.post('/api/game/submit-results/', {'match_id': 'm0', 'xp_earned': 100}, format='json')
+        self.assertTrue(response.data['duplicate'])
+        response = self.client.post('/api/game/submit-results/batch/', {'matches': [
+            {'match_id': 'm1', 'xp_earned': 100}, {'match_id': 'nueva', 'xp_earned': 1},
+        ]}, format='json')
+        self.assertEqual((response.data['accepted'], response.data['duplicates']), (['nueva'], ['m1']))
+        self.assertEqual(UserStats.objects.get(user=self.user).experience, 9)
+
+
+class OfflineBatchDaysTests(TestCase):
+    """
+    Las partidas sin conexión cuentan en el día en que se jugaron (`played_at`), no en el de la sincronización.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='offline', email='offline@misspelt.local', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+
+    def at(self, days_ago, hour=12):
+        return timezone.make_aware(datetime.combine(self.today - timedelta(days=days_ago), time(hour))).isoformat()
+
+    def test_batch_spread_over_days(self):
+        response = self.client.post('/api/game/submit-results/batch/', {'matches': [
+            {'match_id': 'a', 'xp_earned': 1, 'played_at': self.at(2)},
+            {'match_id': 'b', 'xp_earned': 2, 'played_at': self.at(2, hour=13)},
+            {'match_id': 'c', 'xp_earned': 4, 'played_at': self.at(1)},
+            {'match_id': 'd', 'xp_earned': 8, 'played_at': self.at(0, hour=0)},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.current_streak, stats.longest_streak, stats.last_login_date), (3, 3, self.today))
+        daily = dict(DailyUserStats.objects.filter(user=self.user).values_list('day', 'xp_earned'))
+        self.assertEqual(daily, {
+            self.today - timedelta(days=2): 3,
+            self.today - timedelta(days=1): 4,
+            self.today: 8,
+        })
+        played = GameHistory.objects.get(user=self.user, client_match_id='c').played_at
+        self.assertEqual(timezone.localdate(played), self.today - timedelta(days=1))
+
+    def test_late_match_does_not_reset_streak(self):
+        self.client.post('/api/game/submit-results/', {'match_id': 'hoy'}, format='json')
+        self.client.post('/api/game/submit-results/', {'match_id': 'vieja', 'played_at': self.at(5)}, format='json')
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.current_streak, stats.last_login_date), (1, self.today))
+
+    def test_played_at_validation(self):
+        future = (timezone.now() + timedelta(days=3)).isoformat()
+        self.client.post('/api/game/submit-results/', {'match_id': 'f', 'played_at': future}, format='json')
+        self.assertLessEqual(GameHistory.objects.get(client_match_id='f').played_at, timezone.now())
+        response = self.client.post('/api/game/submit-results/', {'played_at': 'ayer'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class DuplicateMatchTests(TestCase):
+    """
+    Un `match_id` repetido responde `duplicate: true` y no vuelve a sumar XP, tanto en partida suelta como en lote.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='repetido', email='repetido@misspelt.local', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def experience(self):
+        return UserStats.objects.get(user=self.user).experience
+
+    def test_single_duplicate(self):
+        first = self.client.post('/api/game/submit-results/', {'match_id': 'x', 'xp_earned': 5}, format='json')
+        again = self.client.post('/api/game/submit-results/', {'match_id': 'x', 'xp_earned': 5}, format='json')
+        self.assertEqual((first.status_code, again.status_code), (200, 200))
+        self.assertEqual((first.data['duplicate'], again.data['duplicate']), (False, True))
+        self.assertEqual((self.experience(), GameHistory.objects.filter(user=self.user).count()), (5, 1))
+
+    def test_batch_duplicates(self):
+        self.client.post('/api/game/submit-results/', {'match_id': 'x', 'xp_earned': 5}, format='json')
+        response = self.client.post('/api/game/submit-results/batch/', {'matches': [
+            {'match_id': 'x', 'xp_earned': 5},
+            {'match_id': 'y', 'xp_earned': 3},
+            {'match_id': 'y', 'xp_earned': 3},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['accepted'], ['y'])
+        self.assertEqual(sorted(response.data['duplicates']), ['x', 'y'])
+
+        again = self.client.post('/api/game/submit-results/batch/', {'matches': [{'match_id': 'y', 'xp_earned': 3}]}, format='json')
+        self.assertEqual((again.data['accepted'], again.data['duplicates']), ([], ['y']))
+        self.assertEqual((self.experience(), GameHistory.objects.filter(user=self.user).count()), (8, 2))
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentSubmitTests(TransactionTestCase):
+    """
+    Envíos simultáneos del mismo usuario no pierden incrementos: los contadores se suman con F() en la base.
+    Solo en PostgreSQL: la base en memoria de SQLite para tests no admite escrituras desde varios hilos.
+    """
+
+    def submit(self, match_id, errors):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        try:
+            response = client.post('/api/game/submit-results/', {'match_id': match_id, 'xp_earned': 1, 'score': 2}, format='json')
+            if response.status_code != 200:
+                errors.append(response.status_code)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    def test_no_lost_increments(self):
+        self.user = User.objects.create_user(username='paralelo', email='paralelo@misspelt.local', password='x')
+        errors = []
+        threads = [threading.Thread(target=self.submit, args=(f'p{i}', errors)) for i in range(8)]
+        [t.start() for t in threads]
+        [t.join() for t in threads]
+        self.assertEqual(errors, [])
+
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.matches_played, stats.experience, stats.total_score), (8, 8, 16))
+
+
+class BadgeBackfillConsistencyTests(TestCase):
+    """
+    badge_backfill (condiciones traducidas a SQL) otorga exactamente lo que otorgaría check_and_unlock_badges.
+    """
+
+    class Rollback(Exception):
+        pass
+
+    def make_badge(self, title, conditions, reward_data=None):
+        return Badge.objects.create(
+            title=title, description=title, condition_description=title, reward_description='',
+            unlock_condition_data=conditions, reward_data=reward_data or {},
+        )
+
+    def make_player(self, k, **fields):
+        user = User.objects.create_user(username=f'badge{k}', email=f'badge{k}@misspelt.local', password='x')
+        UserStats.objects.filter(user=user).update(**fields)
+        return user
+
+    def test_backfill_matches_unlock_logic(self):
+        thresholds = {'level_reached': 2.5, 'general_accuracy': 50, 'slang_accuracy': 50, 'phrasal_verb_accuracy': 50}
+        for condition_type in [*STAT_CONDITIONS, *DERIVED_CONDITIONS]:
+            self.make_badge(condition_type, [{'type': condition_type, 'value': thresholds.get(condition_type, 5)}])
+        self.make_badge('combinado', [{'type': 'correct_slangs', 'value': 5}, {'type': 'slang_accuracy', 'value': 60}])
+
+        fields = sorted(set(STAT_CONDITIONS.values()) - {'experience'}) + ['unlocked_words_count', 'unlocked_avatars_count']
+        users = []
+        for k, experience in enumerate([0, 299, 300, 301, 1000]):
+            values = {field: ((k + j) % 5) * 2 for j, field in enumerate(fields)}
+            users.append(self.make_player(k, experience=experience, **values))
+        # Justo en el umbral de cada condición
+        users.append(self.make_player('umbral', experience=300, correct_answers_total=1, total_questions_answered=2,
+                                      **{field: 5 for field in fields if field != 'correct_answers_total' and field != 'total_questions_answered'}))
+        for k, user in enumerate(users):
+            # Cuenta la última partida, no la mejor
+            GameHistory.objects.create(user=user, letters_killed=50, bosses_killed=50, time_spent_seconds=50,
+                                       played_at=timezone.now() - timedelta(days=1))
+            GameHistory.objects.create(user=user, letters_killed=k * 2, bosses_killed=k, time_spent_seconds=k * 3)
+
+        expected = set()
+        for user in users:
+            try:
+                with transaction.atomic():
+                    expected |= {(user.stats.id, badge.id) for badge in check_and_unlock_badges(user)}
+                    raise self.Rollback
+            except self.Rollback:
+                pass
+        self.assertTrue(expected)
+
+        backfill_badges()
+        granted = set(UserStats.badges.through.objects.values_list('userstats_id', 'badge_id'))
+        self.assertEqual(granted, expected)
+
+    def test_title_reward_is_appended_once(self):
+        badge = self.make_badge('pionero', [{'type': 'current_streak', 'value': 0}], {'title': 'Pionero'})
+        users = [
+            self.make_player(0, unlocked_titles=['Pionero']),
+            self.make_player(1, unlocked_titles=['Otro']),
+            self.make_player(2),
+        ]
+        self.assertEqual(backfill_badges([badge]), {badge: 3})
+        stats_ids = [user.stats.id for user in users]
+        award_badge_rewards_bulk(stats_ids, badge)
+        titles = [UserStats.objects.get(id=stats_id).unlocked_titles for stats_id in stats_ids]
+        self.assertEqual(titles, [['Pionero'], ['Otro', 'Pionero'], ['Pionero']])
+
+
+class WordSearchTests(TestCase):
+    """
+    Búsqueda del diccionario: índice de texto completo y, si el término no tiene palabras, subcadena.
+    """
+
+    def setUp(self):
+        self.give_up = Word.objects.create(text='Give up', translation='Rendirse', definition='To stop trying')
+        self.given = Word.objects.create(text='Given', translation='Dado', definition='Something you give: 100%')
+
+    def search(self, term):
+        return list(search_words(Word.objects.all(), term).values_list('text', flat=True))
+
+    def test_prefix_and_translation(self):
+        self.assertEqual(sorted(self.search('give')), ['Give up', 'Given'])
+        self.assertEqual(self.search('give up'), ['Give up'])
+        # El índice también cubre la traducción (icontains solo miraba text y definition)
+        expected = [] if get_search_backend().name == 'icontains' else ['Give up']
+        self.assertEqual(self.search('rendir'), expected)
+
+    def test_term_without_words_falls_back_to_substring(self):
+        self.assertEqual(self.search('%'), ['Given'])
+        self.assertEqual(self.search('"*'), [])
+
+
+class DiscoveredWordsCacheTests(TestCase):
+    """
+    La copia en memoria de las palabras desbloqueadas se invalida con unlocked_words_count, no por tiempo.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='descubre', email='descubre@misspelt.local', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.words = [Word.objects.create(text=f'palabra{i}', definition='d') for i in range(4)]
+        word_sampler._unlocked_cache.clear()
+
+    def discovered(self):
+        response = self.client.get('/api/game/quiz-words/?discovered=true&limit=10')
+        return sorted(word['id'] for word in response.data)
+
+    def test_unlock_from_another_process_is_visible(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/game/submit-results/', {'correct_word_ids': [self.words[0].id]}, format='json')
+        self.assertEqual(self.discovered(), [self.words[0].id])
+
+        # Otro proceso: desbloquea sin pasar por add_unlocked_words de este proceso
+        unlock_words(UserStats.objects.get(user=self.user), [self.words[1].id, self.words[2].id])
+        self.assertEqual(self.discovered(), [word.id for word in self.words[:3]])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/game/submit-results/', {'correct_word_ids': [self.words[3].id]}, format='json')
+        self.assertEqual(self.discovered(), [word.id for word in self.words])
+
+
+class LeaderboardShapeTests(TestCase):
+    """
+    leaderboard/ sigue respondiendo una lista; el sobre paginado solo con ?page.
+    """
+
+    def setUp(self):
+        for i in range(4):
+            user = User.objects.create_user(username=f'rank{i}', email=f'rank{i}@misspelt.local', password='x')
+            stats = UserStats.objects.get(user=user)
+            stats.experience = i * 100
+            stats.save()  # recalcula performance_score
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_list_by_default(self):
+        response = self.client.get('/api/leaderboard/?limit=3')
+        self.assertIsInstance(response.data, list)
+        self.assertEqual([entry['rank'] for entry in response.data], [1, 2, 3])
+        self.assertEqual(response.data[0]['user_username'], 'rank3')
+
+    def test_envelope_with_page(self):
+        response = self.client.get('/api/leaderboard/?limit=3&page=2')
+        self.assertEqual((response.data['count'], [entry['rank'] for entry in response.data['results']]), (4, [4]))
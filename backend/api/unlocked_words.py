@@ -0,0 +1,211 @@
+from api.models import UserStats, Word
+from api.leaderboard import performance_score_expression
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- ALMACENAMIENTO DE PALABRAS DESBLOQUEADAS ---
+# * --------------------------------------------------------------------------------------------------
+# Por defecto las palabras desbloqueadas viven en el M2M UserStats.unlocked_words (una fila por
+# usuario y palabra). Con UNLOCKED_WORDS_STORAGE = 'bitmap' viven en UserStats.unlocked_words_bitmap:
+# el bit i (byte i // 8, bit i % 8) está prendido si la palabra con id i está desbloqueada.
+# Con ids de palabra hasta 20.000 el bitmap ocupa como mucho 2,5 KB por usuario, sin índice aparte.
+# Al borrar una Word su bit queda prendido hasta el próximo reconcile_user_counters.
+# Para pasar de un modo al otro: comando convert_unlocked_words (y después cambiar el setting).
+# Comparación de tamaño y latencia: comando bench_unlocked_words.
+
+M2M = 'm2m'
+BITMAP = 'bitmap'
+
+
+def storage_mode():
+    return getattr(settings, 'UNLOCKED_WORDS_STORAGE', M2M)
+
+
+def bitmap_enabled():
+    return storage_mode() == BITMAP
+
+
+class WordBitmap:
+    """
+    Conjunto de ids de palabras sobre un bytearray: pertenencia O(1); conteo, unión e
+    intersección en C a través de int.
+    """
+
+    __slots__ = ('data',)
+
+    def __init__(self, data=b''):
+        self.data = bytearray(data or b'')
+
+    @classmethod
+    def from_ids(cls, word_ids):
+        bitmap = cls()
+        bitmap.add(word_ids)
+        return bitmap
+
+    @classmethod
+    def _from_int(cls, value):
+        return cls(value.to_bytes((value.bit_length() + 7) // 8, 'little'))
+
+    def _as_int(self):
+        return int.from_bytes(self.data, 'little')
+
+    def __contains__(self, word_id):
+        byte = word_id >> 3
+        return 0 <= byte < len(self.data) and bool(self.data[byte] >> (word_id & 7) & 1)
+
+    def __len__(self):
+        return self._as_int().bit_count()
+
+    def __iter__(self):
+        for byte_index, byte in enumerate(self.data):
+            if byte:
+                base = byte_index << 3
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        yield base + bit
+
+    def __and__(self, other):
+        return WordBitmap._from_int(self._as_int() & other._as_int())
+
+    def __or__(self, other):
+        return WordBitmap._from_int(self._as_int() | other._as_int())
+
+    def add(self, word_ids):
+        """
+        Prende los bits de `word_ids`. Devuelve cuántos eran nuevos.
+        """
+        added = 0
+        for word_id in word_ids:
+            byte = word_id >> 3
+            if byte >= len(self.data):
+                self.data.extend(bytes(byte + 1 - len(self.data)))
+            mask = 1 << (word_id & 7)
+            if not self.data[byte] & mask:
+                self.data[byte] |= mask
+                added += 1
+        return added
+
+    def to_bytes(self):
+        return bytes(self.data.rstrip(b'\x00'))
+
+
+def load_bitmap(stats_id):
+    data = UserStats.objects.filter(pk=stats_id).values_list('unlocked_words_bitmap', flat=True).first()
+    return WordBitmap(data)
+
+
+def unlocked_word_ids(user_id):
+    """
+    Ids desbloqueados por el usuario (un set o un WordBitmap), con una sola consulta.
+    """
+    if bitmap_enabled():
+        data = UserStats.objects.filter(user_id=user_id).values_list('unlocked_words_bitmap', flat=True).first()
+        return WordBitmap(data)
+    return set(
+        UserStats.unlocked_words.through.objects.filter(userstats__user_id=user_id).values_list('word_id', flat=True)
+    )
+
+
+def unlock_words(stats, word_ids):
+    """
+    Agrega `word_ids` a las palabras desbloqueadas de `stats`. Devuelve cuántas eran nuevas.
+    En modo M2M, add() ignora las que ya tenía y la señal sync_unlock_counters suma las nuevas a
+    unlocked_words_count (y a `stats` en memoria) recalculando performance_score en el mismo UPDATE.
+    En modo bitmap se lee y reescribe el bitmap: el llamador ya tiene bloqueada la fila de UserStats
+    (UPDATE de contadores o select_for_update) dentro de la transacción.
+    """
+    if not bitmap_enabled():
+        unlocked_before = stats.unlocked_words_count
+        stats.unlocked_words.add(*word_ids)
+        return stats.unlocked_words_count - unlocked_before
+
+    bitmap = load_bitmap(stats.pk)
+    new_words = bitmap.add(word_ids)
+    if new_words:
+        UserStats.objects.filter(pk=stats.pk).update(
+            unlocked_words_bitmap=bitmap.to_bytes(),
+            unlocked_words_count=F('unlocked_words_count') + new_words,
+            performance_score=performance_score_expression(unlocked_delta=new_words)
+        )
+        stats.unlocked_words_count += new_words
+    return new_words
+
+
+def catalog_bitmap():
+    """
+    Bitmap con todas las palabras existentes (para descartar bits de palabras borradas).
+    """
+    return WordBitmap.from_ids(Word.objects.values_list('id', flat=True).iterator(chunk_size=5000))
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- CONVERSIÓN ENTRE MODOS ---
+# * --------------------------------------------------------------------------------------------------
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def _stats_id_chunks(chunk_size):
+    last_id = 0
+    while True:
+        ids = list(UserStats.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def convert_to_bitmap(chunk_size=DEFAULT_CHUNK_SIZE, drop_m2m=False, on_chunk=None):
+    """
+    Copia el M2M a los bitmaps (unión con lo que ya hubiera), por bloques de usuarios.
+    Con `drop_m2m` borra después las filas intermedias copiadas. Devuelve los usuarios procesados.
+    """
+    through = UserStats.unlocked_words.through
+    processed = 0
+    for ids in _stats_id_chunks(chunk_size):
+        with transaction.atomic():
+            word_ids = {}
+            rows = through.objects.filter(userstats_id__in=ids).values_list('userstats_id', 'word_id')
+            for stats_id, word_id in rows.iterator(chunk_size=10000):
+                word_ids.setdefault(stats_id, []).append(word_id)
+
+            to_update = []
+            for stats in UserStats.objects.select_for_update().filter(id__in=ids).only('id', 'unlocked_words_bitmap'):
+                bitmap = WordBitmap(stats.unlocked_words_bitmap)
+                bitmap.add(word_ids.get(stats.id, ()))
+                stats.unlocked_words_bitmap = bitmap.to_bytes()
+                stats.unlocked_words_count = len(bitmap)
+                to_update.append(stats)
+            UserStats.objects.bulk_update(to_update, ['unlocked_words_bitmap', 'unlocked_words_count'])
+            if drop_m2m:
+                # Borrado directo de la tabla intermedia: no dispara m2m_changed (los contadores ya están)
+                through.objects.filter(userstats_id__in=ids).delete()
+        processed += len(ids)
+        if on_chunk:
+            on_chunk(processed)
+    return processed
+
+
+def convert_to_m2m(chunk_size=DEFAULT_CHUNK_SIZE, on_chunk=None):
+    """
+    Vuelca los bitmaps al M2M y los vacía. Devuelve los usuarios procesados.
+    """
+    from api.user_counters import count_expression
+
+    through = UserStats.unlocked_words.through
+    existing = catalog_bitmap()
+    processed = 0
+    for ids in _stats_id_chunks(chunk_size):
+        with transaction.atomic():
+            rows = []
+            for stats_id, data in UserStats.objects.select_for_update().filter(id__in=ids).values_list('id', 'unlocked_words_bitmap'):
+                rows.extend(through(userstats_id=stats_id, word_id=word_id) for word_id in WordBitmap(data) & existing)
+            through.objects.bulk_create(rows, batch_size=5000, ignore_conflicts=True)
+            UserStats.objects.filter(id__in=ids).update(
+                unlocked_words_bitmap=b'',
+                unlocked_words_count=count_expression('unlocked_words')
+            )
+        processed += len(ids)
+        if on_chunk:
+            on_chunk(processed)
+    return processed
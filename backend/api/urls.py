@@ -19,6 +19,7 @@ urlpatterns = [
     path("dashboard-data/", views.AdminDashboardDataAPIView.as_view(), name="admin_dashboard_data"),
     path("landing-stats/", views.LandingStatsAPIView.as_view(), name="landing_stats"),
     path("leaderboard/", views.get_leaderboard, name="leaderboard"),
+    path("leaderboard/me/", views.get_my_leaderboard_rank, name="leaderboard_me"),
     path("token/", views.MyTokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("register/", views.RegisterView.as_view(), name="auth_register"),
@@ -30,13 +31,16 @@ urlpatterns = [
 
     # --- RUTAS DE JUEGO ---
     path("game/quiz-words/", views.get_quiz_words, name="game_quiz_words"),
+    path("game/quiz/", views.get_quiz, name="game_quiz"),
     path("game/submit-results/", views.submit_game_results, name="game_submit_results"),
+    path("game/submit-results/batch/", views.submit_game_results_batch, name="game_submit_results_batch"),
     path("game/oracle/", views.oracle_query, name="oracle_query"),
     path("game/oracle-post-game/", views.oracle_post_game_query, name="oracle_post_game_query"),
     # -------------------------------
 
     # --- RUTAS DE PERFIL ---
     path("game-history/", views.GameHistoryListView.as_view(), name="game_history_list"),
+    path("game-history/<int:pk>/", views.GameHistoryDetailView.as_view(), name="game_history_detail"),
     path("profile/me/", views.ProfileUpdateView.as_view(), name="profile_me"),
     # -------------------------------
 
@@ -0,0 +1,115 @@
+from api.models import UserStats, GameHistory, ArchivedGameHistory
+from api.leaderboard import refresh_performance_scores
+from api.unlocked_words import WordBitmap, bitmap_enabled, catalog_bitmap
+from django.db import transaction
+from django.db.models import F, Count, OuterRef, Subquery, IntegerField
+from django.db.models.functions import Coalesce
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- CONTADORES DESNORMALIZADOS DE USERSTATS ---
+# * --------------------------------------------------------------------------------------------------
+# unlocked_words_count, unlocked_avatars_count y badges_count copian el tamaño de cada M2M.
+# Los mantiene la señal sync_unlock_counters (models.py) en add/remove/clear y al borrar una
+# Word/Avatar/Badge; las escrituras masivas por la tabla intermedia (bulk_create) llaman a
+# refresh_counters. reconcile_counters (comando reconcile_user_counters) repara cualquier deriva.
+# Con UNLOCKED_WORDS_STORAGE = 'bitmap', unlocked_words_count lo mantiene api/unlocked_words.py.
+
+# Campo M2M de UserStats -> columna contador
+UNLOCK_COUNTERS = {
+    'unlocked_words': 'unlocked_words_count',
+    'unlocked_avatars': 'unlocked_avatars_count',
+    'badges': 'badges_count',
+}
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def _count(model, owner_field):
+    counts = (
+        model.objects.filter(**{owner_field: OuterRef('pk')})
+        .values(owner_field)
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def count_expression(m2m_field):
+    """
+    Cantidad real de filas de la tabla intermedia de `m2m_field` para cada UserStats.
+    """
+    return _count(getattr(UserStats, m2m_field).through, 'userstats_id')
+
+
+def matches_played_expression():
+    return _count(GameHistory, 'user_id') + _count(ArchivedGameHistory, 'user_id')
+
+
+def refresh_counters(queryset, m2m_fields=None):
+    """
+    Recalcula los contadores (todos, o los de `m2m_fields`) de las filas de `queryset` en un UPDATE.
+    """
+    m2m_fields = [field for field in (m2m_fields or UNLOCK_COUNTERS) if field in _m2m_backed_fields()]
+    if not m2m_fields:
+        return
+    queryset.update(**{UNLOCK_COUNTERS[field]: count_expression(field) for field in m2m_fields})
+    if 'unlocked_words' in m2m_fields:
+        refresh_performance_scores(queryset)
+
+
+def _m2m_backed_fields():
+    # Con UNLOCKED_WORDS_STORAGE = 'bitmap' el M2M de palabras no se usa: su contador sale del bitmap
+    if bitmap_enabled():
+        return [field for field in UNLOCK_COUNTERS if field != 'unlocked_words']
+    return list(UNLOCK_COUNTERS)
+
+
+def _reconcile_bitmaps(ids, catalog):
+    """
+    Quita los bits de palabras borradas y corrige unlocked_words_count con el popcount.
+    """
+    to_update = []
+    for stats in UserStats.objects.filter(id__in=ids).only('id', 'unlocked_words_bitmap', 'unlocked_words_count'):
+        bitmap = WordBitmap(stats.unlocked_words_bitmap) & catalog
+        data = bitmap.to_bytes()
+        if len(bitmap) != stats.unlocked_words_count or data != bytes(stats.unlocked_words_bitmap):
+            stats.unlocked_words_bitmap = data
+            stats.unlocked_words_count = len(bitmap)
+            to_update.append(stats)
+    UserStats.objects.bulk_update(to_update, ['unlocked_words_bitmap', 'unlocked_words_count'])
+    return len(to_update)
+
+
+def reconcile_counters(chunk_size=DEFAULT_CHUNK_SIZE, on_chunk=None):
+    """
+    Compara cada contador (y matches_played) con su valor real y corrige las filas que difieren,
+    por rangos de id. Devuelve {columna: filas corregidas}.
+    """
+    expressions = {UNLOCK_COUNTERS[field]: count_expression(field) for field in _m2m_backed_fields()}
+    expressions['matches_played'] = matches_played_expression()
+    fixed = dict.fromkeys(UNLOCK_COUNTERS.values(), 0)
+    fixed['matches_played'] = 0
+    catalog = catalog_bitmap() if bitmap_enabled() else None
+    last_id = 0
+
+    while True:
+        ids = list(UserStats.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return fixed
+        with transaction.atomic():
+            for column, expression in expressions.items():
+                drifted = list(
+                    UserStats.objects.filter(id__in=ids)
+                    .annotate(_real=expression)
+                    .exclude(**{column: F('_real')})
+                    .values_list('id', flat=True)
+                )
+                if drifted:
+                    UserStats.objects.filter(id__in=drifted).update(**{column: expression})
+                    fixed[column] += len(drifted)
+            if catalog is not None:
+                fixed['unlocked_words_count'] += _reconcile_bitmaps(ids, catalog)
+            refresh_performance_scores(UserStats.objects.filter(id__in=ids))
+        last_id = ids[-1]
+        if on_chunk:
+            on_chunk(last_id, fixed)
@@ -4,25 +4,41 @@ from rest_framework.pagination import PageNumberPagination # pyright: ignore[rep
 from django_filters.rest_framework import DjangoFilterBackend # pyright: ignore[reportMissingImports]
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser # pyright: ignore[reportMissingImports]
 from rest_framework.response import Response # pyright: ignore[reportMissingImports]
+from rest_framework.exceptions import ValidationError # pyright: ignore[reportMissingImports]
 from rest_framework.views import APIView # pyright: ignore[reportMissingImports]
 from rest_framework_simplejwt.views import TokenObtainPairView # pyright: ignore[reportMissingImports]
-from api.models import User, Word, Badge, UserStats, EmailVerificationToken, Avatar, GameHistory, Farm
+from api.models import User, Word, Badge, UserStats, EmailVerificationToken, Avatar, GameHistory, GameEvaluation, Farm, WordImportJob
 from api.services import award_badge_rewards
 from api.badge_unlock_logic import check_and_unlock_badges
+from api.word_sampler import sample_words, sample_unlocked_words
+from api.unlocked_words import bitmap_enabled, unlocked_word_ids
+from api.tags import filter_by_tags
+from api.word_search import search_words
+from api.word_snapshot import get_word_snapshot, word_changes
+from api.word_import import start_import_job, fail_stale_import_jobs
+from api.word_export import stream_words_csv, stream_words_jsonl
+from api.leaderboard import leaderboard_queryset, leaderboard_entry, rank_of
+from api.history_pagination import GameHistoryCursorPagination
+from api.daily_stats import WINDOWS, windowed_leaderboard_queryset, windowed_entry
+from api.quiz import build_quiz, build_questions, MAX_QUIZ_QUESTIONS
+from api.game_results import record_game_results, record_game_results_batch, InvalidMatchPayload
+from api.oracle import QUESTION_PROMPTS, MissingApiKey, OracleBusy, answer_question, limited_generate, oracle_metrics
 from django.shortcuts import redirect  # pyright: ignore[reportMissingImports]
+from django.http import HttpResponse, StreamingHttpResponse # pyright: ignore[reportMissingImports]
+from django.utils import timezone # pyright: ignore[reportMissingImports]
 from django.conf import settings # pyright: ignore[reportMissingImports]
-import os
-import google.generativeai as genai  # pyright: ignore[reportMissingImports]
-from django.db.models import F, ExpressionWrapper, FloatField, Count # pyright: ignore[reportMissingImports]
+from django.db.models import Exists, OuterRef # pyright: ignore[reportMissingImports]
 from api.serializer import (
     myTokenObtainPairSerializer,
     RegisterSerializer,
     WordSerializer,
+    WordImportJobSerializer,
     BadgeSerializer,
     UserStatsSerializer,
     AdminUserSerializer,
     AvatarSerializer,
     GameHistorySerializer,
+    GameHistoryDetailSerializer,
     ProfileUpdateSerializer,
     FarmSerializer,
     FarmDetailSerializer
@@ -184,6 +200,7 @@ class AdminDashboardDataAPIView(APIView):
             'active_users': User.objects.filter(is_online=True).count(), 
             'total_words': Word.objects.count(), 
             'total_badges': Badge.objects.count(), 
+            'oracle': oracle_metrics(),
         }
         return Response(dashboard_stats, status=status.HTTP_200_OK)
 
@@ -230,10 +247,11 @@ class BadgePagination(PageNumberPagination):
     page_size_query_param = 'limit'
     max_page_size = 100
 
-class GameHistoryPagination(PageNumberPagination):
-    page_size = 5
+class LeaderboardPagination(PageNumberPagination):
+    page_size = 10
     page_size_query_param = 'limit'
-    max_page_size = 50
+    max_page_size = 100
+
 
 # * --------------------------------------------------------------------------------------------------
 # ! --- VIEWS PARA PALABRAS (CRUD) ---
@@ -246,109 +264,137 @@ class WordViewSet(viewsets.ModelViewSet):
     filterset_fields = ['word_type']
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', 'random']:
+        if self.action in ['list', 'retrieve', 'random', 'snapshot', 'changes']:
             self.permission_classes = [IsAuthenticated]
         else:
             self.permission_classes = [IsAuthenticated, IsAdminUser]
         return super().get_permissions()
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().prefetch_related('substitutes')
         search_param = self.request.query_params.get('search')
         if search_param:
-            from django.db.models import Q
-            queryset = queryset.filter(
-                Q(text__icontains=search_param) | Q(definition__icontains=search_param)
-            )
+            queryset = search_words(queryset, search_param)
+        tags_param = self.request.query_params.get('tags')
+        if tags_param:
+            queryset = filter_by_tags(queryset, tags_param)
+
+        # is_unlocked se resuelve con un EXISTS por fila en la misma consulta (sin N+1);
+        # con el almacenamiento en bitmap, con los ids cargados una vez (ver get_serializer_context)
+        user = self.request.user
+        if user.is_authenticated:
+            unlocked_param = self.request.query_params.get('unlocked', '').lower()
+            if bitmap_enabled():
+                if unlocked_param in ('true', 'false'):
+                    lookup = {'id__in': list(self._unlocked_word_ids())}
+                    queryset = queryset.filter(**lookup) if unlocked_param == 'true' else queryset.exclude(**lookup)
+                return queryset
+            unlocked = UserStats.unlocked_words.through.objects.filter(userstats__user_id=user.id, word_id=OuterRef('pk'))
+            queryset = queryset.annotate(is_unlocked_for_user=Exists(unlocked))
+            if unlocked_param in ('true', 'false'):
+                queryset = queryset.filter(is_unlocked_for_user=unlocked_param == 'true')
         return queryset
 
+    def _unlocked_word_ids(self):
+        if not hasattr(self, '_unlocked_ids'):
+            self._unlocked_ids = unlocked_word_ids(self.request.user.id)
+        return self._unlocked_ids
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if bitmap_enabled() and self.request.user.is_authenticated:
+            context['unlocked_word_ids'] = self._unlocked_word_ids()
+        return context
+
 
     @action(detail=False, methods=['get'])
     def random(self, request):
-        word = Word.objects.order_by('?').first()
+        words = sample_words(1)
+        word = words[0] if words else None
         if word:
             serializer = self.get_serializer(word)
             return Response(serializer.data)
         return Response({'detail': 'No words found'}, status=404)
 
+    @action(detail=False, methods=['get'])
+    def snapshot(self, request):
+        """
+        Catálogo completo para el cliente, comprimido y con ETag (If-None-Match -> 304).
+        """
+        snapshot = get_word_snapshot()
+        if request.headers.get('If-None-Match') == snapshot.etag:
+            response = HttpResponse(status=304)
+        elif 'gzip' in request.headers.get('Accept-Encoding', ''):
+            response = HttpResponse(snapshot.gzipped, content_type='application/json')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(snapshot.body, content_type='application/json')
+        response['ETag'] = snapshot.etag
+        response['Vary'] = 'Accept-Encoding'
+        return response
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Cambios desde ?since=<version> (la `version` del snapshot o de la última llamada).
+        """
+        try:
+            changes = word_changes(int(request.query_params.get('since', '')))
+        except ValueError:
+            return Response({'error': 'since debe ser la version devuelta por words/snapshot/'}, status=400)
+        return Response(changes)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Descarga el catálogo completo por streaming. Opcional: ?output=csv (por defecto) | jsonl
+        """
+        output = request.query_params.get('output', 'csv').lower()
+        if output not in ('csv', 'jsonl'):
+            return Response({'error': 'output must be csv or jsonl'}, status=400)
+
+        if output == 'csv':
+            response = StreamingHttpResponse(stream_words_csv(), content_type='text/csv; charset=utf-8')
+        else:
+            response = StreamingHttpResponse(stream_words_jsonl(), content_type='application/x-ndjson; charset=utf-8')
+        filename = f"misspelt-words-{timezone.now():%Y%m%d}.{output}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
     @action(detail=False, methods=['post'])
     def import_csv(self, request):
-        import csv
-        import io
-        from django.db import transaction
-
+        """
+        Importa un CSV en segundo plano. Opcional: mode=create (por defecto) | upsert.
+        Responde 202 con el job; el progreso se consulta en words/import_jobs/<id>/.
+        """
         file = request.FILES.get('file')
         if not file:
             return Response({'error': 'No file was provided.'}, status=400)
-            
+
         if not file.name.endswith('.csv'):
             return Response({'error': 'The file must be a .csv file.'}, status=400)
 
-        decoded_file = file.read().decode('utf-8')
-        io_string = io.StringIO(decoded_file)
-        # Assuming the CSV has a header row like:
-        # word,translation,word_type,difficulty_level,definition,tags,ex1_en,ex1_es,ex2_en,ex2_es
-        reader = csv.DictReader(io_string)
+        mode = str(request.data.get('mode', WordImportJob.Mode.CREATE)).upper()
+        if mode not in WordImportJob.Mode.values:
+            return Response({'error': f"mode must be one of: {', '.join(WordImportJob.Mode.values).lower()}"}, status=400)
 
-        words_to_create = []
-        errors = []
-
-        try:
-            with transaction.atomic():
-                for index, row in enumerate(reader, start=2): 
-                    text = row.get('word', '').strip()
-                    definition = row.get('definition', '').strip()
-                    
-                    if not text or not definition:
-                        errors.append(f"Row {index}: 'word' and 'definition' are required.")
-                        continue
-                        
-                    if Word.objects.filter(text__iexact=text).exists():
-                        errors.append(f"Row {index}: Word '{text}' already exists.")
-                        continue
-
-                    examples = []
-                    
-                    if row.get('ex1_en') and row.get('ex1_es'):
-                        examples.append({'en': row.get('ex1_en').strip(), 'es': row.get('ex1_es').strip()})
-                    if row.get('ex2_en') and row.get('ex2_es'):
-                        examples.append({'en': row.get('ex2_en').strip(), 'es': row.get('ex2_es').strip()})
-                        
-                    word_type = row.get('word_type', '').strip().upper()
-                    valid_types = [choice[0] for choice in Word.WordType.choices]
-                    if word_type not in valid_types:
-                        word_type = Word.WordType.SLANG
-
-                    try:
-                        difficulty_level = int(row.get('difficulty_level', 1))
-                    except ValueError:
-                        difficulty_level = 1
-
-                    word_instance = Word(
-                        text=text,
-                        translation=row.get('translation', '').strip(),
-                        definition=definition,
-                        word_type=word_type,
-                        difficulty_level=difficulty_level,
-                        tags=row.get('tags', '').strip(),
-                        examples=examples
-                    )
-                    words_to_create.append(word_instance)
-                
-                if errors:
-                    raise ValueError("Validation failed")
-                    
-                Word.objects.bulk_create(words_to_create)
-                
-        except ValueError:
-            return Response({'errors': errors}, status=400)
-        except Exception as e:
-            return Response({'error': f"Uncaught error processing CSV: {str(e)}"}, status=500)
+        job = WordImportJob.objects.create(created_by=request.user, file=file, mode=mode, total_bytes=file.size)
+        start_import_job(job)
 
         return Response({
-            'message': f"Successfully imported {len(words_to_create)} words.",
-            'count': len(words_to_create)
-        }, status=201)
+            'message': f"Import #{job.id} started.",
+            'job': WordImportJobSerializer(job).data
+        }, status=202)
+
+    @action(detail=False, methods=['get'], url_path=r'import_jobs/(?P<job_id>\d+)')
+    def import_job(self, request, job_id=None):
+        # Un job cuyo worker murió quedaría en RUNNING para siempre
+        fail_stale_import_jobs(WordImportJob.objects.filter(id=job_id))
+        try:
+            job = WordImportJob.objects.get(id=job_id)
+        except WordImportJob.DoesNotExist:
+            return Response({'error': 'Import job not found.'}, status=404)
+        return Response(WordImportJobSerializer(job).data)
 
 
 # * --------------------------------------------------------------------------------------------------
@@ -453,7 +499,7 @@ class UserStatsViewSet(
             serializer = self.get_serializer(user_stats, data=request.data, partial=True)
             serializer.is_valid(raise_exception=True)
             serializer.save()
-            newly_unlocked_badges_on_patch = check_and_unlock_badges(request.user)
+            newly_unlocked_badges_on_patch = check_and_unlock_badges(request.user, changed_fields=serializer.validated_data.keys())
             
             response_data = serializer.data
             response_data['newly_unlocked_badges'] = [badge.title for badge in newly_unlocked_badges_on_patch]
@@ -541,33 +587,15 @@ def get_quiz_words(request):
     Entrega un set de palabras aleatorias para una ronda de juego en Godot.
     Opcional: ?limit=5&type=SLANG&difficulty=EASY
     """
-    limit = int(request.query_params.get('limit', 10))
+    limit = max(int(request.query_params.get('limit', 10)), 0)
     word_type = request.query_params.get('word_type', None)
     difficulty = request.query_params.get('difficulty', None)
     discovered = request.query_params.get('discovered', 'false').lower() == 'true'
 
     if discovered and request.user.is_authenticated:
-        try:
-            stats = UserStats.objects.get(user=request.user)
-            words = stats.unlocked_words.all()
-        except UserStats.DoesNotExist:
-            words = Word.objects.none()
+        random_words = sample_unlocked_words(request.user.id, limit, word_type=word_type, difficulty=difficulty)
     else:
-        words = Word.objects.all()
-    
-    if word_type:
-        words = words.filter(word_type=word_type)
-        
-    if difficulty:
-        difficulty = difficulty.upper()
-        if difficulty == 'EASY':
-            words = words.filter(difficulty_level__lte=3)
-        elif difficulty == 'NORMAL':
-            words = words.filter(difficulty_level__gt=3, difficulty_level__lte=6)
-        elif difficulty == 'HARD':
-            words = words.filter(difficulty_level__gt=6)
-
-    random_words = words.order_by('?')[:limit]
+        random_words = sample_words(limit, word_type=word_type, difficulty=difficulty)
     
     serializer = WordSerializer(random_words, many=True)
     return Response(serializer.data, status=status.HTTP_200_OK)
@@ -576,134 +604,97 @@ def get_quiz_words(request):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def submit_game_results(request):
-    data = request.data
-    user = request.user
-    
-    score = data.get('score', 0)
-    xp_earned = data.get('xp_earned', 0)
-    correct_answers = data.get('correct_answers', 0)
-    total_questions = data.get('total_questions', 0)
-    game_mode = data.get('game_mode', 'SURVIVOR')
-    
-    time_spent = data.get('time_spent', 0)
-    letters_killed = data.get('letters_killed', 0)
-    bosses_killed = data.get('bosses_killed', 0)
-    seen_word_ids = data.get('seen_word_ids', [])
-    correct_word_ids = data.get('correct_word_ids', [])
-    ai_evaluation = data.get('ai_evaluation', None)
-
     try:
-        stats = UserStats.objects.get(user=user)
-    except UserStats.DoesNotExist:
+        result = record_game_results(request.user, request.data)
+    except InvalidMatchPayload as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if result is None:
         return Response({'error': 'UserStats no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+    stats, match, match_breakdown, newly_unlocked, duplicate = result
 
-    seen_words = Word.objects.filter(id__in=seen_word_ids)
-    correct_words = Word.objects.filter(id__in=correct_word_ids)
+    return Response({
+        'message': 'Partida ya registrada' if duplicate else 'Partida guardada correctamente',
+        'duplicate': duplicate,
+        'new_xp': stats.experience,
+        'new_level': stats.get_level(),
+        'badges_unlocked': [
+            {
+                'title': b.title,
+                'image': request.build_absolute_uri(b.image.url) if b.image else None
+            } 
+            for b in newly_unlocked
+        ],
+        'match_breakdown': match_breakdown,
+        'time_spent': match['time_spent']
+    }, status=status.HTTP_200_OK)
 
-    match_breakdown = {
-        "seen": {"SLANG": 0, "IDIOM": 0, "PHRASAL_VERB": 0, "VOCABULARY": 0},
-        "correct": {"SLANG": 0, "IDIOM": 0, "PHRASAL_VERB": 0, "VOCABULARY": 0}
-    }
 
-    for w in seen_words:
-        if w.word_type in match_breakdown["seen"]:
-            match_breakdown["seen"][w.word_type] += 1
-        stats.words_seen_total += 1
-        if w.word_type == "SLANG":
-            stats.slangs_seen += 1
-        elif w.word_type == "PHRASAL_VERB":
-            stats.phrasal_verbs_seen += 1
-
-    for w in correct_words:
-        if w.word_type in match_breakdown["correct"]:
-            match_breakdown["correct"][w.word_type] += 1
-            
-            if w.word_type == "SLANG": 
-                stats.slangs_learned += 1
-                stats.correct_slangs += 1
-            elif w.word_type == "IDIOM": 
-                stats.idioms_learned += 1
-            elif w.word_type == "PHRASAL_VERB": 
-                stats.phrasal_verbs_learned += 1
-                stats.correct_phrasal_verbs += 1
-            elif w.word_type == "VOCABULARY": 
-                stats.vocabulary_learned += 1
-                
-    stats.save()
-    
-    if correct_words.exists():
-        stats.unlocked_words.add(*correct_words)
-
-    stats.experience += xp_earned
-    stats.total_questions_answered += total_questions
-    stats.correct_answers_total += correct_answers
-    stats.total_letters_killed += letters_killed
-    stats.total_bosses_killed += bosses_killed
-    stats.total_time_played_seconds += time_spent
-    
-    from django.utils import timezone
-    from datetime import timedelta
-    today = timezone.now().date()
-    
-    if stats.last_login_date != today:
-        if stats.last_login_date == today - timedelta(days=1):
-            stats.current_streak += 1
-        else:
-            stats.current_streak = 1
-        stats.last_login_date = today
-        
-    stats.save()
-
-    if stats.current_streak > stats.longest_streak:
-        stats.longest_streak = stats.current_streak
-        stats.save()
-
-    from api.models import GameHistory
-    GameHistory.objects.create(
-        user=user,
-        score=score,
-        correct_in_game=correct_answers,
-        total_questions_in_game=total_questions,
-        game_mode=game_mode,
-        time_spent_seconds=time_spent,
-        match_breakdown=match_breakdown,
-        letters_killed=letters_killed,
-        bosses_killed=bosses_killed,
-        ai_evaluation=ai_evaluation
-    )
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def submit_game_results_batch(request):
+    """
+    Recibe varias partidas jugadas sin conexión: {"matches": [{"match_id": "...", ...}, ...]}
+    (o directamente la lista). Reintentar el mismo lote no duplica XP ni historial.
+    """
+    payloads = request.data.get('matches') if isinstance(request.data, dict) else request.data
+    try:
+        result = record_game_results_batch(request.user, payloads)
+    except InvalidMatchPayload as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    newly_unlocked = check_and_unlock_badges(user)
+    if result is None:
+        return Response({'error': 'UserStats no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+    stats, accepted, duplicates, newly_unlocked = result
 
     return Response({
-        'message': 'Partida guardada correctamente',
+        'message': f'{len(accepted)} partidas guardadas correctamente',
+        'accepted': accepted,
+        'duplicates': duplicates,
         'new_xp': stats.experience,
         'new_level': stats.get_level(),
         'badges_unlocked': [
             {
                 'title': b.title,
                 'image': request.build_absolute_uri(b.image.url) if b.image else None
-            } 
+            }
             for b in newly_unlocked
         ],
-        'match_breakdown': match_breakdown,
-        'time_spent': time_spent
     }, status=status.HTTP_200_OK)
 
 # * --------------------------------------------------------------------------------------------------
 # ! --- VIEWS PARA EL JUEGO (QUIZ) ---
 # * --------------------------------------------------------------------------------------------------
 def get_quiz_question(word_id):
-    correct_word = Word.objects.get(id=word_id)
-    tag_list = correct_word.tags.split(',')
-    distractors = Word.objects.filter(tags__icontains=tag_list[0]).exclude(id=correct_word.id)[:3] 
-    if len(distractors) < 3:
-        randoms = Word.objects.exclude(id=correct_word.id).order_by('?')[:3 - len(distractors)]
-    
-    return {
-        "question": f"¿Cómo se dice '{correct_word.translation}'?",
-        "options": [correct_word.text] + [d.text for d in distractors], 
-        "accepted_answers": [correct_word.text] + [s.text for s in correct_word.substitutes.all()]
-    }
+    questions = build_questions([word_id])
+    if not questions:
+        raise Word.DoesNotExist(f"Word {word_id} no existe")
+    return questions[0]
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_quiz(request):
+    """
+    Genera un quiz completo de N preguntas en pocas consultas.
+    Opcional: ?limit=10&word_type=SLANG&difficulty=EASY&tag=food&seed=123
+    Con el mismo seed se obtiene el mismo quiz (útil para caché y tests).
+    """
+    try:
+        limit = max(min(int(request.query_params.get('limit', 10)), MAX_QUIZ_QUESTIONS), 0)
+        seed = request.query_params.get('seed')
+        seed = int(seed) if seed not in (None, '') else random.randrange(2 ** 31)
+    except ValueError:
+        return Response({'error': 'limit y seed deben ser números enteros'}, status=status.HTTP_400_BAD_REQUEST)
+
+    questions = build_quiz(
+        limit,
+        word_type=request.query_params.get('word_type', None),
+        difficulty=request.query_params.get('difficulty', None),
+        seed=seed,
+        tag=request.query_params.get('tag', None)
+    )
+    return Response({'seed': seed, 'questions': questions}, status=status.HTTP_200_OK)
 
 
 
@@ -714,43 +705,81 @@ def get_quiz_question(word_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_leaderboard(request):
-    
-    leaderboard = UserStats.objects.select_related('user').annotate(
-        unlocked_count=Count('unlocked_words'),
-        true_accuracy=ExpressionWrapper(
-            (F('correct_answers_total')) / (F('total_questions_answered') + 10.0),
-            output_field=FloatField()
-        ),
-        performance_score=ExpressionWrapper(
-            F('experience') + (F('unlocked_count') * 50) + (F('total_questions_answered') * 10 * F('true_accuracy')),
-            output_field=FloatField()
-        )
-    ).order_by('-performance_score')[:10] 
-
-    data = []
-    for stat in leaderboard:
-        data.append({
-            'id': stat.id,
-            'user_username': stat.user.username,
-            'level': stat.get_level(),
-            'experience': stat.experience,
-            'current_streak': stat.current_streak,
-            'unlocked_count': stat.unlocked_count,
-            'true_accuracy': round(stat.true_accuracy * 100, 1) if stat.true_accuracy else 0,
-            'performance_score': round(stat.performance_score) if stat.performance_score else 0
-        })
+    """
+    Top de la leaderboard (?limit=10), leído en orden del índice de performance_score.
+    Devuelve una lista, como siempre; con ?page=N responde el sobre paginado (count, next, results).
+    Opcional: ?window=day|week|month para la del periodo actual (desde DailyUserStats).
+    """
+    window = request.query_params.get('window', 'all').lower()
+    if window != 'all' and window not in WINDOWS:
+        return Response({'error': 'window debe ser all, day, week o month'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if window == 'all':
+        queryset, to_entry = leaderboard_queryset(), leaderboard_entry
+    else:
+        queryset, to_entry = windowed_leaderboard_queryset(window), windowed_entry
+
+    paginator = LeaderboardPagination()
+    if paginator.page_query_param not in request.query_params:
+        rows = queryset[:paginator.get_page_size(request)]
+        return Response([to_entry(row, rank=position + 1) for position, row in enumerate(rows)], status=status.HTTP_200_OK)
+
+    page = paginator.paginate_queryset(queryset, request)
+    first_rank = paginator.page.start_index()
+    data = [to_entry(row, rank=first_rank + position) for position, row in enumerate(page)]
+    return paginator.get_paginated_response(data)
 
-    return Response(data, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_my_leaderboard_rank(request):
+    stats = UserStats.objects.select_related('user').filter(user=request.user).first()
+    if stats is None:
+        return Response({'error': 'UserStats no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(leaderboard_entry(stats, rank=rank_of(stats)), status=status.HTTP_200_OK)
 # * --------------------------------------------------------------------------------------------------
 # ! --- VIEWS PARA HISTORIAL DE PARTIDAS ---
 # * --------------------------------------------------------------------------------------------------
+def game_history_queryset(user):
+    """
+    Historial para listados: sin leer match_breakdown y con has_ai_evaluation anotado.
+    """
+    return (
+        GameHistory.objects.filter(user=user)
+        .defer('match_breakdown')
+        .annotate(has_ai_evaluation=Exists(GameEvaluation.objects.filter(game=OuterRef('pk'))))
+    )
+
+
+def history_count(user):
+    """
+    Partidas listables (sin las archivadas): COUNT sobre el índice (user, played_at, id).
+    UserStats.matches_played también cuenta las archivadas y no sirve para paginar.
+    """
+    return GameHistory.objects.filter(user=user).count()
+
+
 class GameHistoryListView(generics.ListAPIView):
     serializer_class = GameHistorySerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = GameHistoryPagination
+    pagination_class = GameHistoryCursorPagination
 
     def get_queryset(self):
-        return GameHistory.objects.filter(user=self.request.user).order_by('-played_at')
+        return game_history_queryset(self.request.user)
+
+    def get_history_total(self):
+        return history_count(self.request.user)
+
+
+class GameHistoryDetailView(generics.RetrieveAPIView):
+    """
+    Una partida con match_breakdown y la evaluación de la IA.
+    """
+    serializer_class = GameHistoryDetailSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return GameHistory.objects.filter(user=self.request.user).select_related('evaluation')
 
 # * --------------------------------------------------------------------------------------------------
 # ! --- VIEW PARA ACTUALIZAR PERFIL ---
@@ -776,6 +805,12 @@ class ProfileUpdateView(APIView):
 # * --------------------------------------------------------------------------------------------------
 # ! --- VIEWS PARA ORÁCULO DICCIONARIO ---
 # * --------------------------------------------------------------------------------------------------
+def oracle_busy_response(error):
+    return Response(
+        {'error': str(error), 'retry_after': error.retry_after},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={'Retry-After': str(error.retry_after)}
+    )
 
 
 @api_view(['POST'])
@@ -790,51 +825,24 @@ def oracle_query(request):
     if not word_id or not question_type:
         return Response({'error': 'word_id y question_type son requeridos'}, status=status.HTTP_400_BAD_REQUEST)
 
+    if question_type not in QUESTION_PROMPTS:
+         return Response({'error': 'Tipo de pregunta inválido'}, status=status.HTTP_400_BAD_REQUEST)
+
     try:
-        word = Word.objects.get(id=word_id)
+        word = Word.objects.only('id', 'text', 'translation', 'definition').get(id=word_id)
     except Word.DoesNotExist:
         return Response({'error': 'Palabra no encontrada'}, status=status.HTTP_404_NOT_FOUND)
 
-    api_key = getattr(settings, 'GEMINI_API_KEY', os.getenv("GEMINI_API_KEY") if os.getenv("GEMINI_API_KEY") else os.getenv("VITE_GEMINI_API_KEY"))
-    if not api_key:
-         print("[Oracle] API Key de Gemini ausente en .env del backend.")
-         return Response({'error': 'API key de Gemini no configurada en el backend'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    genai.configure(api_key=api_key)
-    
-    base_context = f'Eres el "Oráculo del Granero", un sabio y misterioso campesino mágico del juego Misspelt. El usuario pregunta sobre la palabra en inglés "{word.text}" ("{word.translation}" en español), definición: "{word.definition}". Responde en un tono sabio, conciso (máximo 4 oraciones) y amigable. No uses subtítulos ni markdown. Usa español pero resaltando la palabra en inglés.'
-
-    if question_type == 'WHAT':
-        question_prompt = "Explica el significado directo de la palabra de forma sencilla para alguien que la está aprendiendo."
-    elif question_type == 'WHY':
-        question_prompt = "Explica brevemente la lógica o etimología (el origen) detrás de esta palabra o frase. ¿Por qué se dice así?"
-    elif question_type == 'HOW':
-        question_prompt = "Explica la estructura gramatical y las reglas de uso para esta palabra. ¿Cómo se usa correctamente en una oración?"
-    elif question_type == 'WHEN':
-        question_prompt = "Explica el contexto social: ¿Es formal, informal, de enojo, tristeza? ¿Cuándo es apropiado usarla?"
-    elif question_type == 'EXAMPLES':
-        question_prompt = "Dame exactamente 3 ejemplos creativos y variados de cómo usar esta palabra en oraciones. Separa cada ejemplo y provee su traducción."
-    else:
-         return Response({'error': 'Tipo de pregunta inválido'}, status=status.HTTP_400_BAD_REQUEST)
-
-    system_prompt = f"{base_context}\nInstrucción: {question_prompt}"
-
     try:
-        model = genai.GenerativeModel('gemini-2.5-flash', system_instruction=system_prompt)
-        response = model.generate_content("Responde a la consulta lo más preciso posible.")
-        text_response = response.text.replace('*', '').strip()
-        
-        return Response({'response': text_response}, status=status.HTTP_200_OK)
+        text_response, cached = answer_question(word, question_type)
+    except MissingApiKey as e:
+        print("[Oracle] API Key de Gemini ausente en .env del backend.")
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    except OracleBusy as e:
+        return oracle_busy_response(e)
     except Exception as e:
-        print(f"[Oracle] Error generando contenido: {str(e)}")
-        try:
-            model = genai.GenerativeModel('gemini-1.5-flash', system_instruction=system_prompt)
-            response = model.generate_content("Responde a la consulta lo más preciso posible.")
-            text_response = response.text.replace('*', '').strip()
-            return Response({'response': text_response}, status=status.HTTP_200_OK)
-        except Exception as fallback_e:
-            print(f"[Oracle] Fallback falló: {str(fallback_e)}")
-            return Response({'error': f'Error en Oráculo: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({'error': f'Error en Oráculo: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return Response({'response': text_response, 'cached': cached}, status=status.HTTP_200_OK)
 
 
 # * --------------------------------------------------------------------------------------------------
@@ -850,12 +858,6 @@ def oracle_post_game_query(request):
     """
     history = request.data.get('history', [])
 
-    api_key = getattr(settings, 'GEMINI_API_KEY', os.getenv("GEMINI_API_KEY") if os.getenv("GEMINI_API_KEY") else os.getenv("VITE_GEMINI_API_KEY"))
-    if not api_key:
-         return Response({'error': 'API key de Gemini no configurada en el backend'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    genai.configure(api_key=api_key)
-    
     formatted_history = []
     for msg in history:
         role = msg.get('role', 'user')
@@ -863,21 +865,16 @@ def oracle_post_game_query(request):
         # Extract text from parts (JS sends [{'text': '...'}])
         text_parts = [p.get('text', '') if isinstance(p, dict) else str(p) for p in parts]
         formatted_history.append({'role': role, 'parts': text_parts})
-        
+
     try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = model.generate_content(formatted_history)
-        text_response = response.text.replace('*', '').strip()
-        return Response({'response': text_response}, status=status.HTTP_200_OK)
+        text_response, _ = limited_generate(contents=formatted_history, log_prefix="[Oracle Post-Game]")
+    except MissingApiKey as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    except OracleBusy as e:
+        return oracle_busy_response(e)
     except Exception as e:
-        print(f"[Oracle Post-Game] Error: {str(e)}")
-        try:
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            response = model.generate_content(formatted_history)
-            text_response = response.text.replace('*', '').strip()
-            return Response({'response': text_response}, status=status.HTTP_200_OK)
-        except Exception as fallback_e:
-            return Response({'error': str(fallback_e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return Response({'response': text_response}, status=status.HTTP_200_OK)
 
 # * --------------------------------------------------------------------------------------------------
 # ! --- VIEWS PARA GRANJAS (FARMS) ---
@@ -897,6 +894,20 @@ class FarmViewSet(viewsets.ModelViewSet):
             return Farm.objects.filter(owner=user)
         return Farm.objects.filter(students=user)
 
+    def get_serializer_context(self):
+        """
+        ?limit=N&offset=M limita students_data (top-N / paginación) en retrieve y leaderboard.
+        """
+        context = super().get_serializer_context()
+        try:
+            limit = self.request.query_params.get('limit')
+            offset = self.request.query_params.get('offset')
+            context['students_limit'] = max(int(limit), 0) if limit not in (None, '') else None
+            context['students_offset'] = max(int(offset), 0) if offset not in (None, '') else 0
+        except ValueError:
+            raise ValidationError({'error': 'limit y offset deben ser números enteros'})
+        return context
+
     def create(self, request, *args, **kwargs):
         if not request.user.is_staff:
             return Response({"error": "Solo Profesores pueden crear Granjas."}, status=status.HTTP_403_FORBIDDEN)
@@ -910,10 +921,25 @@ class FarmViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def leaderboard(self, request, pk=None):
+        """
+        Opcional: ?window=day|week|month para la tabla del periodo actual de los estudiantes.
+        """
         farm = self.get_object()
         if not request.user.is_staff and farm not in Farm.objects.filter(students=request.user):
             return Response({"error": "No tienes acceso a esta granja."}, status=status.HTTP_403_FORBIDDEN)
-        serializer = FarmDetailSerializer(farm)
+
+        window = request.query_params.get('window')
+        if window:
+            if window not in WINDOWS:
+                return Response({'error': 'window debe ser day, week o month'}, status=status.HTTP_400_BAD_REQUEST)
+            rows = windowed_leaderboard_queryset(window, user_ids=farm.students.values('id'))
+            return Response({
+                'id': farm.id,
+                'name': farm.name,
+                'window': window,
+                'students_data': [windowed_entry(row, rank=position) for position, row in enumerate(rows, start=1)]
+            })
+        serializer = FarmDetailSerializer(farm, context=self.get_serializer_context())
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'], url_path='remove-student')
@@ -952,24 +978,21 @@ class FarmViewSet(viewsets.ModelViewSet):
         except User.DoesNotExist:
             return Response({'error': 'Estudiante no encontrado en esta granja.'}, status=status.HTTP_404_NOT_FOUND)
 
-        from api.models import UserStats, GameHistory
+        from api.models import UserStats
         from api.serializer import UserStatsSerializer, GameHistorySerializer
 
         try:
             stats = UserStats.objects.get(user=student)
             stats_data = UserStatsSerializer(stats, context={'request': request}).data
+            total_battles = stats.matches_played
         except UserStats.DoesNotExist:
             stats_data = {}
+            total_battles = 0
 
-        history_qs = GameHistory.objects.filter(user=student).order_by('-played_at')
-        total_battles = history_qs.count()
-
-        page = int(request.query_params.get('page', 1))
-        page_size = 5
-        start = (page - 1) * page_size
-        end = start + page_size
-        
-        history_page = history_qs[start:end]
+        # Historial por cursor: ?cursor=<history_next / history_previous>
+        paginator = GameHistoryCursorPagination()
+        listable = history_count(student)
+        history_page = paginator.paginate_queryset(game_history_queryset(student), request, total=listable)
         history_data = GameHistorySerializer(history_page, many=True).data
 
         avatar_url = f"https://ui-avatars.com/api/?name={student.username}&background=random"
@@ -983,5 +1006,8 @@ class FarmViewSet(viewsets.ModelViewSet):
             'avatar_url': avatar_url,
             'stats': stats_data,
             'total_battles': total_battles,
-            'recent_history': history_data
+            'history_count': listable,
+            'recent_history': history_data,
+            'history_next': paginator.next_cursor,
+            'history_previous': paginator.previous_cursor
         })
\ No newline at end of file
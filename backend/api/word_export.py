@@ -0,0 +1,81 @@
+from api.models import Word
+from itertools import islice
+import csv
+import json
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- EXPORTACIÓN MASIVA DE PALABRAS (CSV / JSONL) ---
+# * --------------------------------------------------------------------------------------------------
+# Genera el archivo fila por fila para StreamingHttpResponse: las palabras se leen con
+# iterator(chunk_size) y los sinónimos con una consulta por bloque, así la memoria no depende
+# del tamaño del catálogo. El CSV usa las mismas columnas que acepta import_csv (+ substitutes,
+# textos separados por '|'); solo entran los dos primeros ejemplos. JSONL conserva todos.
+
+DEFAULT_CHUNK_SIZE = 2000
+SUBSTITUTES_SEPARATOR = '|'
+
+CSV_COLUMNS = [
+    'word', 'translation', 'word_type', 'difficulty_level', 'definition', 'tags',
+    'ex1_en', 'ex1_es', 'ex2_en', 'ex2_es', 'substitutes'
+]
+
+WORD_FIELDS = ('id', 'text', 'translation', 'word_type', 'difficulty_level', 'definition', 'tags', 'examples')
+
+
+class _Echo:
+    """
+    Pseudo-buffer para csv.writer: devuelve la línea en lugar de guardarla.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_word_chunks(queryset=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Bloques de filas (dicts) con `substitutes` (textos) resueltos con una consulta por bloque.
+    """
+    queryset = Word.objects.all() if queryset is None else queryset
+    rows = queryset.order_by('id').values(*WORD_FIELDS).iterator(chunk_size=chunk_size)
+    through = Word.substitutes.through.objects
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        substitutes = {}
+        pairs = through.filter(from_word_id__in=[row['id'] for row in chunk]).order_by('from_word_id', 'to_word__text')
+        for from_id, text in pairs.values_list('from_word_id', 'to_word__text'):
+            substitutes.setdefault(from_id, []).append(text)
+        for row in chunk:
+            row['substitutes'] = substitutes.get(row['id'], [])
+        yield chunk
+
+
+def _csv_row(row):
+    examples = (row['examples'] or []) + [{}, {}]
+    return [
+        row['text'],
+        row['translation'] or '',
+        row['word_type'],
+        row['difficulty_level'],
+        row['definition'],
+        row['tags'],
+        examples[0].get('en', ''),
+        examples[0].get('es', ''),
+        examples[1].get('en', ''),
+        examples[1].get('es', ''),
+        SUBSTITUTES_SEPARATOR.join(row['substitutes']),
+    ]
+
+
+def stream_words_csv(queryset=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for chunk in iter_word_chunks(queryset, chunk_size):
+        yield ''.join(writer.writerow(_csv_row(row)) for row in chunk)
+
+
+def stream_words_jsonl(queryset=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    for chunk in iter_word_chunks(queryset, chunk_size):
+        yield ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in chunk)
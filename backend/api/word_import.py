@@ -0,0 +1,338 @@
+from api.models import Word, WordImportJob
+from api.catalog import bump_catalog_version, WORDS
+from api.tags import set_word_tags
+from api.word_export import SUBSTITUTES_SEPARATOR
+from django.conf import settings
+from django.db import transaction, connection, DatabaseError
+from django.db.models import Q
+from django.utils import timezone
+from datetime import timedelta
+import threading
+import csv
+import io
+import logging
+
+logger = logging.getLogger(__name__)
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- IMPORTACIÓN MASIVA DE PALABRAS (CSV) ---
+# * --------------------------------------------------------------------------------------------------
+# Formato (igual que antes): word,translation,word_type,difficulty_level,definition,tags,ex1_en,ex1_es,ex2_en,ex2_es
+# y opcionalmente substitutes ("a|b", como lo genera words/export/); los sinónimos se enlazan al final.
+# El archivo se lee por streaming y se escribe en bloques de `chunk_size` filas, cada bloque en su
+# propia transacción. Los duplicados se detectan contra un dict {texto en minúsculas: id} cargado
+# una vez al inicio, sin una consulta por fila.
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+UPSERT_FIELDS = ['translation', 'definition', 'word_type', 'difficulty_level', 'tags', 'examples', 'updated_at']
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+def parse_row(row):
+    """
+    Fila del CSV -> dict de campos de Word. Lanza InvalidRow si falta algo obligatorio.
+    """
+    text = (row.get('word') or '').strip()
+    definition = (row.get('definition') or '').strip()
+    if not text or not definition:
+        raise InvalidRow("'word' and 'definition' are required.")
+    if len(text) > Word._meta.get_field('text').max_length:
+        raise InvalidRow(f"Word '{text[:30]}...' is too long.")
+
+    examples = []
+    for n in (1, 2):
+        en, es = row.get(f'ex{n}_en'), row.get(f'ex{n}_es')
+        if en and es:
+            examples.append({'en': en.strip(), 'es': es.strip()})
+
+    word_type = (row.get('word_type') or '').strip().upper()
+    if word_type not in Word.WordType.values:
+        word_type = Word.WordType.SLANG
+
+    try:
+        difficulty_level = int(row.get('difficulty_level') or 1)
+    except ValueError:
+        difficulty_level = 1
+
+    return {
+        'text': text,
+        'translation': (row.get('translation') or '').strip(),
+        'definition': definition,
+        'word_type': word_type,
+        'difficulty_level': difficulty_level,
+        'tags': (row.get('tags') or '').strip()[:Word._meta.get_field('tags').max_length],
+        'examples': examples,
+    }
+
+
+def parse_substitutes(row):
+    return [text.strip() for text in (row.get('substitutes') or '').split(SUBSTITUTES_SEPARATOR) if text.strip()]
+
+
+class _CountingReader(io.RawIOBase):
+    """
+    Envuelve el archivo binario y cuenta los bytes leídos (para el progreso).
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.raw.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        self.bytes_read += size
+        return size
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows_processed = 0
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(message)
+
+
+class WordImporter:
+    def __init__(self, mode=WordImportJob.Mode.CREATE):
+        self.mode = mode
+        self.result = ImportResult()
+        self.existing = {text.lower(): word_id for word_id, text in Word.objects.values_list('id', 'text').iterator(chunk_size=5000)}
+        self.substitutes = {}
+        self._reset_chunk()
+
+    def _reset_chunk(self):
+        self.to_create = {}
+        self.to_update = {}
+        self.first_row = None
+
+    def add(self, index, row):
+        self.result.rows_processed += 1
+        if self.first_row is None:
+            self.first_row = index
+        try:
+            fields = parse_row(row)
+        except InvalidRow as e:
+            self.result.add_error(f"Row {index}: {e}")
+            return
+
+        key = fields['text'].lower()
+        existing_id = self.existing.get(key)
+        if existing_id is None and key not in self.to_create:
+            self.to_create[key] = fields
+        elif self.mode != WordImportJob.Mode.UPSERT:
+            self.result.add_error(f"Row {index}: Word '{fields['text']}' already exists.")
+            return
+        elif existing_id is None:
+            # Repetida dentro del mismo bloque: gana la última fila
+            self.to_create[key] = fields
+        else:
+            self.to_update[key] = (existing_id, fields)
+
+        substitutes = parse_substitutes(row)
+        if substitutes:
+            self.substitutes[key] = substitutes
+
+    def flush(self, last_row):
+        if not self.to_create and not self.to_update:
+            self._reset_chunk()
+            return
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                Word.objects.bulk_create([Word(**fields) for fields in self.to_create.values()])
+                created_ids = dict(
+                    Word.objects.filter(text__in=[fields['text'] for fields in self.to_create.values()]).values_list('text', 'id')
+                )
+                updates = []
+                for word_id, fields in self.to_update.values():
+                    fields = {name: value for name, value in fields.items() if name != 'text'}
+                    updates.append(Word(id=word_id, updated_at=now, **fields))
+                Word.objects.bulk_update(updates, UPSERT_FIELDS)
+
+                # bulk_create/bulk_update no disparan post_save: tags y versión del catálogo a mano
+                tags_by_word = {created_ids[fields['text']]: fields['tags'] for fields in self.to_create.values()}
+                tags_by_word.update({word_id: fields['tags'] for word_id, fields in self.to_update.values()})
+                set_word_tags(tags_by_word)
+                bump_catalog_version(WORDS)
+        except DatabaseError as e:
+            self.result.add_error(f"Rows {self.first_row}-{last_row}: {e}")
+        else:
+            for key, fields in self.to_create.items():
+                self.existing[key] = created_ids[fields['text']]
+            self.result.created += len(self.to_create)
+            self.result.updated += len(self.to_update)
+        self._reset_chunk()
+
+    def link_substitutes(self, batch_size=1000):
+        """
+        Enlaza los sinónimos de la columna `substitutes` (se agregan; no reemplazan los existentes).
+        """
+        if not self.substitutes:
+            return
+        through = Word.substitutes.through
+        pairs = set()
+        for key, texts in self.substitutes.items():
+            word_id = self.existing.get(key)
+            if word_id is None:
+                continue
+            for text in texts:
+                substitute_id = self.existing.get(text.lower())
+                if substitute_id is None or substitute_id == word_id:
+                    self.result.add_error(f"Word '{key}': substitute '{text}' not found.")
+                    continue
+                pairs.update({(word_id, substitute_id), (substitute_id, word_id)})
+
+        word_ids = sorted({word_id for word_id, _ in pairs})
+        now = timezone.now()
+        with transaction.atomic():
+            through.objects.bulk_create(
+                [through(from_word_id=a, to_word_id=b) for a, b in pairs],
+                batch_size=5000,
+                ignore_conflicts=True
+            )
+            for start in range(0, len(word_ids), batch_size):
+                Word.objects.filter(id__in=word_ids[start:start + batch_size]).update(updated_at=now)
+            bump_catalog_version(WORDS)
+
+
+def import_words(raw_file, mode=WordImportJob.Mode.CREATE, chunk_size=DEFAULT_CHUNK_SIZE, on_progress=None):
+    """
+    Importa un CSV binario por streaming. `on_progress(result, bytes_read)` se llama tras cada bloque.
+    Devuelve un ImportResult.
+    """
+    counter = _CountingReader(raw_file)
+    reader = csv.DictReader(io.TextIOWrapper(io.BufferedReader(counter), encoding='utf-8-sig', newline=''))
+    importer = WordImporter(mode=mode)
+
+    index = 1
+    for index, row in enumerate(reader, start=2):
+        importer.add(index, row)
+        if importer.result.rows_processed % chunk_size == 0:
+            importer.flush(index)
+            if on_progress:
+                on_progress(importer.result, counter.bytes_read)
+    importer.flush(index)
+    importer.link_substitutes()
+    if on_progress:
+        on_progress(importer.result, counter.bytes_read)
+    return importer.result
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- TRABAJOS EN SEGUNDO PLANO ---
+# * --------------------------------------------------------------------------------------------------
+# El hilo vive dentro del worker de gunicorn: si el worker se recicla o se reinicia (deploy) el job
+# queda a medias. Cada bloque actualiza heartbeat_at; fail_stale_import_jobs marca como FAILED los
+# jobs sin avances en WORD_IMPORT_STALE_SECONDS (lo llaman words/import_jobs/<id>/ y el comando import_words).
+
+
+class ImportInterrupted(Exception):
+    pass
+
+
+def _stale_after():
+    return timedelta(seconds=getattr(settings, 'WORD_IMPORT_STALE_SECONDS', 600))
+
+
+def fail_stale_import_jobs(jobs=None):
+    """
+    Marca como FAILED los jobs RUNNING sin heartbeat reciente y los PENDING que nunca arrancaron.
+    Devuelve cuántos marcó.
+    """
+    now = timezone.now()
+    cutoff = now - _stale_after()
+    stale = (jobs if jobs is not None else WordImportJob.objects.all()).filter(
+        Q(status=WordImportJob.Status.RUNNING, heartbeat_at__lt=cutoff)
+        | Q(status=WordImportJob.Status.RUNNING, heartbeat_at__isnull=True, created_at__lt=cutoff)
+        | Q(status=WordImportJob.Status.PENDING, created_at__lt=cutoff)
+    )
+    failed = 0
+    for job in stale.only('id', 'status', 'errors', 'error_count', 'file'):
+        last_seen = job.heartbeat_at if job.status == WordImportJob.Status.RUNNING else None
+        updated = WordImportJob.objects.filter(id=job.id, status=job.status).update(
+            status=WordImportJob.Status.FAILED,
+            finished_at=now,
+            errors=job.errors + [f"Import interrupted: no progress since {last_seen or 'start'} (worker restarted?)"],
+            error_count=job.error_count + 1,
+        )
+        if updated:
+            failed += 1
+            if job.file:
+                job.file.delete(save=False)
+                WordImportJob.objects.filter(id=job.id).update(file='')
+    return failed
+
+
+def run_import_job(job_id, chunk_size=DEFAULT_CHUNK_SIZE):
+    job = WordImportJob.objects.get(id=job_id)
+    started = WordImportJob.objects.filter(id=job.id, status=WordImportJob.Status.PENDING).update(
+        status=WordImportJob.Status.RUNNING, heartbeat_at=timezone.now()
+    )
+    if not started:
+        # Ya se dio por muerto (o lo tomó otro proceso)
+        return
+
+    def on_progress(result, bytes_read):
+        updated = WordImportJob.objects.filter(id=job.id, status=WordImportJob.Status.RUNNING).update(
+            processed_bytes=bytes_read,
+            rows_processed=result.rows_processed,
+            created_count=result.created,
+            updated_count=result.updated,
+            error_count=result.error_count,
+            errors=result.errors,
+            heartbeat_at=timezone.now(),
+        )
+        if not updated:
+            raise ImportInterrupted("job marked as failed while running")
+
+    status = WordImportJob.Status.DONE
+    try:
+        with job.file.open('rb') as raw_file:
+            import_words(raw_file, mode=job.mode, chunk_size=chunk_size, on_progress=on_progress)
+    except ImportInterrupted as e:
+        logger.warning("Importación #%s interrumpida: %s", job.id, e)
+        return
+    except Exception as e:
+        logger.exception("Error en importación #%s", job.id)
+        status = WordImportJob.Status.FAILED
+        job.refresh_from_db(fields=['errors', 'error_count'])
+        WordImportJob.objects.filter(id=job.id).update(
+            errors=job.errors + [f"Import aborted: {e}"],
+            error_count=job.error_count + 1,
+        )
+    finally:
+        WordImportJob.objects.filter(id=job.id, status=WordImportJob.Status.RUNNING).update(status=status, finished_at=timezone.now())
+        if job.file:
+            job.file.delete(save=False)
+            WordImportJob.objects.filter(id=job.id).update(file='')
+
+
+def _run_in_thread(job_id):
+    try:
+        run_import_job(job_id)
+    finally:
+        connection.close()
+
+
+def start_import_job(job):
+    """
+    Lanza la importación en un hilo del proceso cuando la transacción que creó el job se confirma.
+    """
+    transaction.on_commit(
+        lambda: threading.Thread(target=_run_in_thread, args=(job.id,), daemon=True, name=f'word-import-{job.id}').start()
+    )
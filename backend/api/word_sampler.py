@@ -0,0 +1,182 @@
+from api.models import Word, UserStats
+from api.unlocked_words import unlocked_word_ids
+from api.catalog import get_catalog_version, WORDS
+from django.conf import settings
+from collections import OrderedDict
+from array import array
+from threading import Lock
+import random
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- MUESTREADOR DE PALABRAS EN MEMORIA ---
+# * --------------------------------------------------------------------------------------------------
+# Reemplaza ORDER BY RANDOM(): cada proceso guarda arrays compactos de ids agrupados por
+# (word_type, banda de dificultad) y los reconstruye cuando cambia la versión del catálogo de Word.
+# Sacar `limit` palabras cuesta O(limit) + una consulta id__in, sin importar el tamaño del diccionario.
+
+# Bandas de dificultad usadas por get_quiz_words (?difficulty=EASY|NORMAL|HARD)
+DIFFICULTY_BANDS = ('EASY', 'NORMAL', 'HARD')
+
+
+def difficulty_band(difficulty_level):
+    if difficulty_level <= 3:
+        return 'EASY'
+    if difficulty_level <= 6:
+        return 'NORMAL'
+    return 'HARD'
+
+
+def bucket_keys(word_type, band):
+    return ((word_type, band), (word_type, None), (None, band), (None, None))
+
+
+class WordSampler:
+    """
+    Buckets de ids por (word_type o None, banda o None); None significa "cualquiera",
+    así cada combinación de filtros es un único array del que se muestrea directamente.
+    """
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.buckets = {}
+        self.word_keys = {}
+        for word_id, word_type, difficulty_level in rows:
+            band = difficulty_band(difficulty_level)
+            self.word_keys[word_id] = (word_type, band)
+            for key in bucket_keys(word_type, band):
+                bucket = self.buckets.get(key)
+                if bucket is None:
+                    bucket = self.buckets[key] = array('q')
+                bucket.append(word_id)
+
+    def bucket(self, word_type=None, difficulty=None):
+        return self.buckets.get((word_type or None, difficulty or None), array('q'))
+
+    def sample_ids(self, limit, word_type=None, difficulty=None, rng=random):
+        ids = self.bucket(word_type, difficulty)
+        return rng.sample(ids, min(limit, len(ids)))
+
+
+_sampler = None
+_sampler_lock = Lock()
+
+def get_word_sampler():
+    global _sampler
+    version = get_catalog_version(WORDS)
+    sampler = _sampler
+    if sampler is None or sampler.version != version:
+        with _sampler_lock:
+            if _sampler is None or _sampler.version != version:
+                _sampler = WordSampler(version, Word.objects.order_by('id').values_list('id', 'word_type', 'difficulty_level').iterator(chunk_size=5000))
+            sampler = _sampler
+    return sampler
+
+
+def normalize_difficulty(difficulty):
+    """
+    Convierte ?difficulty= en una banda válida o None (filtro ignorado, como antes).
+    """
+    if not difficulty:
+        return None
+    difficulty = difficulty.upper()
+    return difficulty if difficulty in DIFFICULTY_BANDS else None
+
+
+def fetch_words_in_order(ids, queryset=None):
+    """
+    Trae las palabras de `ids` con una sola consulta id__in y respeta el orden aleatorio del muestreo.
+    """
+    if not ids:
+        return []
+    queryset = Word.objects.all() if queryset is None else queryset
+    by_id = {word.id: word for word in queryset.filter(id__in=ids).prefetch_related('substitutes')}
+    return [by_id[word_id] for word_id in ids if word_id in by_id]
+
+
+def sample_words(limit, word_type=None, difficulty=None):
+    ids = get_word_sampler().sample_ids(limit, word_type, normalize_difficulty(difficulty))
+    return fetch_words_in_order(ids)
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- PALABRAS DESCUBIERTAS POR USUARIO ---
+# * --------------------------------------------------------------------------------------------------
+# Para ?discovered=true: cada proceso guarda (LRU) los ids desbloqueados de los usuarios activos,
+# ya repartidos en los mismos buckets que WordSampler. Cada entrada se versiona con el
+# unlocked_words_count del usuario (leído en cada pedido): si otro proceso desbloqueó palabras el
+# contador no coincide y se recarga. submit_game_results la actualiza de forma incremental al confirmar.
+
+class _UnlockedWords:
+    def __init__(self, word_ids, unlocked_count, sampler):
+        self.word_ids = set(word_ids)
+        self.unlocked_count = unlocked_count
+        self.partition(sampler)
+
+    def partition(self, sampler):
+        self.sampler_version = sampler.version
+        self.buckets = {}
+        for word_id in self.word_ids:
+            self._add_to_buckets(word_id, sampler)
+
+    def _add_to_buckets(self, word_id, sampler):
+        word_key = sampler.word_keys.get(word_id)
+        if word_key is None:
+            return
+        for key in bucket_keys(*word_key):
+            self.buckets.setdefault(key, []).append(word_id)
+
+    def add(self, word_ids, sampler):
+        for word_id in word_ids:
+            if word_id not in self.word_ids:
+                self.word_ids.add(word_id)
+                self._add_to_buckets(word_id, sampler)
+
+
+_unlocked_cache = OrderedDict()
+_unlocked_lock = Lock()
+
+
+def _cache_size():
+    return getattr(settings, 'UNLOCKED_WORDS_CACHE_SIZE', 2000)
+
+
+def get_unlocked_words(user_id):
+    sampler = get_word_sampler()
+    unlocked_count = UserStats.objects.filter(user_id=user_id).values_list('unlocked_words_count', flat=True).first()
+    with _unlocked_lock:
+        entry = _unlocked_cache.get(user_id)
+        if entry is not None and entry.unlocked_count == unlocked_count:
+            _unlocked_cache.move_to_end(user_id)
+            if entry.sampler_version != sampler.version:
+                entry.partition(sampler)
+            return entry
+
+    entry = _UnlockedWords(unlocked_word_ids(user_id), unlocked_count, sampler)
+    with _unlocked_lock:
+        _unlocked_cache[user_id] = entry
+        _unlocked_cache.move_to_end(user_id)
+        while len(_unlocked_cache) > _cache_size():
+            _unlocked_cache.popitem(last=False)
+    return entry
+
+
+def add_unlocked_words(user_id, word_ids, unlocked_count, new_words):
+    """
+    Actualiza incrementalmente la copia en memoria tras desbloquear palabras (si el usuario está en caché).
+    `unlocked_count` es el contador ya confirmado y `new_words` cuántas eran nuevas: si la entrada no
+    estaba al día antes del desbloqueo se descarta y el próximo pedido la recarga.
+    """
+    sampler = get_word_sampler()
+    with _unlocked_lock:
+        entry = _unlocked_cache.get(user_id)
+        if entry is None:
+            return
+        if entry.unlocked_count != unlocked_count - new_words:
+            del _unlocked_cache[user_id]
+            return
+        entry.add(word_ids, sampler)
+        entry.unlocked_count = unlocked_count
+
+
+def sample_unlocked_words(user_id, limit, word_type=None, difficulty=None):
+    bucket = get_unlocked_words(user_id).buckets.get((word_type or None, normalize_difficulty(difficulty)), [])
+    return fetch_words_in_order(random.sample(bucket, min(limit, len(bucket))))
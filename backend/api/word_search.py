@@ -0,0 +1,126 @@
+from api.models import Word
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q, Value, FloatField, BooleanField
+from django.db.models.expressions import RawSQL
+from threading import Lock
+import re
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- BÚSQUEDA DE PALABRAS (BACKENDS) ---
+# * --------------------------------------------------------------------------------------------------
+# WordViewSet usaba text__icontains | definition__icontains: un escaneo completo de cada definición
+# por cada tecla. Cada backend devuelve el queryset filtrado, anotado con `search_rank` y ordenado
+# por relevancia. Las estructuras de índice se crean en la migración 0016_word_search_index:
+#   - PostgreSQL: columna generada api_word.search_vector (tsvector, GIN) + índice trigram sobre text.
+#   - SQLite: tabla virtual FTS5 api_word_fts mantenida con triggers.
+# WORD_SEARCH_BACKEND = 'auto' (por defecto) | 'icontains' fuerza el comportamiento anterior.
+
+FTS_TABLE = 'api_word_fts'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_tokens(term):
+    return _TOKEN_RE.findall((term or '').lower())
+
+
+class IContainsSearchBackend:
+    name = 'icontains'
+
+    def search(self, queryset, term):
+        return queryset.filter(
+            Q(text__icontains=term) | Q(definition__icontains=term)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class PostgresSearchBackend:
+    """
+    Prefijos con tsvector ('give up' -> give:* & up:*) más coincidencia parcial/difusa sobre
+    `text` con pg_trgm. Ranking: ts_rank + similarity(text).
+    """
+    name = 'postgres'
+
+    def search(self, queryset, term):
+        tokens = search_tokens(term)
+        if not tokens:
+            return IContainsSearchBackend().search(queryset, term)
+        tsquery = ' & '.join(f'{token}:*' for token in tokens)
+        pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        match = RawSQL(
+            "(api_word.search_vector @@ to_tsquery('simple', %s) OR api_word.text ILIKE %s OR api_word.text %% %s)",
+            [tsquery, pattern, term],
+            output_field=BooleanField()
+        )
+        rank = RawSQL(
+            "ts_rank(api_word.search_vector, to_tsquery('simple', %s)) + similarity(api_word.text, %s)",
+            [tsquery, term],
+            output_field=FloatField()
+        )
+        return queryset.filter(match).annotate(search_rank=rank)
+
+
+class SQLiteFTSSearchBackend:
+    """
+    FTS5 con prefijos ("give"* "up"*); bm25 es menor cuanto más relevante, por eso se invierte.
+    """
+    name = 'sqlite_fts'
+
+    def search(self, queryset, term):
+        tokens = search_tokens(term)
+        if not tokens:
+            return IContainsSearchBackend().search(queryset, term)
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        # Filtro por rowid de la tabla FTS; el rank se resuelve por rowid solo para las filas que coinciden
+        matching_ids = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        rank = RawSQL(
+            f"(SELECT -bm25({FTS_TABLE}, 10.0, 5.0, 1.0) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = api_word.id)",
+            [match],
+            output_field=FloatField()
+        )
+        return queryset.filter(id__in=matching_ids).annotate(search_rank=rank)
+
+
+def _has_table(name):
+    with connection.cursor() as cursor:
+        return name in connection.introspection.table_names(cursor, include_views=True)
+
+
+def _has_search_vector():
+    with connection.cursor() as cursor:
+        columns = connection.introspection.get_table_description(cursor, Word._meta.db_table)
+    return any(column.name == 'search_vector' for column in columns)
+
+
+_backends = {}
+_backends_lock = Lock()
+
+def get_search_backend():
+    """
+    Elige el backend según la base de datos; si la migración no pudo crear el índice
+    (p. ej. SQLite sin FTS5) cae a icontains.
+    """
+    if getattr(settings, 'WORD_SEARCH_BACKEND', 'auto') == 'icontains':
+        return IContainsSearchBackend()
+
+    alias = connection.alias
+    backend = _backends.get(alias)
+    if backend is None:
+        with _backends_lock:
+            if alias not in _backends:
+                if connection.vendor == 'postgresql' and _has_search_vector():
+                    _backends[alias] = PostgresSearchBackend()
+                elif connection.vendor == 'sqlite' and _has_table(FTS_TABLE):
+                    _backends[alias] = SQLiteFTSSearchBackend()
+                else:
+                    _backends[alias] = IContainsSearchBackend()
+            backend = _backends[alias]
+    return backend
+
+
+def search_words(queryset, term, backend=None):
+    """
+    Filtra `queryset` por `term` y lo ordena por relevancia (más relevante primero).
+    """
+    backend = backend or get_search_backend()
+    return backend.search(queryset, term).order_by('-search_rank', 'id')
@@ -0,0 +1,119 @@
+from api.models import Word, WordTombstone
+from api.catalog import get_catalog_version, WORDS
+from django.db.models import Max
+from datetime import datetime, timedelta, timezone as dt_timezone
+from threading import Lock
+import gzip
+import hashlib
+import json
+
+# * --------------------------------------------------------------------------------------------------
+# ! --- SNAPSHOT Y SINCRONIZACIÓN DEL CATÁLOGO DE PALABRAS ---
+# * --------------------------------------------------------------------------------------------------
+# El cliente (Godot) descarga words/snapshot/ una vez, guarda `version` y luego pide solo
+# words/changes/?since=<version>. `version` es un cursor opaco: el mayor updated_at/deleted_at
+# visto, en microsegundos. Es determinista (no depende del proceso), así todos los workers
+# generan el mismo snapshot y el mismo ETag.
+#
+# Como updated_at se fija al guardar y no al confirmar la transacción, words/changes/ vuelve a
+# enviar lo modificado en los últimos SYNC_OVERLAP; el cliente aplica los cambios por id, así que
+# repetirlos no tiene efecto.
+
+SYNC_OVERLAP = timedelta(seconds=30)
+
+WORD_FIELDS = ('id', 'text', 'translation', 'definition', 'word_type', 'examples', 'difficulty_level', 'tags')
+
+
+def to_cursor(moment):
+    if moment is None:
+        return 0
+    return int(moment.timestamp() * 1_000_000)
+
+
+def from_cursor(cursor):
+    """
+    Cursor -> datetime UTC. Lanza ValueError si es negativo o cae fuera del rango de fechas.
+    """
+    if cursor < 0:
+        raise ValueError("Cursor inválido")
+    try:
+        return datetime.fromtimestamp(cursor / 1_000_000, tz=dt_timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        raise ValueError("Cursor inválido")
+
+
+def _substitutes_by_word(word_ids=None):
+    through = Word.substitutes.through.objects.all()
+    if word_ids is not None:
+        through = through.filter(from_word_id__in=word_ids)
+    substitutes = {}
+    for from_id, to_id in through.order_by('from_word_id', 'to_word_id').values_list('from_word_id', 'to_word_id'):
+        substitutes.setdefault(from_id, []).append(to_id)
+    return substitutes
+
+
+def serialize_words(queryset):
+    """
+    Filas planas para el cliente: campos de Word + `substitute_ids` (el cliente resuelve los textos).
+    """
+    words = list(queryset.order_by('id').values(*WORD_FIELDS))
+    # Con pocas filas (changes) se filtra la tabla intermedia; para el catálogo completo se lee entera
+    substitutes = _substitutes_by_word([row['id'] for row in words] if len(words) < 1000 else None)
+    for row in words:
+        row['substitute_ids'] = substitutes.get(row['id'], [])
+    return words
+
+
+def current_cursor():
+    latest_update = Word.objects.aggregate(latest=Max('updated_at'))['latest']
+    latest_delete = WordTombstone.objects.aggregate(latest=Max('deleted_at'))['latest']
+    return max(to_cursor(latest_update), to_cursor(latest_delete))
+
+
+class WordSnapshot:
+    def __init__(self, catalog_version):
+        self.catalog_version = catalog_version
+        cursor = current_cursor()
+        payload = {'version': cursor, 'words': serialize_words(Word.objects.all())}
+        self.body = json.dumps(payload, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+        self.gzipped = gzip.compress(self.body, mtime=0)
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        self.cursor = cursor
+        self.count = len(payload['words'])
+
+
+_snapshot = None
+_snapshot_lock = Lock()
+
+def get_word_snapshot():
+    """
+    Snapshot del catálogo completo; se reconstruye solo cuando cambia la versión del catálogo de Word.
+    """
+    global _snapshot
+    version = get_catalog_version(WORDS)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.catalog_version == version:
+        return snapshot
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.catalog_version != version:
+            _snapshot = WordSnapshot(version)
+        return _snapshot
+
+
+def word_changes(since):
+    """
+    Palabras creadas/modificadas y ids borrados desde el cursor `since`. ValueError si no es válido.
+    """
+    moment = from_cursor(since) - SYNC_OVERLAP
+    cursor = current_cursor()
+    deleted = list(
+        WordTombstone.objects.filter(deleted_at__gt=moment).order_by('word_id').values_list('word_id', flat=True).distinct()
+    )
+    updated = serialize_words(Word.objects.filter(updated_at__gt=moment))
+    # Un id recreado después de borrarse cuenta como actualizado
+    updated_ids = {row['id'] for row in updated}
+    return {
+        'version': max(cursor, since),
+        'updated': updated,
+        'deleted': [word_id for word_id in deleted if word_id not in updated_ids],
+    }
@@ -102,6 +102,8 @@ DATABASES = {
 }
 
 # Update database configuration from $DATABASE_URL.
+# Cada hilo de gunicorn mantiene su propia conexión (conn_max_age): con gthread son hasta
+# WEB_CONCURRENCY x --threads conexiones por instancia (4 x 4 = 16 en render.yaml).
 import dj_database_url
 db_from_env = dj_database_url.config(conn_max_age=600)
 if db_from_env:
@@ -76,7 +76,7 @@ function DashboardStatsCards() {
             setStats(statsResp.data);
 
             try {
-                const usersResp = await api.get('/leaderboard/');
+                const usersResp = await api.get('/leaderboard/?limit=5');
                 const allStats = Array.isArray(usersResp.data) ? usersResp.data : (usersResp.data.results || []);
                 setLeaderboard(allStats.slice(0, 5));
             } catch (err) {
@@ -146,9 +146,24 @@ function DictionaryAdminPanel() {
             const response = await api.post('/words/import_csv/', formData, {
                 headers: { 'Content-Type': 'multipart/form-data' }
             });
-            toast.success('¡Importación Exitosa!', { description: response.data.message });
             setIsUploadOpen(false);
             setUploadFile(null);
+
+            // La importación corre en segundo plano: consultar el progreso hasta que termine
+            const toastId = toast.loading('Importando palabras...', { description: response.data.message });
+            let job = response.data.job;
+            while (job.status === 'PENDING' || job.status === 'RUNNING') {
+                await new Promise(resolve => setTimeout(resolve, 1500));
+                job = (await api.get(`/words/import_jobs/${job.id}/`)).data;
+                toast.loading(`Importando palabras... ${job.progress}%`, { id: toastId, description: `${job.rows_processed} filas procesadas` });
+            }
+
+            const summary = `${job.created_count} creadas, ${job.updated_count} actualizadas, ${job.error_count} errores.`;
+            if (job.status === 'DONE' && job.error_count === 0) {
+                toast.success('¡Importación Exitosa!', { id: toastId, description: summary });
+            } else {
+                toast.error('Importación con errores', { id: toastId, description: `${summary} ${job.errors.slice(0, 5).join(' | ')}` });
+            }
             fetchWords();
         } catch (err) {
             console.error(err);
@@ -102,7 +102,7 @@ export default function FarmDetail() {
                         TABLA DE DESEMPEÑO (LEADERBOARD)
                     </h3>
                     <span className="font-mono text-xs bg-background px-2 py-1 border-2 border-foreground">
-                        {farm.students_data?.length || 0} ALUMNOS
+                        {farm.students_count ?? farm.students_data?.length ?? 0} ALUMNOS
                     </span>
                 </div>
 
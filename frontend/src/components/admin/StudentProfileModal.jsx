@@ -9,11 +9,13 @@ export default function StudentProfileModal({ farmId, studentId, onClose }) {
     const [loading, setLoading] = useState(true);
     const [studentData, setStudentData] = useState(null);
     const [historyPage, setHistoryPage] = useState(1);
+    const [historyCursor, setHistoryCursor] = useState(null);
 
     useEffect(() => {
         const fetchStudentDetails = async () => {
             try {
-                const res = await api.get(`/farms/${farmId}/student-detail/${studentId}/?page=${historyPage}`);
+                const cursorParam = historyCursor ? `?cursor=${encodeURIComponent(historyCursor)}` : '';
+                const res = await api.get(`/farms/${farmId}/student-detail/${studentId}/${cursorParam}`);
                 setStudentData(res.data);
             } catch (error) {
                 console.error("Error cargando perfil del estudiante:", error);
@@ -24,7 +26,7 @@ export default function StudentProfileModal({ farmId, studentId, onClose }) {
             }
         };
         fetchStudentDetails();
-    }, [farmId, studentId, historyPage, api, onClose]);
+    }, [farmId, studentId, historyCursor, api, onClose]);
 
     if (loading && !studentData) {
         return (
@@ -39,7 +41,12 @@ export default function StudentProfileModal({ farmId, studentId, onClose }) {
 
     if (!studentData) return null;
 
-    const { username, avatar_url, stats, recent_history, total_battles } = studentData;
+    const { username, avatar_url, stats, recent_history, total_battles, history_count, history_next, history_previous } = studentData;
+
+    const goToHistoryPage = (cursor, step) => {
+        setHistoryCursor(cursor);
+        setHistoryPage(prev => Math.max(prev + step, 1));
+    };
 
     // Calcular precision global
     const calcAccuracy = (stats) => {
@@ -174,21 +181,21 @@ export default function StudentProfileModal({ farmId, studentId, onClose }) {
                                         );
                                     })}
                                 </div>
-                                {total_battles > 5 && (
+                                {history_count > 5 && (
                                     <div className="flex items-center justify-between mt-6 pt-4 border-t-2 border-foreground/20">
                                         <button
-                                            onClick={() => setHistoryPage(prev => Math.max(prev - 1, 1))}
-                                            disabled={historyPage === 1}
+                                            onClick={() => goToHistoryPage(history_previous, -1)}
+                                            disabled={!history_previous}
                                             className="px-4 py-2 font-mono text-xs uppercase tracking-wider border-2 border-foreground bg-card hover:bg-muted transition-colors disabled:opacity-30 disabled:cursor-not-allowed pixel-border"
                                         >
                                             ◀ Anterior
                                         </button>
                                         <span className="font-mono text-xs text-muted-foreground">
-                                            Página {historyPage} de {Math.ceil(total_battles / 5)}
+                                            Página {historyPage} de {Math.ceil(history_count / 5)}
                                         </span>
                                         <button
-                                            onClick={() => setHistoryPage(prev => prev + 1)}
-                                            disabled={historyPage >= Math.ceil(total_battles / 5)}
+                                            onClick={() => goToHistoryPage(history_next, 1)}
+                                            disabled={!history_next}
                                             className="px-4 py-2 font-mono text-xs uppercase tracking-wider border-2 border-foreground bg-card hover:bg-muted transition-colors disabled:opacity-30 disabled:cursor-not-allowed pixel-border"
                                         >
                                             Siguiente ▶
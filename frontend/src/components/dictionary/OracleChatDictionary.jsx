@@ -55,7 +55,11 @@ export default function OracleChatDictionary({ word, onClose }) {
             }
         } catch (error) {
             console.error("Error consultando al oráculo:", error);
-            setMessages(prev => [...prev, { role: 'assistant', text: "Lo siento, mis visiones están nubladas. Intenta de nuevo más tarde." }]);
+            const busy = error.response?.status === 503;
+            const errorText = busy
+                ? `Muchos granjeros me consultan a la vez. Vuelve a preguntarme en ${error.response.data?.retry_after || 5} segundos.`
+                : "Lo siento, mis visiones están nubladas. Intenta de nuevo más tarde.";
+            setMessages(prev => [...prev, { role: 'assistant', text: errorText }]);
             setChatPhase(optionType === 'EXAMPLES' ? "ANSWERED_BASE" : "INITIAL");
         }
     };
@@ -62,6 +62,7 @@ function ProfilePage() {
     const [historyNext, setHistoryNext] = useState(null);
     const [historyPrev, setHistoryPrev] = useState(null);
     const [historyLoading, setHistoryLoading] = useState(false);
+    const [aiEvaluations, setAiEvaluations] = useState({});
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
     const [activeTab, setActiveTab] = useState('stats');
@@ -101,15 +102,17 @@ function ProfilePage() {
         }
     }, [api, userId]);
 
-    const fetchHistory = useCallback(async (page = 1) => {
+    // El historial se pagina por cursor: `cursor` es data.next_cursor / data.previous_cursor de la respuesta anterior
+    const fetchHistory = useCallback(async (page = 1, cursor = null) => {
         setHistoryLoading(true);
         try {
-            const res = await api.get(`/game-history/?page=${page}`);
+            const cursorParam = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+            const res = await api.get(`/game-history/${cursorParam}`);
             const data = res.data;
             setGameHistory(data.results || []);
             setHistoryCount(data.count || 0);
-            setHistoryNext(data.next);
-            setHistoryPrev(data.previous);
+            setHistoryNext(data.next_cursor);
+            setHistoryPrev(data.previous_cursor);
             setHistoryPage(page);
         } catch (err) {
             console.error('Error fetching history:', err);
@@ -118,6 +121,16 @@ function ProfilePage() {
         }
     }, [api]);
 
+    // La evaluación de la IA no viene en el listado: se pide al detalle de la partida
+    const fetchAiEvaluation = useCallback(async (gameId) => {
+        try {
+            const res = await api.get(`/game-history/${gameId}/`);
+            setAiEvaluations(prev => ({ ...prev, [gameId]: res.data.ai_evaluation }));
+        } catch (err) {
+            console.error('Error fetching AI evaluation:', err);
+        }
+    }, [api]);
+
     useEffect(() => {
         fetchAllData();
     }, [fetchAllData]);
@@ -585,8 +598,16 @@ function ProfilePage() {
                                                         </div>
                                                     </div>
                                                 </div>
-                                                {game.ai_evaluation && (() => {
-                                                    const aiEval = game.ai_evaluation.evaluacion || game.ai_evaluation;
+                                                {game.has_ai_evaluation && !aiEvaluations[game.id] && (
+                                                    <button
+                                                        onClick={() => fetchAiEvaluation(game.id)}
+                                                        className="self-start text-[11px] font-mono font-bold uppercase text-primary tracking-wider hover:underline"
+                                                    >
+                                                        🔮 Ver evaluación del Oráculo
+                                                    </button>
+                                                )}
+                                                {aiEvaluations[game.id] && (() => {
+                                                    const aiEval = aiEvaluations[game.id].evaluacion || aiEvaluations[game.id];
                                                     const quality = aiEval.calidad || 0;
                                                     const qualityColor = quality >= 80 ? 'text-green-500' : quality >= 50 ? 'text-yellow-500' : 'text-red-500';
 
@@ -624,7 +645,7 @@ function ProfilePage() {
                                 {historyCount > 5 && (
                                     <div className="flex items-center justify-between mt-6 pt-4 border-t-2 border-foreground/20">
                                         <button
-                                            onClick={() => fetchHistory(historyPage - 1)}
+                                            onClick={() => fetchHistory(historyPage - 1, historyPrev)}
                                             disabled={!historyPrev}
                                             className="px-4 py-2 font-mono text-xs uppercase tracking-wider border-2 border-foreground bg-card hover:bg-muted transition-colors disabled:opacity-30 disabled:cursor-not-allowed pixel-border"
                                         >
@@ -634,7 +655,7 @@ function ProfilePage() {
                                             Página {historyPage} de {Math.ceil(historyCount / 5)}
                                         </span>
                                         <button
-                                            onClick={() => fetchHistory(historyPage + 1)}
+                                            onClick={() => fetchHistory(historyPage + 1, historyNext)}
                                             disabled={!historyNext}
                                             className="px-4 py-2 font-mono text-xs uppercase tracking-wider border-2 border-foreground bg-card hover:bg-muted transition-colors disabled:opacity-30 disabled:cursor-not-allowed pixel-border"
                                         >